@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the calculator
+
+Times single-expression latency, the compiled-expression cache, memoized
+operations, large factorials, equation solving, batch throughput, how
+evaluation scales with threads and GUI evaluation (without creating a Tk
+window), compares the results with a stored JSON baseline and exits with
+status 1 if any benchmark is slower than the baseline by more than the
+threshold.
+
+    python benchmarks/run_benchmarks.py              # compare with baseline
+    python benchmarks/run_benchmarks.py --save       # record a new baseline
+    python benchmarks/run_benchmarks.py -k cache -k batch
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARK_DIR.parent / "src"))
+
+from calc_engine import ExpressionCache, evaluate, evaluate_node, get_backend, parse
+from calc_engine.batch import BatchEvaluator
+from calc_engine.context import EvaluationContext, EvaluationEngine
+from calc_engine.incremental import IncrementalEvaluator
+from calc_engine.profiling import EvaluationProfile
+from calc_engine.session import EvaluationSession
+
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+FORMAT_VERSION = 1
+
+EXPRESSION = "sin(30) + sqrt(16) * 2^3 - ln(e^2) / 4"
+VARIABLE_EXPRESSION = "x^2 + 3*x*y - sqrt(abs(y)) + ans"
+VARIABLES = {"x": 1.5, "y": -2.25, "ans": 10.0}
+BATCH_LINES = 1000
+THREAD_COUNTS = (1, 2, 4, 8)
+# Evaluations per thread per call of a threads.* benchmark
+THREAD_EVALUATIONS = 2000
+
+
+class Benchmark(NamedTuple):
+    """A named setup function yielding the callable to time"""
+
+    name: str
+    setup: Callable[[], Iterator[Callable[[], object]]]
+    # Operations performed by one call, so results are per operation
+    ops: int
+    description: str
+
+
+class Result(NamedTuple):
+    """Timing of one benchmark, in nanoseconds per operation"""
+
+    name: str
+    best_ns: float
+    median_ns: float
+    calls: int
+
+
+class Comparison(NamedTuple):
+    """A result against its baseline; ratio > 1 means slower"""
+
+    name: str
+    baseline_ns: Optional[float]
+    current_ns: float
+    ratio: Optional[float]
+    regressed: bool
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, ops: int = 1):
+    """Register a generator function as a benchmark setup"""
+
+    def register(setup):
+        description = (setup.__doc__ or "").strip()
+        BENCHMARKS.append(Benchmark(name, contextmanager(setup), ops, description))
+        return setup
+
+    return register
+
+
+class _HeadlessVar:
+    """Stands in for a tkinter variable"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def headless_gui(session: EvaluationSession):
+    """
+    An AdvancedCalculatorGUI with just the state evaluate_expression()
+    uses, so the GUI's evaluation path runs without a display
+    """
+    from calculator import AdvancedCalculator
+    from calculator_gui import AdvancedCalculatorGUI
+
+    gui = AdvancedCalculatorGUI.__new__(AdvancedCalculatorGUI)
+    gui.session = session
+    gui.degrees_mode = _HeadlessVar(True)
+    gui.calc = AdvancedCalculator()
+    gui.variables = {"x": 1.5, "y": -2.25}
+    gui.last_result = 10.0
+    gui.profiling = False
+    gui.last_profile = None
+    return gui
+
+
+@benchmark("latency.evaluate")
+def _evaluate():
+    """evaluate() of a repeated expression: a cache hit plus the call"""
+    yield lambda: evaluate(EXPRESSION)
+
+
+@benchmark("latency.evaluate_variables")
+def _evaluate_variables():
+    """evaluate() with variables bound"""
+    yield lambda: evaluate(VARIABLE_EXPRESSION, variables=VARIABLES)
+
+
+@benchmark("latency.evaluate_profiled")
+def _evaluate_profiled():
+    """evaluate() recording per-stage timings"""
+    yield lambda: evaluate(EXPRESSION, profile=EvaluationProfile())
+
+
+@benchmark("latency.tree_walk")
+def _tree_walk():
+    """Parse and walk the tree without compiling"""
+    yield lambda: evaluate_node(parse(EXPRESSION), True)
+
+
+@benchmark("latency.decimal")
+def _decimal():
+    """evaluate() with the 28-digit decimal backend"""
+    backend = get_backend("decimal")
+    yield lambda: evaluate(EXPRESSION, backend=backend)
+
+
+@benchmark("latency.console")
+def _console():
+    """The console calculator's evaluate_expression(), with an assignment"""
+    from calculator import AdvancedCalculator, evaluate_expression
+
+    calc = AdvancedCalculator()
+    calc.set_variable("x", 1.5)
+    calc.set_variable("y", -2.25)
+    yield lambda: evaluate_expression(f"z = {VARIABLE_EXPRESSION}", calc)
+
+
+@benchmark("latency.calculator_methods", ops=6)
+def _calculator_methods():
+    """AdvancedCalculator's direct operations, as used by the console menu"""
+    from calculator import AdvancedCalculator
+
+    calc = AdvancedCalculator()
+
+    def run():
+        calc.sin(30)
+        calc.power(2, 10)
+        calc.square_root(2)
+        calc.log(100, 10)
+        calc.factorial(20)
+        calc.divide(1, 3)
+
+    yield run
+
+
+@benchmark("cache.hit")
+def _cache_hit():
+    """ExpressionCache.get() of a cached expression"""
+    cache = ExpressionCache()
+    cache.get(EXPRESSION)
+    yield lambda: cache.get(EXPRESSION)
+
+
+@benchmark("cache.miss")
+def _cache_miss():
+    """ExpressionCache.get() that has to tokenize, parse, optimize and compile"""
+    cache = ExpressionCache(capacity=0)
+    yield lambda: cache.get(EXPRESSION)
+
+
+@benchmark("cache.eviction")
+def _cache_eviction():
+    """Misses on a full cache, each evicting the oldest entry"""
+    cache = ExpressionCache(capacity=64)
+    counter = itertools.count()
+    yield lambda: cache.get(f"{next(counter)} + sin(x)")
+
+
+@benchmark("memo.factorial")
+def _memo_factorial():
+    """A memoized AdvancedCalculator.factorial() of a repeated argument"""
+    from calculator import AdvancedCalculator
+
+    calc = AdvancedCalculator()
+    calc.memoize(["factorial"])
+    calc.factorial(2000)
+    yield lambda: calc.factorial(2000)
+
+
+@benchmark("memo.power")
+def _memo_power():
+    """A memoized power() with large integer operands, repeated"""
+    from calculator import AdvancedCalculator
+
+    calc = AdvancedCalculator()
+    calc.memoize(["power"])
+    calc.power(3, 5000)
+    yield lambda: calc.power(3, 5000)
+
+
+@benchmark("factorial.consecutive")
+def _factorial_consecutive():
+    """n! for n = 20000, 20001, ..., each built from the previous checkpoint"""
+    from calc_engine.factorial import FactorialCache
+
+    cache = FactorialCache()
+    counter = itertools.count(20000)
+    cache.factorial(next(counter))
+    yield lambda: cache.factorial(next(counter))
+
+
+@benchmark("solver.newton")
+def _solver_newton():
+    """solve() of a cubic with safeguarded Newton steps and exact slopes"""
+    from calc_engine.solver import solve
+
+    yield lambda: solve("x^3 - 2x - 5")
+
+
+@benchmark("solver.brent")
+def _solver_brent():
+    """solve() of the same cubic with Brent's method"""
+    from calc_engine.solver import solve
+
+    yield lambda: solve("x^3 - 2x - 5", method="brent")
+
+
+@benchmark("solver.many", ops=BATCH_LINES)
+def _solver_many():
+    """solve_many() of x^3 - 2x - c for BATCH_LINES values of c at once"""
+    from calc_engine.solver import solve_many
+
+    constants = [5 + i / BATCH_LINES for i in range(BATCH_LINES)]
+    yield lambda: solve_many("x^3 - 2x - c", (0, 10), c=constants)
+
+
+@benchmark("integrate.vectorized")
+def _integrate_vectorized():
+    """integrate() of sin(1/x), each round evaluating all new nodes at once"""
+    from calc_engine.quadrature import integrate
+
+    yield lambda: integrate("sin(1/x)", "x", 0.001, 1, degrees=False)
+
+
+@benchmark("integrate.expression")
+def _integrate_expression():
+    """The same integral inside an expression, one node at a time"""
+    yield lambda: evaluate("integrate(sin(1/x), x, 0.001, 1)", False)
+
+
+@benchmark("batch.unique", ops=BATCH_LINES)
+def _batch_unique():
+    """Batch lines that are all different, in this process"""
+    evaluator = BatchEvaluator(workers=1)
+    counter = itertools.count()
+
+    def run():
+        start = next(counter) * BATCH_LINES
+        lines = [f"{i} * 2 + sin({i})" for i in range(start, start + BATCH_LINES)]
+        for _ in evaluator.evaluate(lines):
+            pass
+
+    yield run
+
+
+@benchmark("batch.repeated", ops=BATCH_LINES)
+def _batch_repeated():
+    """Batch lines drawn from 20 distinct expressions, in this process"""
+    evaluator = BatchEvaluator(workers=1)
+    lines = [f"sqrt({i % 20}) + {i % 20}^2" for i in range(BATCH_LINES)]
+    yield lambda: sum(1 for _ in evaluator.evaluate(lines))
+
+
+@benchmark("batch.file", ops=BATCH_LINES)
+def _batch_file():
+    """BatchEvaluator.run_file() on a memory-mapped file"""
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w") as f:
+        f.writelines(f"log({i % 50 + 1}, 2) * {i % 7}\n" for i in range(BATCH_LINES))
+    evaluator = BatchEvaluator(workers=1)
+    try:
+        yield lambda: evaluator.run_file(path, io.BytesIO())
+    finally:
+        os.remove(path)
+
+
+def _thread_scaling(threads: int):
+    """
+    Setup for THREAD_EVALUATIONS evaluations on each of threads threads
+    sharing one EvaluationEngine, each with its own context. Results are
+    wall time per evaluation, so on a free-threaded build they should fall
+    as threads are added, and on a GIL build stay roughly level.
+    """
+
+    def setup():
+        engine = EvaluationEngine()
+        barrier = threading.Barrier(threads + 1)
+        done = threading.Barrier(threads + 1)
+        stopping = False
+
+        def work():
+            while True:
+                barrier.wait()
+                if stopping:
+                    return
+                context = EvaluationContext({"x": 1.5, "y": -2.25}, last_result=10.0)
+                for _ in range(THREAD_EVALUATIONS):
+                    engine.evaluate(VARIABLE_EXPRESSION, context)
+                done.wait()
+
+        workers = [threading.Thread(target=work, daemon=True) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+
+        def run():
+            barrier.wait()
+            done.wait()
+
+        try:
+            yield run
+        finally:
+            stopping = True
+            barrier.wait()
+            for worker in workers:
+                worker.join()
+
+    setup.__doc__ = f"{VARIABLE_EXPRESSION!r} on {threads} thread(s), one engine"
+    return setup
+
+
+for _threads in THREAD_COUNTS:
+    benchmark(f"threads.{_threads}", ops=_threads * THREAD_EVALUATIONS)(
+        _thread_scaling(_threads)
+    )
+
+
+@benchmark("gui.evaluate")
+def _gui_evaluate():
+    """AdvancedCalculatorGUI.evaluate_expression() in the GUI process"""
+    gui = headless_gui(EvaluationSession(sandboxed=False))
+    yield lambda: gui.evaluate_expression(VARIABLE_EXPRESSION)
+
+
+@benchmark("gui.evaluate_sandboxed")
+def _gui_evaluate_sandboxed():
+    """AdvancedCalculatorGUI.evaluate_expression() through the sandbox worker"""
+    session = EvaluationSession(sandboxed=True)
+    gui = headless_gui(session)
+    try:
+        gui.evaluate_expression(VARIABLE_EXPRESSION)
+        yield lambda: gui.evaluate_expression(VARIABLE_EXPRESSION)
+    finally:
+        session.close()
+
+
+@benchmark("gui.preview_typing", ops=len(VARIABLE_EXPRESSION))
+def _gui_preview_typing():
+    """Live preview while typing an expression, one update per keystroke"""
+    prefixes = [VARIABLE_EXPRESSION[:i] for i in range(1, len(VARIABLE_EXPRESSION) + 1)]
+
+    def run():
+        evaluator = IncrementalEvaluator()
+        for i, text in enumerate(prefixes, 1):
+            try:
+                evaluator.update(text, True, VARIABLES, cursor=i)
+            except Exception:
+                pass
+
+    yield run
+
+
+def measure(
+    func: Callable[[], object], ops: int = 1, repeat: int = 5, min_time: float = 0.05
+) -> Tuple[List[float], int]:
+    """
+    Time func, returning nanoseconds per operation for each of repeat
+    samples and the number of calls per sample. Each sample calls func
+    often enough to last min_time seconds.
+    """
+    func()  # warm caches and lazy imports
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        calls = max(calls * 2, int(calls * min_time / max(elapsed, 1e-9)) + 1)
+    samples = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        samples.append(time.perf_counter() - start)
+    return [sample * 1e9 / (calls * ops) for sample in samples], calls
+
+
+def run_benchmark(bench: Benchmark, repeat: int = 5, min_time: float = 0.05) -> Result:
+    """Set up, time and tear down one benchmark"""
+    with bench.setup() as func:
+        samples, calls = measure(func, bench.ops, repeat, min_time)
+    return Result(bench.name, min(samples), statistics.median(samples), calls)
+
+
+def select(patterns: Optional[List[str]]) -> List[Benchmark]:
+    """Benchmarks whose name contains any of patterns, or all of them"""
+    if not patterns:
+        return list(BENCHMARKS)
+    return [b for b in BENCHMARKS if any(p in b.name for p in patterns)]
+
+
+def environment() -> Dict[str, str]:
+    """Description of the machine the results were taken on"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def to_json(results: List[Result]) -> dict:
+    return {
+        "format": FORMAT_VERSION,
+        "environment": environment(),
+        "benchmarks": {
+            r.name: {"best_ns": round(r.best_ns, 1), "median_ns": round(r.median_ns, 1)}
+            for r in results
+        },
+    }
+
+
+def load_baseline(path: Path) -> Optional[dict]:
+    """Read a baseline file; None if it does not exist"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        return None
+    if baseline.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path} has an unsupported baseline format")
+    return baseline
+
+
+def compare(
+    baseline: dict, results: List[Result], threshold: float = DEFAULT_THRESHOLD
+) -> List[Comparison]:
+    """
+    Compare best times with the baseline. A benchmark regresses when it is
+    more than threshold (a fraction, 0.25 = 25%) slower; benchmarks missing
+    from the baseline never do.
+    """
+    stored = baseline.get("benchmarks", {})
+    comparisons = []
+    for result in results:
+        entry = stored.get(result.name)
+        if entry is None:
+            comparisons.append(Comparison(result.name, None, result.best_ns, None, False))
+            continue
+        ratio = result.best_ns / entry["best_ns"]
+        comparisons.append(
+            Comparison(
+                result.name, entry["best_ns"], result.best_ns, ratio, ratio > 1 + threshold
+            )
+        )
+    return comparisons
+
+
+def format_ns(ns: float) -> str:
+    """Human-readable duration"""
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.0f} ns"
+
+
+def main(argv=None) -> int:
+    """Run the benchmarks; return 1 if any regressed"""
+    parser = argparse.ArgumentParser(description="Calculator performance benchmarks")
+    parser.add_argument(
+        "-k", dest="patterns", action="append", help="only run benchmarks matching this"
+    )
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="store the results as the new baseline"
+    )
+    parser.add_argument("--output", type=Path, help="also write the results to a file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="allowed slowdown as a fraction (default %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="samples per benchmark")
+    parser.add_argument(
+        "--min-time", type=float, default=0.05, help="seconds per sample"
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    args = parser.parse_args(argv)
+
+    benchmarks = select(args.patterns)
+    if args.list:
+        for bench in benchmarks:
+            print(f"{bench.name:28} {bench.description}")
+        return 0
+
+    results = []
+    for bench in benchmarks:
+        try:
+            result = run_benchmark(bench, args.repeat, args.min_time)
+        except ImportError as e:
+            print(f"{bench.name:28} skipped ({e})")
+            continue
+        results.append(result)
+        print(
+            f"{bench.name:28} {format_ns(result.best_ns):>10}"
+            f"  (median {format_ns(result.median_ns)})"
+        )
+
+    data = to_json(results)
+    if args.output:
+        args.output.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+    if args.save:
+        if args.patterns:
+            # Keep the entries of benchmarks that were not run
+            previous = load_baseline(args.baseline) or {"benchmarks": {}}
+            data["benchmarks"] = {**previous["benchmarks"], **data["benchmarks"]}
+        args.baseline.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one")
+        return 0
+    if baseline.get("environment") != environment():
+        print("\nNote: the baseline was recorded on a different machine or Python")
+
+    print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+    regressions = 0
+    for c in compare(baseline, results, args.threshold):
+        if c.ratio is None:
+            print(f"  {c.name:28} new")
+            continue
+        status = "REGRESSION" if c.regressed else "ok"
+        print(f"  {c.name:28} {c.ratio:6.2f}x  {status}")
+        regressions += c.regressed
+    if regressions:
+        print(f"\n{regressions} benchmark(s) regressed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Startup-time report for the calculator entry points
+
+Imports each module in a fresh interpreter with -X importtime, keeps the
+fastest of several runs, lists the slowest imports and checks the total
+against a budget. Exits with status 1 if a budget is exceeded or a module
+that should only load on demand is imported at startup.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Milliseconds allowed for "import <module>" with a warm bytecode cache
+BUDGETS_MS = {
+    "calc_engine": 40.0,
+    "calculator": 40.0,
+    "calculator_gui": 80.0,
+}
+
+# Modules that must only be imported on first use
+DEFERRED = {
+    "calc_engine": ["numpy", "multiprocessing", "decimal", "fractions", "tkinter"],
+    "calculator": ["numpy", "multiprocessing", "decimal", "fractions", "argparse", "tkinter"],
+    "calculator_gui": ["numpy", "multiprocessing", "decimal", "fractions", "argparse"],
+}
+
+
+def parse_importtime(output):
+    """Map each imported module to its (self, cumulative) time in microseconds"""
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def run_import(module, python=sys.executable):
+    """Import module in a fresh interpreter; return its import times"""
+    env = dict(os.environ)
+    # Write bytecode, so the runs after the first measure a warm cache
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure(module, runs=5):
+    """Fastest of several imports of module, after one warm-up import"""
+    run_import(module)
+    samples = [run_import(module) for _ in range(runs)]
+    return min(samples, key=lambda times: times[module][1])
+
+
+def loaded_modules(module):
+    """Names of all modules loaded by importing module"""
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sys.modules)"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def report(module, times, budget_ms, top=10):
+    """Print the breakdown for one module; return whether it is in budget"""
+    total_ms = times[module][1] / 1000
+    within = total_ms <= budget_ms
+    status = "ok" if within else "OVER BUDGET"
+    print(f"{module}: {total_ms:.1f} ms (budget {budget_ms:.0f} ms) {status}")
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:top]:
+        print(f"    {self_us / 1000:7.2f} ms self {cumulative_us / 1000:8.2f} ms total  {name}")
+    return within
+
+
+def main(argv=None):
+    """Measure each entry point and check it against its budget"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS_MS))
+    parser.add_argument("--runs", type=int, default=5, help="imports per module")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports shown")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply every budget, e.g. 2 on a slow machine",
+    )
+    args = parser.parse_args(argv)
+
+    ok = True
+    for module in args.modules:
+        budget_ms = BUDGETS_MS.get(module, 50.0) * args.scale
+        ok &= report(module, measure(module, args.runs), budget_ms, args.top)
+        early = sorted(set(DEFERRED.get(module, [])) & loaded_modules(module))
+        if early:
+            print(f"    imported at startup but should load on demand: {', '.join(early)}")
+            ok = False
+        print()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Asyncio interface to the calculator for embedding in event loop programs
+"""
+
+import asyncio
+import functools
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from calc_engine import EvaluationTimeout, ResourceLimitError, evaluate
+from calc_engine.backends import get_backend
+from calc_engine.metrics import EvaluationMetrics
+from calc_engine.profiling import clock
+from calculator import AdvancedCalculator, split_assignment
+
+DEFAULT_WORKERS = 4
+
+EVALUATION_METRICS = EvaluationMetrics("async")
+
+
+@functools.lru_cache(maxsize=None)
+def _backend(mode: str, precision: Optional[int]):
+    return get_backend(mode, precision)
+
+
+def _evaluate_in_process(
+    text: str,
+    degrees: bool,
+    variables: Dict[str, object],
+    mode: str,
+    precision: Optional[int],
+):
+    """Evaluation run by a process executor; backends are not pickled"""
+    return evaluate(
+        text, degrees, variables=variables, backend=_backend(mode, precision)
+    )
+
+
+class AsyncCalculator:
+    """
+    Evaluates expressions for asyncio code without blocking the loop. Work
+    runs on executor: "thread", "process" or a concurrent.futures.Executor
+    (which is then not shut down by close()). At most max_concurrency
+    evaluations run at once, further calls wait their turn. A call that
+    takes longer than timeout seconds, including the wait, raises
+    EvaluationTimeout. Cancelling or timing out a call that has not started
+    removes it from the executor; one already running cannot be
+    interrupted and keeps its slot until it finishes. Threads share the
+    GIL with the loop, so long computations in one (e.g. huge factorials)
+    can still delay it; the process executor avoids this. Memory, variables
+    and ans live in calc, an AdvancedCalculator, and are only changed on
+    the loop thread.
+    """
+
+    def __init__(
+        self,
+        executor: Union[str, Executor] = "thread",
+        max_workers: int = DEFAULT_WORKERS,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        degrees: bool = True,
+        calc: Optional[AdvancedCalculator] = None,
+    ):
+        if max_workers < 1:
+            raise ValueError("An executor needs at least one worker")
+        self._owns_executor = isinstance(executor, str)
+        if executor == "thread":
+            executor = ThreadPoolExecutor(max_workers, thread_name_prefix="calc")
+        elif executor == "process":
+            import multiprocessing
+
+            from calc_engine.sandbox import START_METHOD
+
+            executor = ProcessPoolExecutor(
+                max_workers, mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        elif isinstance(executor, str):
+            raise ValueError(f"Unknown executor {executor!r}")
+        self.executor = executor
+        self.timeout = timeout
+        self.degrees = degrees
+        self.calc = calc or AdvancedCalculator()
+        self.max_concurrency = max_concurrency or max_workers
+        # Created on first use so it belongs to the running loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _submit(self, text: str, variables: Dict[str, object]):
+        backend = self.calc.backend
+        if isinstance(self.executor, ProcessPoolExecutor):
+            precision = getattr(backend, "precision", None)
+            args = (text, self.degrees, variables, backend.name, precision)
+            return self.executor.submit(_evaluate_in_process, *args)
+        return self.executor.submit(
+            evaluate, text, self.degrees, variables=variables, backend=backend
+        )
+
+    async def _run(self, submit: Callable[[], Future]):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            job = submit()
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the work itself ends, not the await
+        job.add_done_callback(functools.partial(self._release, loop))
+        return await asyncio.wrap_future(job)
+
+    def _release(self, loop: asyncio.AbstractEventLoop, job) -> None:
+        try:
+            loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            pass  # The loop has closed; nothing is waiting for the slot
+
+    async def _call(self, submit: Callable[[], Future], timeout: Optional[float]):
+        """
+        The result of the job submit() starts, under the concurrency limit
+        and timeout; errors other than budgets become ValueError
+        """
+        if timeout is None:
+            timeout = self.timeout
+        started = clock()
+        try:
+            try:
+                result = await asyncio.wait_for(self._run(submit), timeout)
+            except asyncio.TimeoutError:
+                raise EvaluationTimeout(f"Evaluation exceeded {timeout:g}s")
+            except BrokenExecutor:
+                raise ResourceLimitError("Evaluation worker exited unexpectedly")
+        except ResourceLimitError as e:
+            EVALUATION_METRICS.record(clock() - started, error=e)
+            raise
+        except Exception as e:
+            EVALUATION_METRICS.record(clock() - started, error=e)
+            raise ValueError(f"Invalid expression: {e}")
+        EVALUATION_METRICS.record(clock() - started)
+        return result
+
+    async def _compute(self, text: str, timeout: Optional[float]):
+        """Evaluate text with the session's variables, as evaluate_expression"""
+        submit = functools.partial(self._submit, text, self.calc.variable_table())
+        result = await self._call(submit, timeout)
+        if self.calc.backend.native:
+            result = float(result)
+        return result
+
+    async def evaluate(self, expression: str, timeout: Optional[float] = None):
+        """
+        Evaluate expression like calculator.evaluate_expression(): "name =
+        expression" assigns a variable and the result becomes ans
+        """
+        name, expression = split_assignment(expression)
+        result = await self._compute(expression, timeout)
+        self.calc.store_result(result, name)
+        return result
+
+    async def evaluate_many(
+        self, expression: str, *, timeout: Optional[float] = None, **arrays
+    ):
+        """
+        Evaluate one expression over arrays of values in the executor, as
+        calc_engine.evaluate_many() does, e.g. await evaluate_many("x^2 + k",
+        x=values). Names not given as arrays take the session's variables,
+        as floats; the session is left unchanged. timeout applies to the
+        whole call.
+        """
+        # Imports NumPy, so only when used
+        from calc_engine.vectorized import evaluate_many
+
+        values = {
+            name: float(value) for name, value in self.calc.variable_table().items()
+        }
+        values.update(arrays)
+        submit = functools.partial(
+            self.executor.submit,
+            evaluate_many,
+            expression.strip(),
+            self.degrees,
+            **values,
+        )
+        return await self._call(submit, timeout)
+
+    async def evaluate_all(
+        self,
+        expressions: Iterable[str],
+        timeout: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> List:
+        """
+        Evaluate several different expressions concurrently and return
+        their results in order. Unlike evaluate_many(), which evaluates one
+        expression over arrays of values, each expression is
+        evaluated on its own against the current variables, as in batch
+        mode, and the session is left unchanged. timeout applies to each
+        expression. With return_exceptions, failures are returned in place
+        of results instead of raised.
+        """
+        return await asyncio.gather(
+            *(self._compute(text.strip(), timeout) for text in expressions),
+            return_exceptions=return_exceptions,
+        )
+
+    def close(self) -> None:
+        """Shut down an executor created by this calculator"""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> "AsyncCalculator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
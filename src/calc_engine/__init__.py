@@ -0,0 +1,88 @@
+"""
+Expression engine shared by the console and GUI calculators
+
+The names in __all__ are the stable API. Front ends evaluate through
+evaluate(), or EvaluationSession.calculate() to also get sandboxing,
+float results and metrics; the other modules are implementation details.
+"""
+
+import importlib
+
+from .backends import FloatBackend, NumericBackend, get_backend
+from .cache import CacheInfo, ExpressionCache, default_cache
+from .compiler import CompiledExpression, compile_expression, compile_function
+from .context import EvaluationContext, EvaluationEngine
+from .errors import (
+    ConvergenceError,
+    EvaluationTimeout,
+    ExpressionError,
+    MemoryLimitExceeded,
+    ResourceLimitError,
+)
+from .evaluator import evaluate, evaluate_node
+from .optimizer import OptimizationStats, optimize
+from .parser import parse
+from .profiling import EvaluationProfile
+from .session import EvaluationSession
+from .tokenizer import tokenize
+
+# Names whose modules import NumPy, decimal or fractions are only loaded
+# on first access, so importing the engine stays cheap
+_LAZY = {
+    "DecimalBackend": ".arbitrary",
+    "Derivative": ".autodiff",
+    "derivative": ".autodiff",
+    "FractionBackend": ".arbitrary",
+    "Quadrature": ".quadrature",
+    "Root": ".solver",
+    "evaluate_many": ".vectorized",
+    "integrate": ".quadrature",
+    "solve": ".solver",
+    "solve_many": ".solver",
+}
+
+__all__ = [
+    "CacheInfo",
+    "CompiledExpression",
+    "ConvergenceError",
+    "DecimalBackend",
+    "Derivative",
+    "EvaluationContext",
+    "EvaluationEngine",
+    "EvaluationProfile",
+    "EvaluationSession",
+    "EvaluationTimeout",
+    "ExpressionCache",
+    "ExpressionError",
+    "FloatBackend",
+    "FractionBackend",
+    "MemoryLimitExceeded",
+    "NumericBackend",
+    "OptimizationStats",
+    "Quadrature",
+    "ResourceLimitError",
+    "Root",
+    "compile_expression",
+    "compile_function",
+    "default_cache",
+    "derivative",
+    "evaluate",
+    "evaluate_many",
+    "evaluate_node",
+    "get_backend",
+    "integrate",
+    "optimize",
+    "parse",
+    "solve",
+    "solve_many",
+    "tokenize",
+]
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,234 @@
+"""
+Arbitrary-precision numeric backends: decimal.Decimal and exact Fraction
+"""
+
+import decimal
+import math
+from contextlib import contextmanager
+from decimal import Decimal
+from fractions import Fraction
+from typing import Callable, Dict, Optional
+
+from .backends import NumericBackend
+from .functions import CONSTANTS, DEGREE_FUNCTIONS, fact, function_table, integrate
+
+DEFAULT_PRECISION = 28
+# Extra digits carried through multi-step Decimal functions before rounding
+_GUARD_DIGITS = 5
+# Fraction literals are exact up to this power of ten; beyond it, e.g.
+# 1e-999999999, the exact value would be too large to build
+_MAX_EXACT_EXPONENT = 1000
+
+_INVERSE_TRIG = ("asin", "acos", "atan")
+
+
+def _via_float(func: Callable) -> Callable:
+    """Run a float function on Decimal arguments, returning a Decimal"""
+    return lambda *args: Decimal(repr(func(*[float(arg) for arg in args])))
+
+
+def _decimal_fact(a) -> Decimal:
+    """fact() as a Decimal; non-integers go through float Gamma"""
+    result = fact(a)
+    if isinstance(result, float):
+        return Decimal(repr(result))
+    return Decimal(result)
+
+
+class DecimalBackend(NumericBackend):
+    """
+    decimal.Decimal arithmetic at a fixed number of significant digits.
+    sqrt, ln, log, exp, sin, cos and tan are computed at full precision;
+    the inverse trigonometric functions go through float.
+    """
+
+    name = "decimal"
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        super().__init__()
+        if precision < 1:
+            raise ValueError("Precision must be at least 1 digit")
+        self.precision = precision
+        self.key = (self.name, precision)
+        self.context = decimal.Context(prec=precision)
+        with decimal.localcontext(self.context):
+            pi = self._pi()
+            self.constants = {"pi": +pi, "e": Decimal(1).exp()}
+        self._pi_value = pi
+        self.tables = {True: self._table(True), False: self._table(False)}
+
+    def _table(self, degrees: bool) -> Dict[str, Callable]:
+        table = {
+            "sin": lambda a: self._trig(a, degrees, sine=True),
+            "cos": lambda a: self._trig(a, degrees, cosine=True),
+            "tan": lambda a: self._trig(a, degrees, sine=True, cosine=True),
+            "sqrt": lambda a: a.sqrt(),
+            "ln": lambda a: a.ln(),
+            "log": self._log,
+            "log10": lambda a: a.log10(),
+            "exp": lambda a: a.exp(),
+            "abs": abs,
+            "fact": _decimal_fact,
+            "gamma": _via_float(math.gamma),
+            "lgamma": _via_float(math.lgamma),
+            "integrate": self._integrate,
+        }
+        inverse = DEGREE_FUNCTIONS if degrees else function_table(False)
+        for name in _INVERSE_TRIG:
+            table[name] = _via_float(inverse[name])
+        return table
+
+    def _pi(self) -> Decimal:
+        """pi with guard digits beyond the current precision"""
+        with decimal.localcontext() as context:
+            context.prec += _GUARD_DIGITS
+            three = Decimal(3)
+            last, t, s, n, na, d, da = 0, three, three, 1, 0, 0, 24
+            while s != last:
+                last = s
+                n, na = n + na, na + 8
+                d, da = d + da, da + 32
+                t = (t * n) / d
+                s += t
+        return s
+
+    def _series(self, x: Decimal, sine: bool) -> Decimal:
+        """Taylor series for sin or cos of x in [-pi, pi]"""
+        i, last = (1, 0) if sine else (0, 0)
+        term = x if sine else Decimal(1)
+        s = term
+        while s != last:
+            last = s
+            term = -term * x * x / ((i + 1) * (i + 2))
+            i += 2
+            s += term
+        return s
+
+    def _trig(
+        self, a: Decimal, degrees: bool, sine: bool = False, cosine: bool = False
+    ) -> Decimal:
+        """sin, cos or (with both) tan, computed with guard digits"""
+        with decimal.localcontext() as context:
+            context.prec += _GUARD_DIGITS
+            pi = self._pi_value
+            if degrees:
+                a = a * pi / 180
+            # Reduce to [-pi, pi] so the series converges quickly
+            a = a % (2 * pi)
+            if a > pi:
+                a -= 2 * pi
+            elif a < -pi:
+                a += 2 * pi
+            if sine and cosine:
+                result = self._series(a, True) / self._series(a, False)
+            else:
+                result = self._series(a, sine)
+        return +result
+
+    @staticmethod
+    def _log(a: Decimal, base: Optional[Decimal] = None) -> Decimal:
+        if base is None:
+            return a.log10()
+        with decimal.localcontext() as context:
+            context.prec += _GUARD_DIGITS
+            result = a.ln() / base.ln()
+        return +result
+
+    def _integrate(self, function: Callable, a, b) -> Decimal:
+        """integrate() with float nodes; the integral is only float-accurate"""
+        number = self.number
+        value = integrate(lambda x: float(function(number(x))), float(a), float(b))
+        return number(value)
+
+    def number(self, value):
+        if isinstance(value, Decimal):
+            return value
+        if isinstance(value, int):
+            return Decimal(value)
+        if isinstance(value, Fraction):
+            return Decimal(value.numerator) / Decimal(value.denominator)
+        # The shortest repr is the literal as typed for up to 17 digits
+        return Decimal(repr(float(value)))
+
+    def literal(self, value, text: str = ""):
+        # Every digit typed, rounded to the precision, not just float's 17
+        if text and math.isfinite(value):
+            return self.context.create_decimal(text)
+        return self.number(value)
+
+    @staticmethod
+    def power(a, b):
+        return a**b
+
+    @contextmanager
+    def evaluating(self):
+        """Apply the precision and report errors like the float backend"""
+        with decimal.localcontext(self.context):
+            try:
+                yield
+            except ZeroDivisionError:
+                raise ZeroDivisionError("division by zero") from None
+            except decimal.InvalidOperation:
+                raise ValueError("math domain error") from None
+            except decimal.Overflow:
+                raise OverflowError("Result too large") from None
+
+    def __repr__(self) -> str:
+        return f"DecimalBackend(precision={self.precision})"
+
+
+def _exact_sqrt(a):
+    """Square root, exact when both parts of a fraction are perfect squares"""
+    if isinstance(a, Fraction) and a >= 0:
+        num, den = math.isqrt(a.numerator), math.isqrt(a.denominator)
+        if num * num == a.numerator and den * den == a.denominator:
+            return Fraction(num, den)
+    return math.sqrt(a)
+
+
+class FractionBackend(NumericBackend):
+    """
+    Exact rational arithmetic with fractions.Fraction. Values stay exact
+    until an irrational function or constant turns them into floats.
+    """
+
+    name = "fraction"
+
+    def __init__(self):
+        super().__init__()
+        self.constants = CONSTANTS
+        exact = {"sqrt": _exact_sqrt, "abs": abs, "fact": lambda a: Fraction(fact(a))}
+        self.tables = {
+            True: dict(function_table(True), **exact),
+            False: dict(function_table(False), **exact),
+        }
+
+    def number(self, value):
+        if isinstance(value, Fraction):
+            return value
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return value
+            return Fraction(repr(value))
+        return Fraction(value)
+
+    def literal(self, value, text: str = ""):
+        if text and math.isfinite(value):
+            exact = Decimal(text)
+            if abs(exact.adjusted()) <= _MAX_EXACT_EXPONENT:
+                return Fraction(exact)
+        return self.number(value)
+
+    @staticmethod
+    def power(a, b):
+        if isinstance(a, Fraction) and isinstance(b, Fraction) and b.denominator == 1:
+            return a**b.numerator
+        return math.pow(a, b)
+
+    @contextmanager
+    def evaluating(self):
+        """Report division by zero like the float backend"""
+        try:
+            yield
+        except ZeroDivisionError:
+            raise ZeroDivisionError("division by zero") from None
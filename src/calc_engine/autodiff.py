@@ -0,0 +1,339 @@
+"""
+Forward-mode automatic differentiation: expressions are compiled once for
+dual numbers, which carry a derivative alongside every value
+"""
+
+import math
+import numbers
+from typing import Callable, Dict, NamedTuple, Optional
+
+from .backends import NumericBackend
+from .cache import ExpressionCache, default_cache
+from .errors import ExpressionError
+from .functions import function_table, integrate, power
+from .optimizer import DEGREES_TO_RADIANS, RADIANS_TO_DEGREES
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; sequences are then done point by point
+    np = None
+
+_LN10 = math.log(10)
+# The asymptotic series for digamma is accurate to about 1e-14 from here on
+_DIGAMMA_MIN = 10
+
+
+def digamma(x: float) -> float:
+    """The digamma function, Gamma'(x) / Gamma(x)"""
+    if x <= 0 and x == math.floor(x):
+        raise ValueError("math domain error")
+    if x < 0.5:
+        # Reflection: psi(1 - x) - psi(x) = pi / tan(pi x)
+        return digamma(1 - x) - math.pi / math.tan(math.pi * x)
+    result = 0.0
+    while x < _DIGAMMA_MIN:
+        result -= 1 / x
+        x += 1
+    inverse = 1 / (x * x)
+    series = 1 / 240 - inverse / 132
+    for coefficient in (1 / 252, 1 / 120, 1 / 12):
+        series = coefficient - inverse * series
+    series *= inverse
+    return result + math.log(x) - 0.5 / x - series
+
+
+def _sign(a):
+    return (a > 0) - (a < 0)
+
+
+def _is_array(value) -> bool:
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def _nonzero(value) -> bool:
+    if _is_array(value):
+        return bool(value.any())
+    return value != 0
+
+
+_SCALAR_OPERATIONS: Dict[str, Callable] = dict(
+    function_table(False), pow=power, sign=_sign, digamma=digamma
+)
+_ARRAY_OPERATIONS: Dict[str, Callable] = {}
+
+
+def _operations(value) -> Dict[str, Callable]:
+    """Functions to apply to value: NumPy ones for arrays, else math ones"""
+    if not _is_array(value):
+        return _SCALAR_OPERATIONS
+    if not _ARRAY_OPERATIONS:
+        from .vectorized import array_functions
+
+        array_digamma = np.frompyfunc(digamma, 1, 1)
+
+        def safe_digamma(a):
+            with np.errstate(all="ignore"):
+                poles = (a <= 0) & (a == np.floor(a))
+                values = np.asarray(array_digamma(np.where(poles, 1, a)), float)
+                return np.where(poles, np.nan, values)
+
+        _ARRAY_OPERATIONS.update(
+            array_functions(False), sign=np.sign, digamma=safe_digamma
+        )
+    return _ARRAY_OPERATIONS
+
+
+class Dual:
+    """
+    A value and its derivative (slope) with respect to one variable.
+    Either part may be a NumPy array, which differentiates at many points
+    at once.
+    """
+
+    __slots__ = ("value", "slope")
+
+    def __init__(self, value, slope=0):
+        self.value = value
+        self.slope = slope
+
+    def __add__(self, other):
+        other = lift(other)
+        return Dual(self.value + other.value, self.slope + other.slope)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = lift(other)
+        return Dual(self.value - other.value, self.slope - other.slope)
+
+    def __rsub__(self, other):
+        return lift(other) - self
+
+    def __mul__(self, other):
+        other = lift(other)
+        return Dual(
+            self.value * other.value,
+            self.slope * other.value + self.value * other.slope,
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = lift(other)
+        quotient = self.value / other.value
+        if not _nonzero(other.slope):
+            return Dual(quotient, self.slope / other.value)
+        return Dual(quotient, (self.slope - quotient * other.slope) / other.value)
+
+    def __rtruediv__(self, other):
+        return lift(other) / self
+
+    def __neg__(self):
+        return Dual(-self.value, -self.slope)
+
+    def __pos__(self):
+        return self
+
+    def __pow__(self, other):
+        return dual_power(self, other)
+
+    def __rpow__(self, other):
+        return dual_power(other, self)
+
+    def __repr__(self) -> str:
+        return f"Dual({self.value!r}, {self.slope!r})"
+
+
+def lift(value) -> Dual:
+    """value as a Dual; plain numbers are constants, with slope 0"""
+    if isinstance(value, Dual):
+        return value
+    return Dual(value)
+
+
+def dual_power(a, b) -> Dual:
+    """a^b, with d(a^b) = b a^(b-1) da + a^b ln(a) db"""
+    a, b = lift(a), lift(b)
+    operations = _operations(a.value if _is_array(a.value) else b.value)
+    value = operations["pow"](a.value, b.value)
+    slope = 0
+    # Terms with a zero factor are skipped rather than computed, so constant
+    # exponents work with negative bases and x^0 has slope 0 at x = 0
+    if _nonzero(a.slope) and _nonzero(b.value):
+        slope = b.value * operations["pow"](a.value, b.value - 1) * a.slope
+    if _nonzero(b.slope):
+        slope = slope + value * operations["ln"](a.value) * b.slope
+    return Dual(value, slope)
+
+
+# Derivative of each function given its argument a and value v
+_DERIVATIVES: Dict[str, Callable] = {
+    "sin": lambda ops, a, v: ops["cos"](a),
+    "cos": lambda ops, a, v: -ops["sin"](a),
+    "tan": lambda ops, a, v: 1 + v * v,
+    "asin": lambda ops, a, v: 1 / ops["sqrt"](1 - a * a),
+    "acos": lambda ops, a, v: -1 / ops["sqrt"](1 - a * a),
+    "atan": lambda ops, a, v: 1 / (1 + a * a),
+    "sqrt": lambda ops, a, v: 0.5 / v,
+    "ln": lambda ops, a, v: 1 / a,
+    "log10": lambda ops, a, v: 1 / (a * _LN10),
+    "exp": lambda ops, a, v: v,
+    # Zero at the kink, as for other subgradient-based tools
+    "abs": lambda ops, a, v: ops["sign"](a),
+    "fact": lambda ops, a, v: v * ops["digamma"](a + 1),
+    "gamma": lambda ops, a, v: v * ops["digamma"](a),
+    "lgamma": lambda ops, a, v: ops["digamma"](a),
+}
+
+
+def _chain(name: str) -> Callable:
+    """Dual version of a one-argument engine function, by the chain rule"""
+    derivative = _DERIVATIVES[name]
+
+    def function(x):
+        x = lift(x)
+        operations = _operations(x.value)
+        value = operations[name](x.value)
+        if not _nonzero(x.slope):
+            return Dual(value)
+        return Dual(value, derivative(operations, x.value, value) * x.slope)
+
+    return function
+
+
+def _dual_integrate(function: Callable, a, b) -> Dual:
+    """
+    integrate() of Dual values. By the Leibniz rule the slope is the
+    integral of the integrand's slope plus f(b) b' - f(a) a'.
+    """
+    a, b = lift(a), lift(b)
+    value = integrate(lambda x: lift(function(x)).value, a.value, b.value)
+    slope = integrate(lambda x: lift(function(x)).slope, a.value, b.value)
+    if _nonzero(b.slope):
+        slope += lift(function(b.value)).value * b.slope
+    if _nonzero(a.slope):
+        slope -= lift(function(a.value)).value * a.slope
+    return Dual(value, slope)
+
+
+def _dual_table(degrees: bool) -> Dict[str, Callable]:
+    table = {name: _chain(name) for name in _DERIVATIVES}
+    table["integrate"] = _dual_integrate
+    ln = table["ln"]
+
+    def log(a, base=None):
+        if base is None:
+            return table["log10"](a)
+        return ln(a) / ln(base)
+
+    table["log"] = log
+    if degrees:
+        # Converting the angle with Dual arithmetic applies the chain-rule
+        # factor pi/180 (or 180/pi) to the slope
+        radian = dict(table)
+        for name in ("sin", "cos", "tan"):
+            table[name] = lambda a, f=radian[name]: f(lift(a) * DEGREES_TO_RADIANS)
+        for name in ("asin", "acos", "atan"):
+            table[name] = lambda a, f=radian[name]: f(a) * RADIANS_TO_DEGREES
+    return table
+
+
+class DualBackend(NumericBackend):
+    """Computes with Dual numbers, giving each result's derivative too"""
+
+    name = "dual"
+
+    def __init__(self):
+        super().__init__()
+        self.constants = {"pi": Dual(math.pi), "e": Dual(math.e)}
+        self.tables = {True: _dual_table(True), False: _dual_table(False)}
+
+    def number(self, value):
+        return lift(value)
+
+    power = staticmethod(dual_power)
+
+
+DUAL = DualBackend()
+
+
+class Derivative(NamedTuple):
+    """An expression's value and its derivative with respect to one variable"""
+
+    value: object
+    slope: object
+
+
+def derivative(
+    expression: str,
+    variable: str,
+    degrees: bool = True,
+    cache: Optional[ExpressionCache] = None,
+    **values,
+) -> Derivative:
+    """
+    Evaluate expression and its derivative with respect to variable in one
+    pass, e.g. derivative("x^2 * sin(x)", "x", x=2) or, with an array of
+    points, derivative("sin(x)", "x", x=np.linspace(0, 90, 10)). The
+    expression is compiled once for dual numbers. Array values give arrays
+    of values and slopes, with nan outside a function's domain; without
+    NumPy, sequences give lists.
+    """
+    if variable not in values:
+        raise ExpressionError(f"No value given for {variable!r}")
+    if cache is None:
+        cache = default_cache
+    compiled = cache.get(expression, degrees, DUAL)
+    # Other number types, e.g. Decimal and Fraction variables, are scalars
+    values = {
+        name: _scalar(value) if isinstance(value, numbers.Number) else value
+        for name, value in values.items()
+    }
+    arrays = {
+        name: value
+        for name, value in values.items()
+        if not isinstance(value, (int, float))
+    }
+    if not arrays:
+        result = _evaluate(compiled, variable, values)
+        return Derivative(result.value, result.slope)
+    if np is None:
+        return _derivative_python(compiled, variable, values, arrays)
+    values = dict(values, **{name: np.asarray(a, float) for name, a in arrays.items()})
+    with np.errstate(all="ignore"):
+        result = _evaluate(compiled, variable, values)
+    shape = np.broadcast(*values.values()).shape
+    return Derivative(
+        np.broadcast_to(result.value, shape).astype(float),
+        np.broadcast_to(result.slope, shape).astype(float),
+    )
+
+
+def _scalar(value) -> float:
+    return value if isinstance(value, (int, float)) else float(value)
+
+
+def _evaluate(compiled, variable: str, values: dict) -> Dual:
+    values = dict(values)
+    values[variable] = Dual(values[variable], 1)
+    return lift(compiled.evaluate(**values))
+
+
+def _derivative_python(compiled, variable: str, values: dict, arrays: dict):
+    """derivative() at each point in turn, for when NumPy is missing"""
+    columns = {name: list(array) for name, array in arrays.items()}
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All arrays must have the same length")
+    results = Derivative([], [])
+    for index in range(lengths.pop()):
+        point = dict(values)
+        point.update((name, column[index]) for name, column in columns.items())
+        try:
+            result = _evaluate(compiled, variable, point)
+            value, slope = float(result.value), float(result.slope)
+        except (ValueError, ZeroDivisionError):
+            value = slope = math.nan
+        results.value.append(value)
+        results.slope.append(slope)
+    return results
@@ -0,0 +1,88 @@
+"""
+Numeric backends deciding how numbers are represented during evaluation
+"""
+
+from contextlib import nullcontext
+from typing import Callable, Dict, Hashable, Optional
+
+from .functions import CONSTANTS, function_table, power
+
+
+class NumericBackend:
+    """
+    Base class for backends. A backend converts literals and variables to
+    its number type and supplies the constants, operators and functions
+    used on them.
+    """
+
+    name = ""
+    # Native backends compute with plain int and float values, so compiled
+    # code needs no conversions and constants can be folded ahead of time
+    native = False
+
+    def __init__(self):
+        self.key: Hashable = self.name
+        self.constants: Dict[str, object] = {}
+        self.tables: Dict[bool, Dict[str, Callable]] = {}
+
+    def number(self, value):
+        """Convert an int, float or other backend's number to this backend"""
+        raise NotImplementedError
+
+    def literal(self, value, text: str = ""):
+        """
+        A numeric literal: value as the tokenizer parsed it and, for
+        non-integers, the text it was parsed from
+        """
+        return self.number(value)
+
+    def power(self, a, b):
+        """Exponentiation"""
+        raise NotImplementedError
+
+    def functions(self, degrees: bool) -> Dict[str, Callable]:
+        """Function implementations for the given angle mode"""
+        return self.tables[degrees]
+
+    def evaluating(self):
+        """Context manager to run evaluations in"""
+        return nullcontext()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class FloatBackend(NumericBackend):
+    """Machine floats, with integers kept exact where possible; the default"""
+
+    name = "float"
+    native = True
+
+    def __init__(self):
+        super().__init__()
+        self.constants = CONSTANTS
+        self.tables = {True: function_table(True), False: function_table(False)}
+
+    def number(self, value):
+        return value
+
+    power = staticmethod(power)
+
+
+FLOAT = FloatBackend()
+
+BACKENDS = ("float", "decimal", "fraction")
+
+
+def get_backend(name: str, precision: Optional[int] = None) -> NumericBackend:
+    """Return the backend called name; precision only applies to decimal"""
+    if name == "float":
+        return FLOAT
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown numeric backend {name!r}")
+    # The decimal and fractions modules are only imported when needed
+    from .arbitrary import DEFAULT_PRECISION, DecimalBackend, FractionBackend
+
+    if name == "decimal":
+        return DecimalBackend(precision or DEFAULT_PRECISION)
+    return FractionBackend()
@@ -0,0 +1,292 @@
+"""
+Streaming evaluation of many expressions, spread over worker processes
+"""
+
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .backends import FLOAT, NumericBackend, get_backend
+from .cache import default_cache
+from .evaluator import evaluate, evaluate_node
+from .parser import parse
+
+DEFAULT_CHUNK_SIZE = 1024
+DEFAULT_CHUNK_BYTES = 1 << 18
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Prefix of an output line for an expression that failed
+ERROR_PREFIX = "Error: "
+
+# Compiling costs more than a single tree walk, so an expression is only
+# compiled (and cached) once it is seen a second time, or if it was loaded
+# into the cache from a file
+_SEEN_LIMIT = 1 << 16
+_seen: Set[Tuple[str, bool]] = set()
+
+# Angle mode and backend of a worker process, set by _init_worker
+_settings: Tuple = (True, None)
+
+# Input files mapped by a worker process, by path
+_maps: Dict[str, Union[mmap.mmap, bytes]] = {}
+
+# Output of a chunk: its text, number of lines and number of failures
+Block = Tuple[str, int, int]
+
+
+def _init_worker(degrees: bool, mode: str, precision: Optional[int]) -> None:
+    """Build the worker's backend once rather than pickling it per chunk"""
+    global _settings
+    _settings = (degrees, get_backend(mode, precision))
+
+
+def _lines_in_worker(lines: List[str]) -> Block:
+    return evaluate_block(lines, *_settings)
+
+
+def _data_in_worker(data: bytes) -> Block:
+    return evaluate_block(decode_lines(data), *_settings)
+
+
+def _range_in_worker(task: Tuple[str, int, int]) -> Block:
+    path, start, end = task
+    mapped = _maps.get(path)
+    if mapped is None:
+        mapped = _maps[path] = map_file(path)
+    return evaluate_block(decode_lines(mapped[start:end]), *_settings)
+
+
+def format_result(value) -> str:
+    """Text written for one result"""
+    return str(value)
+
+
+def _evaluate_once(text: str, degrees: bool, backend: NumericBackend):
+    """Evaluate text, compiling it only if it has been seen before"""
+    key = (text, degrees)
+    if key in _seen or (text, degrees, backend) in default_cache:
+        return evaluate(text, degrees, backend=backend)
+    if len(_seen) >= _SEEN_LIMIT:
+        _seen.clear()
+    _seen.add(key)
+    if backend.native:
+        return evaluate_node(parse(text), degrees)
+    with backend.evaluating():
+        return evaluate_node(parse(text), degrees, backend=backend)
+
+
+def evaluate_lines(
+    lines: Iterable[str], degrees: bool = True, backend: Optional[NumericBackend] = None
+) -> Tuple[List[str], int]:
+    """
+    Evaluate one expression per line, returning one output line each and
+    the number of failures. Blank lines give blank output lines.
+    """
+    backend = backend or FLOAT
+    output = []
+    errors = 0
+    for line in lines:
+        text = line.strip()
+        if not text:
+            output.append("")
+            continue
+        try:
+            output.append(format_result(_evaluate_once(text, degrees, backend)))
+        except Exception as e:
+            output.append(f"{ERROR_PREFIX}{e}")
+            errors += 1
+    return output, errors
+
+
+def evaluate_block(
+    lines: Iterable[str], degrees: bool = True, backend: Optional[NumericBackend] = None
+) -> Block:
+    """evaluate_lines() with the output joined into one newline-ended text"""
+    output, errors = evaluate_lines(lines, degrees, backend)
+    count = len(output)
+    output.append("")
+    return "\n".join(output) if count else "", count, errors
+
+
+def decode_lines(data: bytes) -> List[str]:
+    """
+    Decode a run of whole UTF-8 lines. Invalid bytes become U+FFFD, which
+    no expression may contain, so only their own lines are reported as
+    errors.
+    """
+    if not data:
+        return []
+    lines = data.decode("utf-8", errors="replace").split("\n")
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def map_file(path: str) -> Union[mmap.mmap, bytes]:
+    """Memory-map a file read-only"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def line_ranges(data, chunk_bytes: int) -> Iterator[Tuple[int, int]]:
+    """
+    Split a buffer into byte ranges of about chunk_bytes that each end
+    just after a newline, without copying or decoding it
+    """
+    size = len(data)
+    start = 0
+    while start < size:
+        end = start + chunk_bytes
+        if end >= size:
+            end = size
+        else:
+            newline = data.find(b"\n", end - 1)
+            end = size if newline < 0 else newline + 1
+        yield start, end
+        start = end
+
+
+def read_blocks(stream: BinaryIO, chunk_bytes: int) -> Iterator[bytes]:
+    """Read a binary stream in blocks of whole lines"""
+    while True:
+        data = stream.read(chunk_bytes)
+        if not data:
+            return
+        if not data.endswith(b"\n"):
+            data += stream.readline()
+        yield data
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Group lines into lists of up to size lines, reading lazily"""
+    iterator = iter(lines)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchEvaluator:
+    """
+    Evaluates a stream of expressions in order. With more than one worker,
+    chunks are dispatched to a process pool; at most max_pending chunks are
+    in flight, so memory stays bounded however long the input.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        degrees: bool = True,
+        mode: str = "float",
+        precision: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    ):
+        if chunk_size < 1 or chunk_bytes < 1:
+            raise ValueError("Chunk size must be at least 1")
+        if workers is not None and workers < 1:
+            raise ValueError("A batch needs at least one worker")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.chunk_bytes = chunk_bytes
+        self.max_pending = max_pending or 2 * self.workers
+        self.degrees = degrees
+        self.settings = (degrees, mode, precision)
+        # Also fails on a bad mode here rather than in every worker
+        self.backend = get_backend(mode, precision)
+        self.errors = 0
+        self.count = 0
+
+    def _results(
+        self, tasks: Iterable, local: Callable, remote: Callable
+    ) -> Iterator[str]:
+        """
+        Yield the output text of each task, in input order. local runs a
+        task in this process and remote runs it in a worker.
+        """
+        if self.workers == 1:
+            for task in tasks:
+                yield self._collect(local(task))
+            return
+        with ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=self.settings
+        ) as pool:
+            pending: deque = deque()
+            for task in tasks:
+                pending.append(pool.submit(remote, task))
+                if len(pending) >= self.max_pending:
+                    yield self._collect(pending.popleft().result())
+            while pending:
+                yield self._collect(pending.popleft().result())
+
+    def _collect(self, block: Block) -> str:
+        text, count, errors = block
+        self.count += count
+        self.errors += errors
+        return text
+
+    def _evaluate_data(self, data: bytes) -> Block:
+        return evaluate_block(decode_lines(data), self.degrees, self.backend)
+
+    def evaluate(self, lines: Iterable[str]) -> Iterator[str]:
+        """Yield one output line per input line"""
+        blocks = self._results(
+            _chunks(lines, self.chunk_size),
+            lambda chunk: evaluate_block(chunk, self.degrees, self.backend),
+            _lines_in_worker,
+        )
+        for text in blocks:
+            yield from text.split("\n")[:-1]
+
+    def run(self, source: BinaryIO, destination: BinaryIO) -> int:
+        """
+        Evaluate a binary stream of UTF-8 lines into destination and return
+        the number of failures. Lines are only decoded by the workers.
+        """
+        blocks = self._results(
+            read_blocks(source, self.chunk_bytes), self._evaluate_data, _data_in_worker
+        )
+        for text in blocks:
+            destination.write(text.encode("utf-8"))
+        return self.errors
+
+    def run_file(self, path: str, destination: BinaryIO) -> int:
+        """
+        Evaluate a file into destination and return the number of failures.
+        The file is memory-mapped and split into line-aligned byte ranges;
+        workers map it themselves, so only offsets cross process boundaries.
+        """
+        mapped = map_file(path)
+        path = os.path.abspath(path)
+        ranges = line_ranges(mapped, self.chunk_bytes)
+        try:
+            blocks = self._results(
+                ((path, start, end) for start, end in ranges),
+                lambda task: self._evaluate_data(mapped[task[1] : task[2]]),
+                _range_in_worker,
+            )
+            for text in blocks:
+                destination.write(text.encode("utf-8"))
+        finally:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        return self.errors
@@ -0,0 +1,175 @@
+"""
+Bounded LRU cache of compiled expressions
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional, Tuple
+
+from .backends import FLOAT, NumericBackend
+from .compiler import CompiledExpression, compile_expression
+from .profiling import EvaluationProfile
+
+DEFAULT_CAPACITY = 4096
+# Environment variable naming the file the front ends keep compiled code in
+CACHE_FILE_VARIABLE = "CALC_CACHE_FILE"
+
+
+class CacheInfo(NamedTuple):
+    """Snapshot of cache statistics"""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    capacity: int
+
+
+class ExpressionCache:
+    """
+    Maps normalized expression text, angle mode and numeric backend to
+    compiled expressions, evicting the least recently used entry once
+    capacity is reached
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 0:
+            raise ValueError("Cache capacity must be non-negative")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: (
+            "OrderedDict[Tuple[str, bool, Hashable], CompiledExpression]"
+        ) = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize expression text for use as a cache key"""
+        return text.strip()
+
+    def get(
+        self,
+        text: str,
+        degrees: bool = True,
+        backend: Optional[NumericBackend] = None,
+        profile: Optional[EvaluationProfile] = None,
+    ) -> CompiledExpression:
+        """
+        Return the compiled form of text, compiling it on a miss; profile
+        receives the compilation stage times
+        """
+        backend = backend or FLOAT
+        key = (self.normalize(text), degrees, backend.key)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        # Compile outside the lock; a concurrent miss may compile twice
+        compiled = compile_expression(
+            key[0], degrees, backend=backend, profile=profile
+        )
+        with self._lock:
+            if self.capacity:
+                self._entries[key] = compiled
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return compiled
+
+    def resize(self, capacity: int) -> None:
+        """Change the capacity, evicting entries if it shrinks"""
+        if capacity < 0:
+            raise ValueError("Cache capacity must be non-negative")
+        with self._lock:
+            self.capacity = capacity
+            while len(self._entries) > capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        """Return current hit, miss and eviction counters"""
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.evictions, len(self._entries), self.capacity
+            )
+
+    def save(self, path: str) -> int:
+        """
+        Save the compiled float-mode entries to path, least recently used
+        first; return the number saved
+        """
+        from .persist import save_compiled
+
+        with self._lock:
+            entries = list(self._entries.values())
+        return save_compiled(path, entries)
+
+    def load(self, path: str) -> int:
+        """
+        Add entries saved with save() without recompiling them; return the
+        number loaded. Unreadable or outdated files are ignored.
+        """
+        from .persist import load_compiled
+
+        entries = load_compiled(path)
+        with self._lock:
+            for compiled in entries:
+                key = (compiled.text, compiled.degrees, compiled.backend.key)
+                self._entries[key] = compiled
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return len(entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple) -> bool:
+        """Check for (text, degrees) or (text, degrees, backend)"""
+        text, degrees, *backend = key
+        backend_key = backend[0].key if backend else FLOAT.key
+        return (self.normalize(text), degrees, backend_key) in self._entries
+
+
+default_cache = ExpressionCache()
+
+
+class CacheFile:
+    """
+    The compile cache file a front end was started with: cache is loaded
+    from it now and saved back to it by close(). path defaults to the
+    CALC_CACHE_FILE environment variable; with neither set, nothing is
+    loaded or saved.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, cache: Optional[ExpressionCache] = None
+    ):
+        if path is None:
+            path = os.environ.get(CACHE_FILE_VARIABLE) or None
+        self.path = path
+        self.cache = default_cache if cache is None else cache
+        self.loaded = self.cache.load(path) if path else 0
+
+    def close(self) -> int:
+        """Save the cache to the file; return the number of entries saved"""
+        if not self.path:
+            return 0
+        try:
+            return self.cache.save(self.path)
+        except OSError:
+            # A read-only location only costs the next start its head start
+            return 0
@@ -0,0 +1,341 @@
+"""
+Compilation of parsed expressions into ready-to-run Python functions
+"""
+
+import math
+import re
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from .backends import FLOAT, NumericBackend
+from .errors import ExpressionError
+from .functions import CONSTANTS
+from .nodes import BinOp, Call, Integral, Name, Node, Number, UnaryOp
+from .optimizer import OptimizationStats
+from .optimizer import optimize as optimize_tree
+from .parser import Parser, parse
+from .profiling import EvaluationProfile, clock
+from .tokenizer import tokenize
+
+# Generated code only references prefixed names, so user variables (V_*)
+# can never shadow engine functions (F_*) or constants (K_*).
+_FUNCTION_PREFIX = "F_"
+_VARIABLE_PREFIX = "V_"
+_LITERAL_PREFIX = "L"
+
+# Bump whenever generated code or function semantics change, so code
+# saved by an older engine is not reused
+ENGINE_VERSION = "1"
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z_0-9]*")
+
+
+def _namespace(backend: NumericBackend, degrees: bool) -> Dict[str, object]:
+    """Build the globals used to run code compiled for an angle mode"""
+    namespace = {
+        "__builtins__": {},
+        "F_pow": backend.power,
+        "K_inf": math.inf,
+        "K_nan": math.nan,
+    }
+    for name, func in backend.functions(degrees).items():
+        namespace[_FUNCTION_PREFIX + name] = func
+    return namespace
+
+
+_NAMESPACES = {True: _namespace(FLOAT, True), False: _namespace(FLOAT, False)}
+
+
+def generate_source(
+    node: Node,
+    variables: List[str],
+    shared: Optional[Set[Hashable]] = None,
+    literals: Optional[List[Node]] = None,
+) -> str:
+    """
+    Translate an AST into a Python expression string. Subtrees whose keys
+    are in shared are computed once into a temporary with := and reused.
+    If a literals list is given, numbers and constants are appended to it
+    and referenced by name, so they can be bound as another number type.
+    Integrals become a lambda of their variable passed to F_integrate.
+    """
+    temporaries: Dict[Hashable, str] = {}
+    # Variables of the integrals being emitted, innermost last
+    bound: List[str] = []
+
+    def literal(node: Node) -> str:
+        literals.append(node)
+        return f"{_LITERAL_PREFIX}{len(literals) - 1}"
+
+    def emit(node: Node) -> Tuple[str, Hashable]:
+        kind = type(node)
+        if kind is Number:
+            value = node.value
+            key = (Number, type(value), value, node.text)
+            if literals is not None:
+                return literal(node), key
+            if isinstance(value, float) and not math.isfinite(value):
+                if math.isnan(value):
+                    return "K_nan", key
+                return ("K_inf" if value > 0 else "(-K_inf)"), key
+            return repr(value), key
+        if kind is Name:
+            key = (Name, node.name)
+            if node.name in CONSTANTS:
+                if literals is not None:
+                    return literal(node), key
+                return repr(CONSTANTS[node.name]), key
+            if node.name not in variables and node.name not in bound:
+                variables.append(node.name)
+            return _VARIABLE_PREFIX + node.name, key
+        if kind is BinOp:
+            left, left_key = emit(node.left)
+            right, right_key = emit(node.right)
+            key = (BinOp, node.op, left_key, right_key)
+            if node.op == "^":
+                source = f"F_pow({left}, {right})"
+            else:
+                source = f"({left} {node.op} {right})"
+        elif kind is Call:
+            emitted = [emit(arg) for arg in node.args]
+            key = (Call, node.func, tuple(arg_key for _, arg_key in emitted))
+            args = ", ".join(arg for arg, _ in emitted)
+            source = f"{_FUNCTION_PREFIX}{node.func}({args})"
+        elif kind is UnaryOp:
+            operand, operand_key = emit(node.operand)
+            key = (UnaryOp, node.op, operand_key)
+            source = f"(-{operand})"
+        elif kind is Integral:
+            low, low_key = emit(node.low)
+            high, high_key = emit(node.high)
+            bound.append(node.variable)
+            body, body_key = emit(node.body)
+            bound.pop()
+            key = (Integral, node.variable, body_key, low_key, high_key)
+            parameter = _VARIABLE_PREFIX + node.variable
+            source = f"F_integrate((lambda {parameter}: {body}), {low}, {high})"
+        else:
+            raise ExpressionError(f"Unsupported node {node!r}")
+        if shared and key in shared and not bound:
+            # Operands are emitted before the operator that uses them, so the
+            # first occurrence in the source is also the first one evaluated
+            name = temporaries.get(key)
+            if name is not None:
+                return name, key
+            name = temporaries[key] = f"T{len(temporaries)}"
+            return f"({name} := {source})", key
+        return source, key
+
+    return emit(node)[0]
+
+
+class CompiledExpression:
+    """An expression parsed and compiled once, ready to be run many times"""
+
+    __slots__ = (
+        "text",
+        "degrees",
+        "backend",
+        "_tree",
+        "code_degrees",
+        "stats",
+        "variables",
+        "source",
+        "literals",
+        "code",
+        "function",
+        "vector_function",
+    )
+
+    def __init__(
+        self,
+        text: str,
+        degrees: bool,
+        tree: Node,
+        params: Optional[Sequence[str]] = None,
+        optimize: bool = True,
+        backend: Optional[NumericBackend] = None,
+        profile: Optional[EvaluationProfile] = None,
+    ):
+        self.text = text
+        self.degrees = degrees
+        self.backend = backend = backend or FLOAT
+        started = clock()
+        shared = None
+        self.stats: Optional[OptimizationStats] = None
+        if optimize:
+            # Constants are folded with floats, so only for native backends;
+            # the folded tree has its angle conversions made explicit
+            tree, shared, self.stats = optimize_tree(tree, degrees, backend.native)
+            if backend.native:
+                degrees = False
+        optimized = clock()
+        self._tree: Optional[Node] = tree
+        self.code_degrees = degrees
+        variables: List[str] = []
+        literals = None if backend.native else []
+        body = generate_source(tree, variables, shared, literals)
+        self.literals = tuple(self._literal(node) for node in literals or ())
+        if params is not None:
+            unknown = [name for name in variables if name not in params]
+            if unknown:
+                raise ExpressionError(f"Unknown name {unknown[0]!r}")
+            variables = list(params)
+        self.variables: Tuple[str, ...] = tuple(variables)
+        params = ", ".join(_VARIABLE_PREFIX + name for name in self.variables)
+        self.source = f"lambda {params}: {body}"
+        try:
+            self.code = compile(self.source, "<expression>", "eval")
+        except (RecursionError, SyntaxError, MemoryError):
+            # Too deeply nested for the Python compiler; walk the tree instead
+            self.code = None
+        self.function: Callable = self._build()
+        self.vector_function: Optional[Callable] = None
+        if profile is not None:
+            profile.add("optimize", optimized - started)
+            profile.add("compile", clock() - optimized)
+
+    @classmethod
+    def restore(
+        cls,
+        text: str,
+        degrees: bool,
+        code_degrees: bool,
+        stats: Optional[Tuple[int, int, int]],
+        variables: Tuple[str, ...],
+        source: str,
+        code,
+    ) -> "CompiledExpression":
+        """
+        Rebuild a float-backend expression from previously compiled code,
+        without parsing; the tree is only rebuilt if it is asked for
+        """
+        compiled = cls.__new__(cls)
+        compiled.text = text
+        compiled.degrees = degrees
+        compiled.backend = FLOAT
+        compiled._tree = None
+        compiled.code_degrees = code_degrees
+        compiled.stats = OptimizationStats(*stats) if stats is not None else None
+        compiled.variables = variables
+        compiled.source = source
+        compiled.literals = ()
+        compiled.code = code
+        compiled.function = compiled._build()
+        compiled.vector_function = None
+        return compiled
+
+    @property
+    def tree(self) -> Node:
+        """The tree the code was generated from"""
+        if self._tree is None:
+            tree = parse(self.text)
+            if self.stats is not None:
+                tree = optimize_tree(tree, self.degrees, self.backend.native)[0]
+            self._tree = tree
+        return self._tree
+
+    def _literal(self, node: Node):
+        """Value of a number or constant in the backend's number type"""
+        if type(node) is Name:
+            return self.backend.constants[node.name]
+        return self.backend.literal(node.value, node.text)
+
+    def _build(self) -> Callable:
+        """Bind the compiled code to the scalar function namespace"""
+        backend = self.backend
+        if self.code is None:
+            from .evaluator import evaluate_node
+
+            tree, degrees, names = self.tree, self.code_degrees, self.variables
+
+            def function(*args):
+                return evaluate_node(tree, degrees, dict(zip(names, args)), backend)
+
+        elif backend.native:
+            return self.bind(_NAMESPACES[self.code_degrees])
+        else:
+            namespace = _namespace(backend, self.code_degrees)
+            for index, value in enumerate(self.literals):
+                namespace[f"{_LITERAL_PREFIX}{index}"] = value
+            function = self.bind(namespace)
+        if backend.native:
+            return function
+        number = backend.number
+
+        def run(*args):
+            with backend.evaluating():
+                return function(*[number(arg) for arg in args])
+
+        return run
+
+    def bind(self, namespace: Dict[str, object]) -> Callable:
+        """
+        Bind the compiled code to another namespace providing the same F_*
+        names, e.g. array implementations of each function
+        """
+        if self.code is None:
+            raise ExpressionError("Expression is too deeply nested to compile")
+        return eval(self.code, namespace)
+
+    def evaluate(self, **variables):
+        """Run the compiled expression"""
+        if not self.variables:
+            return self.function()
+        try:
+            args = [variables[name] for name in self.variables]
+        except KeyError as e:
+            raise ExpressionError(f"Unknown name {e.args[0]!r}") from None
+        return self.function(*args)
+
+    def __call__(self, *args):
+        """Run the compiled expression with positional parameter values"""
+        return self.function(*args)
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.text!r}, degrees={self.degrees})"
+
+
+def compile_expression(
+    text: str,
+    degrees: bool = True,
+    optimize: bool = True,
+    backend: Optional[NumericBackend] = None,
+    profile: Optional[EvaluationProfile] = None,
+) -> CompiledExpression:
+    """
+    Parse and compile an expression without consulting any cache. If a
+    profile is given, the time taken by each stage is added to it.
+    """
+    if profile is None:
+        tree = parse(text)
+    else:
+        started = clock()
+        tokens = tokenize(text)
+        tokenized = clock()
+        tree = Parser(tokens).parse()
+        profile.add("tokenize", tokenized - started)
+        profile.add("parse", clock() - tokenized)
+    return CompiledExpression(
+        text, degrees, tree, optimize=optimize, backend=backend, profile=profile
+    )
+
+
+def compile_function(
+    text: str,
+    params: Sequence[str],
+    degrees: bool = True,
+    optimize: bool = True,
+    backend: Optional[NumericBackend] = None,
+) -> CompiledExpression:
+    """
+    Compile an expression into a callable taking params positionally, e.g.
+    compile_function("x^2 + y*sin(x)", params=["x", "y"])(3, 1). The
+    expression is parsed once; calls only bind arguments.
+    """
+    for name in params:
+        if not _IDENTIFIER_RE.fullmatch(name):
+            raise ExpressionError(f"Invalid parameter name {name!r}")
+        if name in CONSTANTS:
+            raise ExpressionError(f"Cannot use constant {name!r} as a parameter")
+    if len(set(params)) != len(params):
+        raise ExpressionError("Duplicate parameter names")
+    return CompiledExpression(text, degrees, parse(text), params, optimize, backend)
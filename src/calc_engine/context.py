@@ -0,0 +1,116 @@
+"""
+Shared, immutable engine state and cheap per-request evaluation state, so
+many threads can evaluate at once without sharing a calculator
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+from .backends import FLOAT, NumericBackend
+from .cache import ExpressionCache, default_cache
+from .compiler import CompiledExpression
+
+# Compiled expressions each thread keeps in front of the shared cache
+DEFAULT_LOCAL_CAPACITY = 256
+
+
+class EvaluationContext:
+    """
+    Everything one calculation may change: the angle mode, variables, the
+    last result (ans) and memory. Contexts are small enough to create per
+    request; each belongs to one thread at a time.
+    """
+
+    __slots__ = ("degrees", "variables", "last_result", "memory")
+
+    def __init__(
+        self,
+        variables: Optional[Dict[str, float]] = None,
+        degrees: bool = True,
+        last_result=0,
+        memory=0,
+    ):
+        self.degrees = degrees
+        self.variables = {} if variables is None else variables
+        self.last_result = last_result
+        self.memory = memory
+
+    def variable_table(self) -> dict:
+        """Variables visible to expressions, including ans"""
+        return dict(self.variables, ans=self.last_result)
+
+    def copy(self) -> "EvaluationContext":
+        """An independent context with the same values"""
+        return EvaluationContext(
+            dict(self.variables), self.degrees, self.last_result, self.memory
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"EvaluationContext(variables={self.variables!r}, "
+            f"degrees={self.degrees}, last_result={self.last_result!r})"
+        )
+
+
+class EvaluationEngine:
+    """
+    A numeric backend and compiled-expression cache that any number of
+    threads may use together. Its attributes cannot be changed, and
+    evaluate() only writes to the context it is given, so no locking is
+    needed around it. Each thread also keeps up to local_capacity compiled
+    expressions of its own, so repeated expressions are found without
+    taking the shared cache's lock.
+    """
+
+    __slots__ = ("backend", "cache", "local_capacity", "_local")
+
+    def __init__(
+        self,
+        backend: Optional[NumericBackend] = None,
+        cache: Optional[ExpressionCache] = None,
+        local_capacity: int = DEFAULT_LOCAL_CAPACITY,
+    ):
+        if local_capacity < 0:
+            raise ValueError("Cache capacity must be non-negative")
+        set_attribute = object.__setattr__
+        set_attribute(self, "backend", backend or FLOAT)
+        set_attribute(self, "cache", default_cache if cache is None else cache)
+        set_attribute(self, "local_capacity", local_capacity)
+        set_attribute(self, "_local", threading.local())
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def compiled(self, text: str, degrees: bool = True) -> CompiledExpression:
+        """The compiled form of text, from this thread's table if possible"""
+        key: Tuple[str, bool] = (text, degrees)
+        try:
+            table = self._local.table
+        except AttributeError:
+            table = self._local.table = {}
+        compiled = table.get(key)
+        if compiled is None:
+            compiled = self.cache.get(text, degrees, self.backend)
+            if self.local_capacity:
+                if len(table) >= self.local_capacity:
+                    # Dicts keep insertion order, so this is the oldest
+                    del table[next(iter(table))]
+                table[key] = compiled
+        return compiled
+
+    def evaluate(self, text: str, context: Optional[EvaluationContext] = None):
+        """
+        Evaluate text with context's angle mode and variables and make the
+        result its last result; without a context, in degrees and with no
+        variables
+        """
+        if context is None:
+            return self.compiled(text).evaluate()
+        result = self.compiled(text, context.degrees).evaluate(
+            **context.variable_table()
+        )
+        context.last_result = result
+        return result
+
+    def __repr__(self) -> str:
+        return f"EvaluationEngine(backend={self.backend.name!r})"
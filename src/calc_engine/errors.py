@@ -0,0 +1,29 @@
+"""
+Exceptions raised by the expression engine
+"""
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be tokenized, parsed or resolved"""
+
+    def __init__(self, message: str, position: int = -1):
+        if position >= 0:
+            message = f"{message} at position {position}"
+        super().__init__(message)
+        self.position = position
+
+
+class ResourceLimitError(ExpressionError):
+    """Raised when an evaluation exceeds its time or memory budget"""
+
+
+class EvaluationTimeout(ResourceLimitError):
+    """Raised when an evaluation runs longer than its wall-clock budget"""
+
+
+class MemoryLimitExceeded(ResourceLimitError):
+    """Raised when an evaluation needs more memory than its budget"""
+
+
+class ConvergenceError(ExpressionError):
+    """Raised when an iterative method, such as the solver, does not converge"""
@@ -0,0 +1,112 @@
+"""
+Tree-walking evaluation of parsed expressions
+"""
+
+from typing import Callable, Dict, Optional
+
+from .backends import FLOAT, NumericBackend
+from .cache import ExpressionCache, default_cache
+from .errors import ExpressionError
+from .nodes import BinOp, Call, Integral, Name, Node, Number, UnaryOp
+from .profiling import EvaluationProfile, clock
+
+
+def _binary(op: str, a, b, power: Callable):
+    """Apply a binary operator"""
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        return a / b
+    return power(a, b)
+
+
+def evaluate_node(
+    node: Node,
+    degrees: bool = True,
+    variables: Optional[Dict[str, float]] = None,
+    backend: Optional[NumericBackend] = None,
+):
+    """Evaluate an AST node, with numbers of the given backend's type"""
+    backend = backend or FLOAT
+    functions = backend.functions(degrees)
+    power = backend.power
+    literal = backend.literal
+    constants = backend.constants
+    variables = variables or {}
+
+    def visit(node: Node):
+        kind = type(node)
+        if kind is Number:
+            return literal(node.value, node.text)
+        if kind is BinOp:
+            return _binary(node.op, visit(node.left), visit(node.right), power)
+        if kind is Call:
+            func: Callable = functions[node.func]
+            return func(*[visit(arg) for arg in node.args])
+        if kind is UnaryOp:
+            return -visit(node.operand)
+        if kind is Name:
+            if node.name in variables:
+                return variables[node.name]
+            if node.name in constants:
+                return constants[node.name]
+            raise ExpressionError(f"Unknown name {node.name!r}")
+        if kind is Integral:
+            body, name = node.body, node.variable
+
+            def integrand(x):
+                return evaluate_node(body, degrees, {**variables, name: x}, backend)
+
+            return functions["integrate"](integrand, visit(node.low), visit(node.high))
+        raise ExpressionError(f"Unsupported node {node!r}")
+
+    return visit(node)
+
+
+def evaluate(
+    text: str,
+    degrees: bool = True,
+    cache: Optional[ExpressionCache] = None,
+    variables: Optional[Dict[str, float]] = None,
+    backend: Optional[NumericBackend] = None,
+    profile: Optional[EvaluationProfile] = None,
+):
+    """
+    Evaluate an expression string, reusing its compiled form when cached.
+    backend selects the number type; see calc_engine.backends. If a
+    profile is given, the time taken by each stage is added to it.
+    """
+    if cache is None:
+        cache = default_cache
+    if profile is not None:
+        return _evaluate_profiled(text, degrees, cache, variables, backend, profile)
+    if variables:
+        return cache.get(text, degrees, backend).evaluate(**variables)
+    return cache.get(text, degrees, backend).evaluate()
+
+
+def _evaluate_profiled(
+    text: str,
+    degrees: bool,
+    cache: ExpressionCache,
+    variables: Optional[Dict[str, float]],
+    backend: Optional[NumericBackend],
+    profile: EvaluationProfile,
+):
+    """evaluate(), timing each stage into profile"""
+    before = profile.total
+    started = clock()
+    compiled = cache.get(text, degrees, backend, profile)
+    looked_up = clock()
+    # Time in get() not spent compiling went to the lookup itself
+    profile.add("lookup", looked_up - started - (profile.total - before))
+    try:
+        if variables:
+            return compiled.evaluate(**variables)
+        return compiled.evaluate()
+    finally:
+        profile.add("execute", clock() - looked_up)
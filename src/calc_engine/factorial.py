@@ -0,0 +1,130 @@
+"""
+Exact factorials of large integers, reusing earlier results
+"""
+
+import bisect
+import math
+import threading
+from collections import OrderedDict
+
+# Below this math.factorial() is quicker than any bookkeeping
+CACHE_MIN = 2048
+DEFAULT_MAX_BITS = 1 << 27
+# k! is reused for n! when n - k is at most this fraction of n; beyond it
+# math.factorial() from scratch wins
+_REUSE_DIVISOR = 4
+# Ranges this short are multiplied one by one
+_SPLIT_MIN = 16
+
+
+def range_product(lo: int, hi: int) -> int:
+    """
+    Product of the integers lo, lo + 1, ..., hi - 1. The range is split in
+    halves recursively so that big multiplications pair numbers of similar
+    size, which is much faster than a running product for long ranges.
+    """
+    if hi - lo <= _SPLIT_MIN:
+        result = 1
+        for i in range(lo, hi):
+            result *= i
+        return result
+    mid = (lo + hi) // 2
+    return range_product(lo, mid) * range_product(mid, hi)
+
+
+class FactorialCache:
+    """
+    Factorials of n >= CACHE_MIN kept as checkpoints, least recently used
+    dropped first once they hold more than max_bits. n! is computed from
+    the nearest checkpoint k! below it as k! * range_product(k + 1, n + 1)
+    when that is close enough, so runs of nearby large n are cheap.
+    """
+
+    def __init__(self, max_bits: int = DEFAULT_MAX_BITS):
+        self.max_bits = max_bits
+        self.bits = 0
+        self.hits = 0
+        self.reused = 0
+        self.computed = 0
+        self._entries: "OrderedDict[int, int]" = OrderedDict()
+        # Checkpoint arguments in ascending order, for bisecting
+        self._keys = []
+        self._lock = threading.Lock()
+
+    def factorial(self, n: int) -> int:
+        """Exact n! of a non-negative integer"""
+        if n < CACHE_MIN:
+            return math.factorial(n)
+        with self._lock:
+            result = self._entries.get(n)
+            if result is not None:
+                self._entries.move_to_end(n)
+                self.hits += 1
+                return result
+            index = bisect.bisect_left(self._keys, n)
+            start = self._keys[index - 1] if index else 0
+            base = self._entries[start] if start else 1
+
+        # Multiply outside the lock; a concurrent caller may repeat the work
+        reused = bool(start) and n - start <= n // _REUSE_DIVISOR
+        if reused:
+            result = base * range_product(start + 1, n + 1)
+        else:
+            result = math.factorial(n)
+        self._store(n, result, reused)
+        return result
+
+    def _store(self, n: int, result: int, reused: bool) -> None:
+        bits = result.bit_length()
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.computed += 1
+            if bits > self.max_bits or n in self._entries:
+                return
+            self._entries[n] = result
+            bisect.insort(self._keys, n)
+            self.bits += bits
+            while self.bits > self.max_bits:
+                old, value = self._entries.popitem(last=False)
+                self._keys.remove(old)
+                self.bits -= value.bit_length()
+
+    def clear(self) -> None:
+        """Drop all checkpoints and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self.bits = self.hits = self.reused = self.computed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+default_factorials = FactorialCache()
+
+
+def factorial(n: int) -> int:
+    """Exact n! using the shared checkpoint cache"""
+    if n < 0:
+        raise ValueError("factorial() not defined for negative values")
+    return default_factorials.factorial(n)
+
+
+def fact(a):
+    """
+    Factorial of an integer-valued number, or Gamma(a + 1) for any other
+    value (e.g. fact(0.5) is sqrt(pi)/2). Negative integers are an error.
+    """
+    n = int(a)
+    if n != a:
+        return math.gamma(a + 1)
+    return factorial(n)
+
+
+def log_factorial(a) -> float:
+    """ln(a!) from lgamma, for when only the size of a huge factorial matters"""
+    if a < 0 and a == int(a):
+        raise ValueError("factorial() not defined for negative values")
+    return math.lgamma(a + 1)
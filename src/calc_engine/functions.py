@@ -0,0 +1,138 @@
+"""
+Function and constant tables used to resolve names in expressions
+"""
+
+import math
+from typing import Callable, Dict, Tuple
+
+from .factorial import fact
+
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+def power(a, b):
+    """Exponentiation keeping integer results exact"""
+    if type(a) is int and type(b) is int and b >= 0:
+        return a**b
+    return math.pow(a, b)
+
+
+def bounded_power(max_bits: int) -> Callable:
+    """
+    power() that refuses integer results larger than max_bits, so a call
+    such as 9^9^9 fails fast instead of holding the GIL for minutes
+    """
+
+    def guarded_power(a, b):
+        if type(a) is int and type(b) is int and b > 0 and abs(a) > 1:
+            if b * abs(a).bit_length() > max_bits + b:
+                raise OverflowError("Result too large")
+        return power(a, b)
+
+    return guarded_power
+
+
+def bounded_fact(max_bits: int) -> Callable:
+    """fact() that refuses results larger than max_bits"""
+
+    def guarded_fact(a):
+        n = int(a)
+        if n == a and n > 1 and math.lgamma(n + 1) / math.log(2) > max_bits:
+            raise OverflowError("Result too large")
+        return fact(a)
+
+    return guarded_fact
+
+
+def log(a, base=None):
+    """Base-10 logarithm, or logarithm with a custom base"""
+    if base is None:
+        return math.log10(a)
+    return math.log(a, base)
+
+
+def integrate(function: Callable, a, b) -> float:
+    """Integral of a function of one variable from a to b"""
+    # Imported on first use, as the module may load NumPy
+    from .quadrature import integral
+
+    return integral(function, a, b)
+
+
+def _sin_deg(a):
+    return math.sin(math.radians(a))
+
+
+def _cos_deg(a):
+    return math.cos(math.radians(a))
+
+
+def _tan_deg(a):
+    return math.tan(math.radians(a))
+
+
+def _asin_deg(a):
+    return math.degrees(math.asin(a))
+
+
+def _acos_deg(a):
+    return math.degrees(math.acos(a))
+
+
+def _atan_deg(a):
+    return math.degrees(math.atan(a))
+
+
+# Minimum and maximum number of arguments accepted by each function
+ARITY: Dict[str, Tuple[int, int]] = {
+    "sin": (1, 1),
+    "cos": (1, 1),
+    "tan": (1, 1),
+    "asin": (1, 1),
+    "acos": (1, 1),
+    "atan": (1, 1),
+    "sqrt": (1, 1),
+    "ln": (1, 1),
+    "log": (1, 2),
+    "log10": (1, 1),
+    "exp": (1, 1),
+    "abs": (1, 1),
+    "fact": (1, 1),
+    "gamma": (1, 1),
+    "lgamma": (1, 1),
+    "integrate": (4, 4),
+}
+
+RADIAN_FUNCTIONS: Dict[str, Callable] = {
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "sqrt": math.sqrt,
+    "ln": math.log,
+    "log": log,
+    "log10": math.log10,
+    "exp": math.exp,
+    "abs": abs,
+    "fact": fact,
+    "gamma": math.gamma,
+    "lgamma": math.lgamma,
+    "integrate": integrate,
+}
+
+DEGREE_FUNCTIONS: Dict[str, Callable] = dict(
+    RADIAN_FUNCTIONS,
+    sin=_sin_deg,
+    cos=_cos_deg,
+    tan=_tan_deg,
+    asin=_asin_deg,
+    acos=_acos_deg,
+    atan=_atan_deg,
+)
+
+
+def function_table(degrees: bool) -> Dict[str, Callable]:
+    """Return the function implementations for the given angle mode"""
+    return DEGREE_FUNCTIONS if degrees else RADIAN_FUNCTIONS
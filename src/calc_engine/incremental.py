@@ -0,0 +1,290 @@
+"""
+Incremental re-parsing for live previews of an expression being edited.
+
+After an edit only the tokens around the changed text are rescanned.
+Self-delimited groups - (...), f(...) and |...| - lying entirely outside
+the edit are taken over from the previous parse together with their
+cached values, so the cost of a keystroke tracks the size of the edit
+rather than the size of the expression.
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from .errors import ExpressionError
+from .functions import (
+    CONSTANTS,
+    bounded_fact,
+    bounded_power,
+    function_table,
+    power,
+)
+from .nodes import BinOp, Integral, Name, Node, Number, UnaryOp
+from .parser import Parser
+from .tokenizer import END, NAME, OP, Token, scan
+
+# A number such as 1.5e-3 can span this many tokens of a partial edit
+# ("1.5", "e", "-"), so rescanning may start up to this many tokens early
+_RESCAN_BACKTRACK = 3
+
+
+def _mergeable(token: Token) -> bool:
+    """Whether token may fuse with an adjacent one into a number or name"""
+    return token.kind != OP or token.value in ("+", "-")
+
+
+class _GroupReusingParser(Parser):
+    """Parser that takes over unchanged groups from a previous parse"""
+
+    def __init__(self, tokens: List[Token], reuse: Dict[int, Tuple[int, Node]], edit):
+        super().__init__(tokens)
+        self.reuse = reuse
+        self.first_changed, self.first_unchanged, self.shift = edit
+        self.groups: Dict[int, Tuple[int, Node]] = {}
+        self.reused = 0
+
+    def _take_over(self, start: int) -> Optional[Node]:
+        """Return the previous group starting at token start, if unchanged"""
+        if start < self.first_changed:
+            entry = self.reuse.get(start)
+            if entry is None or entry[0] > self.first_changed:
+                return None
+            end, node = entry
+        elif start >= self.first_unchanged:
+            entry = self.reuse.get(start - self.shift)
+            if entry is None:
+                return None
+            end, node = entry[0] + self.shift, entry[1]
+        else:
+            return None
+        self.index = end
+        self.groups[start] = (end, node)
+        self.reused += 1
+        return node
+
+    def prefix(self, token: Token) -> Node:
+        start = self.index - 1
+        is_group = token.kind == OP and token.value in ("(", "|")
+        if token.kind == NAME:
+            nxt = self.peek()
+            is_group = nxt.kind == OP and nxt.value == "("
+        if is_group:
+            node = self._take_over(start)
+            if node is not None:
+                return node
+        node = super().prefix(token)
+        if is_group:
+            self.groups[start] = (self.index, node)
+        return node
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Length of the common prefix, found with C-level slice comparisons"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix, at most limit characters"""
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid :] == b[len(b) - mid :]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class IncrementalEvaluator:
+    """
+    Evaluates successive versions of one expression, reusing the previous
+    token stream, parse tree and subtree values where the text is unchanged
+    """
+
+    def __init__(self, max_bits: Optional[int] = None):
+        # With max_bits, integer powers and factorials whose result would be
+        # larger fail fast with OverflowError instead of computing for minutes
+        self.power = power
+        self.tables = {True: function_table(True), False: function_table(False)}
+        if max_bits is not None:
+            self.power = bounded_power(max_bits)
+            guarded_fact = bounded_fact(max_bits)
+            for degrees, table in self.tables.items():
+                self.tables[degrees] = dict(table, fact=guarded_fact)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all state from previous updates"""
+        self.text = ""
+        self.tokens: List[Token] = []
+        self.ends: List[int] = []
+        self.groups: Dict[int, Tuple[int, Node]] = {}
+        self.values: Dict[int, object] = {}
+        self.tree: Optional[Node] = None
+        self.context = None
+        self.rescanned = 0
+        self.reused = 0
+
+    def _edit(self, text: str, cursor: Optional[int]) -> Tuple[int, int, int]:
+        """Return the unchanged prefix and suffix lengths and the length delta"""
+        old = self.text
+        delta = len(text) - len(old)
+        if cursor is not None and 0 <= cursor <= len(text):
+            # Typing and deleting leave the cursor at the end of the change
+            suffix = len(text) - cursor
+            prefix = cursor - max(delta, 0)
+            if (
+                suffix <= len(old)
+                and 0 <= prefix <= min(len(old), len(text)) - suffix
+                and old[:prefix] == text[:prefix]
+                and old[len(old) - suffix :] == text[cursor:]
+            ):
+                return prefix, suffix, delta
+        prefix = _common_prefix(old, text)
+        suffix = _common_suffix(old, text, min(len(old), len(text)) - prefix)
+        return prefix, suffix, delta
+
+    def _retokenize(self, text: str, cursor: Optional[int]):
+        """Rescan only the edited region and splice it into the token list"""
+        prefix, suffix, delta = self._edit(text, cursor)
+        old_tokens, old_ends = self.tokens, self.ends
+        old_edit_end = len(self.text) - suffix
+        new_edit_end = len(text) - suffix
+
+        first_changed = bisect_left(old_ends, prefix)
+        for _ in range(_RESCAN_BACKTRACK):
+            if not (
+                0 < first_changed < len(old_tokens)
+                and old_ends[first_changed - 1] == old_tokens[first_changed].pos
+                and _mergeable(old_tokens[first_changed])
+                and _mergeable(old_tokens[first_changed - 1])
+            ):
+                break
+            first_changed -= 1
+        # Rescan from the end of the last kept token, so edits to the
+        # whitespace before the first changed token are seen
+        start = old_ends[first_changed - 1] if first_changed else 0
+        old_starts = [token.pos for token in old_tokens]
+
+        tokens = old_tokens[:first_changed]
+        ends = old_ends[:first_changed]
+        resync = len(old_tokens)
+        for token, end in scan(text, start):
+            if token.pos >= new_edit_end:
+                old_pos = token.pos - delta
+                k = bisect_left(old_starts, old_pos, first_changed)
+                if k < len(old_tokens) and old_starts[k] == old_pos and old_pos >= old_edit_end:
+                    resync = k
+                    break
+            tokens.append(token)
+            ends.append(end)
+        self.rescanned = len(tokens) - first_changed
+        first_unchanged = len(tokens)
+        shift = first_unchanged - resync
+        for token, end in zip(old_tokens[resync:], old_ends[resync:]):
+            tokens.append(token._replace(pos=token.pos + delta))
+            ends.append(end + delta)
+        return tokens, ends, (first_changed, first_unchanged, shift)
+
+    def update(
+        self,
+        text: str,
+        degrees: bool = True,
+        variables: Optional[Dict[str, float]] = None,
+        cursor: Optional[int] = None,
+    ):
+        """
+        Parse and evaluate the new text of the expression. cursor, the
+        cursor position after the edit, is an optional hint for locating
+        the change.
+        """
+        try:
+            tokens, ends, edit = self._retokenize(text, cursor)
+        except ExpressionError:
+            self.reset()
+            raise
+        self.text, self.tokens, self.ends = text, tokens, ends
+
+        parser = _GroupReusingParser(tokens + [Token(END, "", len(text))], self.groups, edit)
+        try:
+            self.tree = parser.parse()
+        finally:
+            # Groups that parsed completely stay valid even if the rest failed
+            self.groups = parser.groups
+            self.reused = parser.reused
+            keep = {id(node) for _, node in self.groups.values()}
+            context = (degrees, tuple(sorted((variables or {}).items())))
+            if context != self.context:
+                self.values = {}
+                self.context = context
+            else:
+                self.values = {k: v for k, v in self.values.items() if k in keep}
+        return self._evaluate(self.tree, degrees, variables or {}, keep)
+
+    def _evaluate(
+        self, tree: Node, degrees: bool, variables, groups, values=None
+    ) -> object:
+        """Evaluate the tree, reusing and recording values of groups"""
+        functions = self.tables[degrees]
+        power = self.power
+        if values is None:
+            values = self.values
+
+        def visit(node: Node):
+            kind = type(node)
+            if kind is Number:
+                return node.value
+            if kind is Name:
+                if node.name in variables:
+                    return variables[node.name]
+                if node.name in CONSTANTS:
+                    return CONSTANTS[node.name]
+                raise ExpressionError(f"Unknown name {node.name!r}")
+            key = id(node)
+            if key in values:
+                return values[key]
+            if kind is BinOp:
+                a, b = visit(node.left), visit(node.right)
+                op = node.op
+                if op == "+":
+                    value = a + b
+                elif op == "-":
+                    value = a - b
+                elif op == "*":
+                    value = a * b
+                elif op == "/":
+                    value = a / b
+                else:
+                    value = power(a, b)
+            elif kind is UnaryOp:
+                value = -visit(node.operand)
+            elif kind is Integral:
+                value = functions["integrate"](
+                    self._integrand(node, degrees, variables),
+                    visit(node.low),
+                    visit(node.high),
+                )
+            else:
+                value = functions[node.func](*[visit(arg) for arg in node.args])
+            if key in groups:
+                values[key] = value
+            return value
+
+        return visit(tree)
+
+    def _integrand(self, node: Integral, degrees: bool, variables):
+        """The body of an integral as a function of its variable"""
+        body, name = node.body, node.variable
+
+        def integrand(x):
+            # Values inside the body change with x, so none are reused
+            return self._evaluate(body, degrees, {**variables, name: x}, (), {})
+
+        return integrand
@@ -0,0 +1,179 @@
+"""
+Memoization of pure calculator operations with bounded LRU caches
+"""
+
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+DEFAULT_CAPACITY = 256
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+class MemoInfo(NamedTuple):
+    """Snapshot of one operation's cache statistics"""
+
+    hits: int
+    misses: int
+    evictions: int
+    # Results not stored because they alone exceed max_bytes
+    oversized: int
+    size: int
+    capacity: int
+    bytes: int
+    max_bytes: int
+
+
+def _key_part(value) -> Hashable:
+    """
+    Cache key of one argument. Types are part of the key since e.g.
+    2 ** 3 and 2.0 ** 3 differ, and floats are keyed by their exact bits
+    so -0.0 and nan are told apart and found again.
+    """
+    if isinstance(value, float):
+        return float, value.hex()
+    return type(value), value
+
+
+class OperationCache:
+    """
+    LRU cache of one operation's results, bounded both by entry count and
+    by the total size in bytes of the results it holds
+    """
+
+    def __init__(
+        self,
+        function: Callable,
+        capacity: int = DEFAULT_CAPACITY,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        if capacity < 0 or max_bytes < 0:
+            raise ValueError("Cache limits must be non-negative")
+        self.function = function
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+        self.bytes = 0
+        self._entries: "OrderedDict[Tuple, Tuple[object, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        signature = inspect.signature(function)
+        self._signature = signature
+        # Defaults of trailing parameters, appended to short positional calls
+        # so that sin(30) and sin(30, True) share an entry
+        self._defaults = tuple(
+            parameter.default for parameter in signature.parameters.values()
+        )
+
+    def _key(self, args: tuple, kwargs: dict) -> Tuple:
+        if kwargs:
+            bound = self._signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            args = tuple(bound.arguments.values())
+        elif len(args) < len(self._defaults):
+            args += self._defaults[len(args) :]
+        return tuple(_key_part(value) for value in args)
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = self._key(args, kwargs)
+            hash(key)
+        except TypeError:
+            # Unhashable or mismatched arguments; let the function handle them
+            return self.function(*args, **kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Compute outside the lock; errors are raised and not cached
+        result = self.function(*args, **kwargs)
+        size = sys.getsizeof(result)
+        with self._lock:
+            if size > self.max_bytes:
+                self.oversized += 1
+            elif self.capacity and key not in self._entries:
+                self._entries[key] = (result, size)
+                self.bytes += size
+                self._evict(self.capacity, self.max_bytes)
+        return result
+
+    def _evict(self, capacity: int, max_bytes: int) -> None:
+        while len(self._entries) > capacity or self.bytes > max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def resize(
+        self, capacity: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> None:
+        """Change the limits, evicting entries if they shrink"""
+        with self._lock:
+            if capacity is not None:
+                self.capacity = capacity
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict(self.capacity, self.max_bytes)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = self.oversized = 0
+
+    def info(self) -> MemoInfo:
+        """Return current statistics"""
+        with self._lock:
+            return MemoInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                self.oversized,
+                len(self._entries),
+                self.capacity,
+                self.bytes,
+                self.max_bytes,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Memoizer:
+    """
+    One OperationCache per memoized operation of an object. Only pure
+    operations, whose results depend on nothing but their arguments, may
+    be memoized; settings such as the angle mode must be arguments.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.caches: Dict[str, OperationCache] = {}
+
+    def wrap(self, name: str, function: Callable) -> OperationCache:
+        """Return the memoized form of function, creating its cache"""
+        cache = OperationCache(function, self.capacity, self.max_bytes)
+        self.caches[name] = cache
+        return cache
+
+    def info(self) -> Dict[str, MemoInfo]:
+        """Statistics of every operation, by name"""
+        return {name: cache.info() for name, cache in self.caches.items()}
+
+    def clear(self, names: Optional[Iterable[str]] = None) -> None:
+        """Empty the caches of names, or of every operation"""
+        for name in self.caches if names is None else names:
+            self.caches[name].clear()
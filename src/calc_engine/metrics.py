@@ -0,0 +1,595 @@
+"""
+Counters, gauges and latency histograms, exported in Prometheus text format
+"""
+
+import math
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .cache import default_cache
+from .errors import EvaluationTimeout, ResourceLimitError
+from .profiling import EvaluationProfile
+
+# Upper bounds, in seconds, of the evaluation latency buckets
+LATENCY_BUCKETS = (
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    2.5e-3,
+    5e-3,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+# Seconds between rewrites of a metrics file
+FILE_INTERVAL_S = 15.0
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class _Cells:
+    """
+    Per-thread accumulators. A thread only ever writes its own cell, so
+    updates take no lock; readers add up the cells of all threads.
+    """
+
+    __slots__ = ("_local", "_cells", "_lock", "_size")
+
+    def __init__(self, size: int):
+        self._local = threading.local()
+        self._cells: List[list] = []
+        self._lock = threading.Lock()
+        self._size = size
+
+    def _new_cell(self) -> list:
+        cell = [0] * self._size
+        with self._lock:
+            self._cells.append(cell)
+        self._local.cell = cell
+        return cell
+
+    def totals(self) -> list:
+        """Sum of each position over all threads' cells"""
+        with self._lock:
+            cells = list(self._cells)
+        if not cells:
+            return [0] * self._size
+        return [sum(column) for column in zip(*cells)]
+
+
+class _CounterValue(_Cells):
+    """One labelled series of a counter"""
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount"""
+        try:
+            self._local.cell[0] += amount
+        except AttributeError:
+            self._new_cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self.totals()[0]
+
+
+class _GaugeValue:
+    """One labelled series of a gauge"""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount, which may be negative"""
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        """Replace the value"""
+        self.value = value
+
+
+class _HistogramValue(_Cells):
+    """One labelled series of a histogram"""
+
+    __slots__ = ("bounds",)
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        # A cell holds a count per bucket, the last one for observations
+        # above every bound, followed by the sum of the observations
+        super().__init__(len(bounds) + 2)
+        self.bounds = bounds
+
+    def observe(self, value: float) -> None:
+        """Record one observation"""
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._new_cell()
+        cell[bisect_left(self.bounds, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Bucket counts, sum and count of the observations"""
+        totals = self.totals()
+        counts = totals[:-1]
+        return counts, totals[-1], sum(counts)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the q-quantile (0 <= q <= 1) by interpolating within its
+        bucket, as Prometheus' histogram_quantile() does; NaN when empty
+        """
+        counts, _, count = self.snapshot()
+        if not count:
+            return math.nan
+        rank = q * count
+        seen = 0
+        for index, bucket in enumerate(counts):
+            if bucket and seen + bucket >= rank:
+                if index == len(self.bounds):
+                    # Above the highest bound; that bound is all we know
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / bucket
+            seen += bucket
+        return self.bounds[-1]
+
+
+class Metric:
+    """
+    A named metric family. Series are selected with labels(), in the
+    order of labelnames; a metric without labels is used directly.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The series for the given label values, created on first use"""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} takes labels {self.labelnames}, got {values}"
+                )
+            with self._lock:
+                series = self._series.setdefault(
+                    tuple(str(v) for v in values), self._new_series()
+                )
+        return series
+
+    def series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        """Snapshot of (label values, series) pairs"""
+        with self._lock:
+            return list(self._series.items())
+
+    def samples(self) -> List[str]:
+        """Exposition lines for every series"""
+        raise NotImplementedError
+
+    def exposition(self) -> str:
+        """The metric family in Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {_escape(self.help)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """A count that only goes up"""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ):
+        # A function metric reads its value from elsewhere when collected;
+        # with labels, the function returns values by label values
+        self.function = function
+        super().__init__(name, help, labelnames)
+
+    def _new_series(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount to a metric without labels"""
+        self._default.inc(amount)
+
+    def get(self, *values: str) -> float:
+        """Current value of a series"""
+        if self.function is None:
+            return self.labels(*values).value
+        return self.values().get(tuple(values), 0)
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Current value of each series, by label values"""
+        if self.function is None:
+            return {values: series.value for values, series in self.series()}
+        if self.labelnames:
+            return self.function()
+        return {(): self.function()}
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} "
+            f"{_format_value(value)}"
+            for values, value in self.values().items()
+        ]
+
+
+class Gauge(Counter):
+    """A value that can go up and down"""
+
+    kind = "gauge"
+
+    def _new_series(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        """Set a metric without labels"""
+        self._default.set(value)
+
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        if not self.buckets:
+            raise ValueError("A histogram needs at least one finite bucket")
+        super().__init__(name, help, labelnames)
+
+    def _new_series(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record an observation on a metric without labels"""
+        self._default.observe(value)
+
+    def quantile(self, q: float, *values: str) -> float:
+        """Estimated q-quantile of a series"""
+        return self.labels(*values).quantile(q)
+
+    def samples(self) -> List[str]:
+        lines = []
+        names = self.labelnames + ("le",)
+        for values, series in self.series():
+            counts, total, count = series.snapshot()
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket
+                labels = _format_labels(names, values + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """A set of metrics exported together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        """Return the metric called name, creating it if needed"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name!r} is already a {metric.kind}")
+            return metric
+
+    def counter(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ) -> Counter:
+        return self._register(Counter, name, help, labelnames, function)
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        return self._register(Gauge, name, help, labelnames, function)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def exposition(self) -> str:
+        """All metrics in Prometheus text format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "".join(metric.exposition() for metric in metrics)
+
+    def write(self, path: str) -> None:
+        """Write the exposition to path, replacing it atomically"""
+        directory = os.path.dirname(os.path.abspath(path))
+        name = f".{os.path.basename(path)}.{os.getpid()}"
+        temporary = os.path.join(directory, name)
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.exposition())
+        os.replace(temporary, path)
+
+
+REGISTRY = MetricsRegistry()
+
+EVALUATION_SECONDS = REGISTRY.histogram(
+    "calc_evaluation_seconds", "Time to evaluate an expression", ("frontend",)
+)
+# Read from the latency histogram, so counting costs nothing extra
+EVALUATIONS = REGISTRY.counter(
+    "calc_evaluations_total",
+    "Expressions evaluated",
+    ("frontend",),
+    function=lambda: {
+        values: series.snapshot()[2] for values, series in EVALUATION_SECONDS.series()
+    },
+)
+EVALUATION_ERRORS = REGISTRY.counter(
+    "calc_evaluation_errors_total",
+    "Expressions that failed, by error type",
+    ("frontend", "type"),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "calc_stage_seconds", "Time spent in each profiled evaluation stage", ("stage",)
+)
+
+REGISTRY.counter(
+    "calc_cache_hits_total",
+    "Compiled expression cache hits",
+    function=lambda: default_cache.hits,
+)
+REGISTRY.counter(
+    "calc_cache_misses_total",
+    "Compiled expression cache misses",
+    function=lambda: default_cache.misses,
+)
+REGISTRY.counter(
+    "calc_cache_evictions_total",
+    "Compiled expressions evicted from the cache",
+    function=lambda: default_cache.evictions,
+)
+REGISTRY.gauge(
+    "calc_cache_entries",
+    "Compiled expressions cached",
+    function=lambda: len(default_cache),
+)
+
+
+def _hit_ratio() -> float:
+    info = default_cache.info()
+    lookups = info.hits + info.misses
+    return info.hits / lookups if lookups else 0.0
+
+
+REGISTRY.gauge(
+    "calc_cache_hit_ratio",
+    "Fraction of cache lookups that were hits",
+    function=_hit_ratio,
+)
+
+# Error classes in the order the GUI's calculate_result() catches them
+_ERROR_LABELS = (
+    (EvaluationTimeout, "EvaluationTimeout"),
+    (ResourceLimitError, "ResourceLimitError"),
+    (ValueError, "ValueError"),
+    (ZeroDivisionError, "ZeroDivisionError"),
+    (OverflowError, "OverflowError"),
+)
+
+
+def error_label(error: BaseException) -> str:
+    """The type label an error is counted under"""
+    for cls, label in _ERROR_LABELS:
+        if isinstance(error, cls):
+            return label
+    return type(error).__name__
+
+
+class EvaluationMetrics:
+    """
+    The series a front end records its evaluations in, looked up once so
+    that recording a successful evaluation is a single unlocked update
+    """
+
+    __slots__ = ("frontend", "latency")
+
+    def __init__(self, frontend: str):
+        self.frontend = frontend
+        self.latency = EVALUATION_SECONDS.labels(frontend)
+
+    def record(
+        self,
+        seconds: float,
+        error: Optional[BaseException] = None,
+        profile: Optional[EvaluationProfile] = None,
+    ) -> None:
+        """Count one evaluation, its latency and any error"""
+        self.latency.observe(seconds)
+        if error is not None:
+            EVALUATION_ERRORS.labels(self.frontend, error_label(error)).inc()
+        if profile is not None:
+            for stage, stage_seconds in profile.stages.items():
+                STAGE_SECONDS.labels(stage).observe(stage_seconds)
+
+
+class MetricsFileWriter:
+    """Rewrites a metrics file every interval seconds, and once more on close"""
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = FILE_INTERVAL_S,
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+        registry.write(path)
+        self._thread = threading.Thread(
+            target=self._run, name="calc-metrics-file", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.registry.write(self.path)
+
+    def close(self) -> None:
+        """Stop rewriting and write the final values"""
+        self._stopped.set()
+        self._thread.join()
+        self.registry.write(self.path)
+
+
+def serve_metrics(port: int = 0, host: str = "127.0.0.1", registry=REGISTRY):
+    """
+    Serve the registry at http://host:port/metrics from a daemon thread and
+    return the server; port 0 picks a free port (see server.server_port).
+    Call shutdown() and server_close() on it to stop.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.exposition().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="calc-metrics-http", daemon=True
+    ).start()
+    return server
+
+
+class MetricsExport:
+    """
+    The exporters a front end was started with. port and path default to
+    the CALC_METRICS_PORT and CALC_METRICS_FILE environment variables;
+    with neither set, nothing is exported.
+    """
+
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        path: Optional[str] = None,
+        host: str = "127.0.0.1",
+        registry: MetricsRegistry = REGISTRY,
+    ):
+        if port is None and os.environ.get("CALC_METRICS_PORT"):
+            port = int(os.environ["CALC_METRICS_PORT"])
+        if path is None:
+            path = os.environ.get("CALC_METRICS_FILE") or None
+        self.server = None
+        self.writer = None
+        if port is not None:
+            self.server = serve_metrics(port, host, registry)
+        if path:
+            self.writer = MetricsFileWriter(path, registry=registry)
+
+    def close(self) -> None:
+        """Stop serving and write the metrics file a final time"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
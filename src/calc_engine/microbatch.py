@@ -0,0 +1,185 @@
+"""
+Coalescing of concurrent asyncio evaluations into vectorized calls
+"""
+
+import asyncio
+import math
+import warnings
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from .cache import ExpressionCache, default_cache
+from .errors import ResourceLimitError
+from .evaluator import evaluate
+
+if TYPE_CHECKING:
+    from .sandbox import SandboxPool
+
+DEFAULT_MAX_BATCH = 1024
+
+_Call = Tuple[Dict[str, float], "asyncio.Future"]
+# (True, result) or (False, the exception raised)
+_Outcome = Tuple[bool, object]
+
+
+def _evaluate_alone(
+    expression: str, degrees: bool, cache: ExpressionCache, variables
+) -> _Outcome:
+    try:
+        return True, evaluate(expression, degrees, cache, variables)
+    except Exception as e:
+        return False, e
+
+
+def evaluate_group(
+    expression: str,
+    degrees: bool,
+    variables: List[Dict[str, float]],
+    cache: Optional[ExpressionCache] = None,
+) -> Tuple[List[_Outcome], bool]:
+    """
+    The outcome of evaluating expression with each of the variable tables,
+    and whether they came from one vectorized evaluation. A result that is
+    not finite is recomputed alone, so errors such as division by zero are
+    raised just as without batching.
+    """
+    cache = cache or default_cache
+    if len(variables) == 1:
+        return [_evaluate_alone(expression, degrees, cache, variables[0])], False
+    try:
+        compiled = cache.get(expression, degrees)
+        if not compiled.variables:
+            # Same value for every call; compute it once
+            outcome = _evaluate_alone(expression, degrees, cache, {})
+            return [outcome] * len(variables), False
+        arrays = {
+            name: [table[name] for table in variables] for name in compiled.variables
+        }
+        from .vectorized import evaluate_many
+
+        with warnings.catch_warnings():
+            # Domain errors give nan or inf here and are redone below
+            warnings.simplefilter("ignore", RuntimeWarning)
+            results = evaluate_many(expression, degrees, cache, **arrays)
+    except Exception:
+        # e.g. a syntax error or a missing variable; each call reports it
+        return [
+            _evaluate_alone(expression, degrees, cache, table) for table in variables
+        ], False
+    outcomes = []
+    for table, value in zip(variables, results):
+        value = float(value)
+        if math.isfinite(value):
+            outcomes.append((True, value))
+        else:
+            outcomes.append(_evaluate_alone(expression, degrees, cache, table))
+    return outcomes, True
+
+
+class MicroBatcher:
+    """
+    Gathers evaluate() calls made in the same event loop iteration, or
+    within window seconds, and runs the calls of each expression together
+    with evaluate_group(): one evaluate_many() call over the arrays of their
+    variable values. Batched results come from NumPy and may differ from
+    scalar ones in the last bit. Without a sandbox the work is done on the
+    event loop thread; with one, each group is evaluated in a worker
+    process under its budgets while the loop carries on.
+    """
+
+    def __init__(
+        self,
+        window: float = 0.0,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        degrees: bool = True,
+        cache: Optional[ExpressionCache] = None,
+        sandbox: Optional["SandboxPool"] = None,
+    ):
+        if max_batch < 1:
+            raise ValueError("A batch holds at least one call")
+        self.window = window
+        self.max_batch = max_batch
+        self.degrees = degrees
+        self.cache = cache or default_cache
+        self.sandbox = sandbox
+        # Vectorized calls made, and the evaluations they covered
+        self.batches = 0
+        self.batched = 0
+        self._pending: Dict[str, List[_Call]] = {}
+        self._size = 0
+        self._handle: Optional[asyncio.Handle] = None
+        self._tasks: Set["asyncio.Task"] = set()
+
+    async def evaluate(
+        self, expression: str, variables: Optional[Dict[str, float]] = None
+    ):
+        """Evaluate expression, possibly together with concurrent calls"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        calls = self._pending.setdefault(expression.strip(), [])
+        calls.append((variables or {}, future))
+        self._size += 1
+        if self._size >= self.max_batch:
+            self.flush()
+        elif self._handle is None:
+            if self.window > 0:
+                self._handle = loop.call_later(self.window, self.flush)
+            else:
+                self._handle = loop.call_soon(self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """Evaluate every pending call now, or start to in the sandbox"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        pending, self._pending = self._pending, {}
+        self._size = 0
+        for expression, calls in pending.items():
+            calls = [call for call in calls if not call[1].cancelled()]
+            if not calls:
+                continue
+            if self.sandbox is None:
+                variables = [table for table, _ in calls]
+                outcomes, vectorized = evaluate_group(
+                    expression, self.degrees, variables, self.cache
+                )
+                self._deliver(calls, outcomes, vectorized)
+            else:
+                task = asyncio.ensure_future(
+                    self._evaluate_in_sandbox(expression, calls)
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _evaluate_in_sandbox(self, expression: str, calls: List[_Call]) -> None:
+        loop = asyncio.get_running_loop()
+        arguments = (expression, self.degrees, [table for table, _ in calls])
+        try:
+            outcomes, vectorized = await loop.run_in_executor(
+                None, self.sandbox.call, evaluate_group, arguments
+            )
+        except ResourceLimitError as e:
+            if len(calls) > 1:
+                # Any one call may be to blame; give each its own budget
+                await asyncio.gather(
+                    *(self._evaluate_in_sandbox(expression, [call]) for call in calls)
+                )
+                return
+            outcomes, vectorized = [(False, e)], False
+        except Exception as e:
+            outcomes, vectorized = [(False, e)] * len(calls), False
+        self._deliver(calls, outcomes, vectorized)
+
+    def _deliver(
+        self, calls: List[_Call], outcomes: List[_Outcome], vectorized: bool
+    ) -> None:
+        if vectorized:
+            self.batches += 1
+            self.batched += len(calls)
+        for (_, future), (succeeded, value) in zip(calls, outcomes):
+            if future.done():
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -0,0 +1,54 @@
+"""
+Compact, immutable AST nodes produced by the parser
+"""
+
+from typing import Any, NamedTuple, Tuple, Union
+
+
+class Number(NamedTuple):
+    """Numeric literal"""
+
+    value: Union[int, float]
+    # Source text of a non-integer literal, e.g. more digits than a float
+    # holds; empty for integers and numbers made by the optimizer
+    text: str = ""
+
+
+class Name(NamedTuple):
+    """Named constant or variable reference"""
+
+    name: str
+
+
+class UnaryOp(NamedTuple):
+    """Prefix operator applied to one operand"""
+
+    op: str
+    operand: Any
+
+
+class BinOp(NamedTuple):
+    """Binary operator"""
+
+    op: str
+    left: Any
+    right: Any
+
+
+class Call(NamedTuple):
+    """Function call"""
+
+    func: str
+    args: Tuple[Any, ...]
+
+
+class Integral(NamedTuple):
+    """integrate(body, variable, low, high); variable is bound in body only"""
+
+    body: Any
+    variable: str
+    low: Any
+    high: Any
+
+
+Node = Union[Number, Name, UnaryOp, BinOp, Call, Integral]
@@ -0,0 +1,186 @@
+"""
+Optimizer pass run between parsing and compilation: lowers degree-mode
+trigonometry to radians, folds constant subtrees and finds repeated
+subexpressions so the code generator can compute them once
+"""
+
+import math
+from collections import Counter
+from typing import Hashable, NamedTuple, Set, Tuple
+
+from .functions import CONSTANTS
+from .nodes import BinOp, Call, Integral, Name, Node, Number, UnaryOp
+
+# Exactly the factors math.radians and math.degrees multiply by
+DEGREES_TO_RADIANS = math.pi / 180.0
+RADIANS_TO_DEGREES = 180.0 / math.pi
+
+_ANGLE_INPUT = ("sin", "cos", "tan")
+_ANGLE_OUTPUT = ("asin", "acos", "atan")
+
+
+class OptimizationStats(NamedTuple):
+    """Size of an expression before and after optimization"""
+
+    nodes_before: int
+    nodes_after: int
+    shared: int
+
+
+def node_key(node: Node) -> Hashable:
+    """
+    Structural key for a node. Number(1) == Number(1.0) as tuples, but
+    int and float literals evaluate differently, so types are included,
+    and so is the source text, which exact backends evaluate.
+    """
+    kind = type(node)
+    if kind is Number:
+        return (Number, type(node.value), node.value, node.text)
+    if kind is Name:
+        return (Name, node.name)
+    if kind is UnaryOp:
+        return (UnaryOp, node.op, node_key(node.operand))
+    if kind is BinOp:
+        return (BinOp, node.op, node_key(node.left), node_key(node.right))
+    if kind is Integral:
+        bounds = (node_key(node.low), node_key(node.high))
+        return (Integral, node.variable, node_key(node.body), *bounds)
+    return (Call, node.func, tuple(node_key(arg) for arg in node.args))
+
+
+def children(node: Node) -> Tuple[Node, ...]:
+    """Direct operands of a node"""
+    kind = type(node)
+    if kind is BinOp:
+        return (node.left, node.right)
+    if kind is UnaryOp:
+        return (node.operand,)
+    if kind is Call:
+        return node.args
+    if kind is Integral:
+        return (node.body, node.low, node.high)
+    return ()
+
+
+def count_nodes(node: Node) -> int:
+    """Number of nodes in a tree"""
+    return 1 + sum(count_nodes(child) for child in children(node))
+
+
+def lower_angles(node: Node) -> Node:
+    """
+    Rewrite degree-mode trigonometry as radian functions with an explicit
+    conversion factor, so conversions can be folded and the result no
+    longer depends on the angle mode
+    """
+    kind = type(node)
+    if kind is BinOp:
+        return BinOp(node.op, lower_angles(node.left), lower_angles(node.right))
+    if kind is UnaryOp:
+        return UnaryOp(node.op, lower_angles(node.operand))
+    if kind is Call:
+        args = tuple(lower_angles(arg) for arg in node.args)
+        if node.func in _ANGLE_INPUT:
+            return Call(node.func, (BinOp("*", args[0], Number(DEGREES_TO_RADIANS)),))
+        if node.func in _ANGLE_OUTPUT:
+            return BinOp("*", Call(node.func, args), Number(RADIANS_TO_DEGREES))
+        return Call(node.func, args)
+    if kind is Integral:
+        body, low, high = (lower_angles(child) for child in children(node))
+        return Integral(body, node.variable, low, high)
+    return node
+
+
+def fold_constants(node: Node) -> Node:
+    """
+    Replace subtrees without variables by their value. Subtrees that fail
+    to evaluate (e.g. 1/0) are kept so the error is raised at run time.
+    """
+    from .evaluator import evaluate_node
+
+    def fold(node: Node) -> Node:
+        kind = type(node)
+        if kind is Number:
+            return node
+        if kind is Name:
+            if node.name in CONSTANTS:
+                return Number(CONSTANTS[node.name])
+            return node
+        if kind is BinOp:
+            node = BinOp(node.op, fold(node.left), fold(node.right))
+        elif kind is UnaryOp:
+            node = UnaryOp(node.op, fold(node.operand))
+        elif kind is Integral:
+            body, low, high = (fold(child) for child in children(node))
+            node = Integral(body, node.variable, low, high)
+        else:
+            node = Call(node.func, tuple(fold(arg) for arg in node.args))
+        if all(type(child) is Number for child in children(node)):
+            try:
+                return Number(evaluate_node(node, degrees=False))
+            except (ArithmeticError, ValueError, TypeError):
+                return node
+        return node
+
+    return fold(node)
+
+
+def common_subexpressions(node: Node) -> Set[Hashable]:
+    """
+    Keys of compound subtrees that would be emitted more than once.
+    Repeats are not descended into, so parts of a shared subtree are only
+    reported if they also occur elsewhere. Integral bodies are run once per
+    point with their own variable, so nothing inside them is shared.
+    """
+    counts: Counter = Counter()
+
+    def visit(node: Node) -> None:
+        if type(node) in (Number, Name):
+            return
+        key = node_key(node)
+        counts[key] += 1
+        if counts[key] == 1:
+            if type(node) is Integral:
+                inner: Tuple[Node, ...] = (node.low, node.high)
+            else:
+                inner = children(node)
+            for child in inner:
+                visit(child)
+
+    visit(node)
+    return {key for key, count in counts.items() if count > 1}
+
+
+def optimize(
+    node: Node, degrees: bool, fold: bool = True
+) -> Tuple[Node, Set[Hashable], OptimizationStats]:
+    """
+    Optimize a tree parsed for the given angle mode. With fold the returned
+    tree is in radians and constant subtrees are evaluated with floats;
+    without it only common subexpressions are found. Also returns the
+    shared subexpression keys and the node counts before and after.
+    """
+    before = count_nodes(node)
+    if fold:
+        if degrees:
+            node = lower_angles(node)
+        node = fold_constants(node)
+    shared = common_subexpressions(node)
+    after = _count_unique(node, shared)
+    return node, shared, OptimizationStats(before, after, len(shared))
+
+
+def _count_unique(node: Node, shared: Set[Hashable]) -> int:
+    """Node count when every shared subtree is only counted once"""
+    seen: Set[Hashable] = set()
+
+    def visit(node: Node) -> int:
+        if type(node) not in (Number, Name):
+            key = node_key(node)
+            if key in shared:
+                if key in seen:
+                    return 0
+                seen.add(key)
+        return 1 + sum(visit(child) for child in children(node))
+
+    return visit(node)
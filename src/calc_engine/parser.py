@@ -0,0 +1,167 @@
+"""
+Precedence-climbing (Pratt) parser that turns tokens into an AST
+"""
+
+from typing import List
+
+from .errors import ExpressionError
+from .functions import ARITY, CONSTANTS
+from .nodes import BinOp, Call, Integral, Name, Node, Number, UnaryOp
+from .tokenizer import END, NAME, NUMBER, OP, Token, tokenize
+
+# Left binding powers of infix and postfix operators
+_ADDITIVE = 10
+_MULTIPLICATIVE = 20
+_UNARY = 30
+_POWER = 40
+_POSTFIX = 50
+
+_INFIX_POWER = {
+    "+": _ADDITIVE,
+    "-": _ADDITIVE,
+    "*": _MULTIPLICATIVE,
+    "/": _MULTIPLICATIVE,
+    "^": _POWER,
+    "!": _POSTFIX,
+}
+
+
+class Parser:
+    """
+    Parser over a token list. Supports implicit multiplication such as
+    2(3), (1+2)(3+4), 2pi and 3sin(30), |x| absolute value bars, the √
+    prefix and postfix factorial.
+    """
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self) -> Token:
+        """Return the current token without consuming it"""
+        return self.tokens[self.index]
+
+    def advance(self) -> Token:
+        """Consume and return the current token"""
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value: str) -> Token:
+        """Consume an operator token, failing if it is not the expected one"""
+        token = self.advance()
+        if token.kind != OP or token.value != value:
+            raise ExpressionError(f"Expected {value!r}", token.pos)
+        return token
+
+    def parse(self) -> Node:
+        """Parse a complete expression"""
+        node = self.expression(0)
+        token = self.peek()
+        if token.kind != END:
+            raise ExpressionError(f"Unexpected {token.value!r}", token.pos)
+        return node
+
+    def expression(self, right_power: int) -> Node:
+        """Parse an expression whose operators bind tighter than right_power"""
+        left = self.prefix(self.advance())
+        while True:
+            token = self.peek()
+            if token.kind == OP:
+                power = _INFIX_POWER.get(token.value)
+                if power is None:
+                    # ")", ",", "|" and anything else terminate the expression
+                    if token.value in ("(", "√") and right_power < _MULTIPLICATIVE:
+                        left = BinOp("*", left, self.expression(_MULTIPLICATIVE))
+                        continue
+                    return left
+                if power <= right_power:
+                    return left
+                self.advance()
+                if token.value == "!":
+                    left = Call("fact", (left,))
+                elif token.value == "^":
+                    # Right associative: 2^3^2 == 2^(3^2)
+                    left = BinOp("^", left, self.expression(power - 1))
+                else:
+                    left = BinOp(token.value, left, self.expression(power))
+            elif self._implicit_multiplication(token) and right_power < _MULTIPLICATIVE:
+                left = BinOp("*", left, self.expression(_MULTIPLICATIVE))
+            else:
+                return left
+
+    def _implicit_multiplication(self, token: Token) -> bool:
+        """Whether token starts a factor that multiplies the previous one"""
+        if token.kind == NAME:
+            return True
+        if token.kind == NUMBER:
+            # Only after a closing bracket, e.g. (2)3; "2 3" stays an error
+            previous = self.tokens[self.index - 1]
+            return previous.kind == OP and previous.value in (")", "|")
+        return False
+
+    def prefix(self, token: Token) -> Node:
+        """Parse the operand that starts with token"""
+        if token.kind == NUMBER:
+            return Number(token.value, token.text)
+        if token.kind == NAME:
+            nxt = self.peek()
+            if nxt.kind == OP and nxt.value == "(":
+                return self.call(token)
+            return Name(token.value)
+        if token.kind == OP:
+            if token.value == "(":
+                node = self.expression(0)
+                self.expect(")")
+                return node
+            if token.value in ("-", "+"):
+                operand = self.expression(_UNARY)
+                return operand if token.value == "+" else UnaryOp("-", operand)
+            if token.value == "|":
+                node = self.expression(0)
+                self.expect("|")
+                return Call("abs", (node,))
+            if token.value == "√":
+                return Call("sqrt", (self.expression(_POWER),))
+        if token.kind == END:
+            raise ExpressionError("Unexpected end of expression", token.pos)
+        raise ExpressionError(f"Unexpected {token.value!r}", token.pos)
+
+    def call(self, name_token: Token) -> Node:
+        """Parse a function call after its name"""
+        name = name_token.value
+        if name not in ARITY:
+            raise ExpressionError(f"Unknown function {name!r}", name_token.pos)
+        self.expect("(")
+        args = []
+        if not (self.peek().kind == OP and self.peek().value == ")"):
+            args.append(self.expression(0))
+            while self.peek().kind == OP and self.peek().value == ",":
+                self.advance()
+                args.append(self.expression(0))
+        self.expect(")")
+        low, high = ARITY[name]
+        if not low <= len(args) <= high:
+            raise ExpressionError(
+                f"{name}() takes {low if low == high else f'{low} to {high}'} "
+                f"argument(s), got {len(args)}",
+                name_token.pos,
+            )
+        if name == "integrate":
+            return self.integral(args, name_token)
+        return Call(name, tuple(args))
+
+    def integral(self, args: List[Node], name_token: Token) -> Node:
+        """Build integrate(body, variable, low, high) from its arguments"""
+        body, variable, low, high = args
+        if type(variable) is not Name or variable.name in CONSTANTS:
+            raise ExpressionError(
+                "integrate() needs a variable name as its second argument",
+                name_token.pos,
+            )
+        return Integral(body, variable.name, low, high)
+
+
+def parse(text: str) -> Node:
+    """Tokenize and parse an expression into an AST"""
+    return Parser(tokenize(text)).parse()
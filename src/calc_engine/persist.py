@@ -0,0 +1,89 @@
+"""
+Saving compiled expressions to disk so new processes can skip compiling
+
+The file holds marshalled code objects, which are executed when loaded:
+like __pycache__, it must only be written by trusted users.
+"""
+
+import importlib.util
+import marshal
+import os
+import struct
+import tempfile
+import zlib
+from typing import Iterable, List
+
+from .backends import FLOAT
+from .compiler import ENGINE_VERSION, CompiledExpression
+
+FORMAT_VERSION = 1
+
+# Magic, format version, Python bytecode magic, engine version, CRC32 of body
+_HEADER = struct.Struct("<8sH4s16sI")
+_MAGIC = b"CALCENG\0"
+
+
+def _header(checksum: int) -> bytes:
+    return _HEADER.pack(
+        _MAGIC,
+        FORMAT_VERSION,
+        importlib.util.MAGIC_NUMBER,
+        ENGINE_VERSION.encode("ascii"),
+        checksum,
+    )
+
+
+def save_compiled(path: str, entries: Iterable[CompiledExpression]) -> int:
+    """
+    Write the float-backend entries that have compiled code to path,
+    replacing the file atomically; return the number written
+    """
+    records = [
+        (
+            compiled.text,
+            compiled.degrees,
+            compiled.code_degrees,
+            tuple(compiled.stats) if compiled.stats is not None else None,
+            compiled.variables,
+            compiled.source,
+            compiled.code,
+        )
+        for compiled in entries
+        if compiled.backend is FLOAT and compiled.code is not None
+    ]
+    body = marshal.dumps(records)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=".calc-cache-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_header(zlib.crc32(body)))
+            f.write(body)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return len(records)
+
+
+def load_compiled(path: str) -> List[CompiledExpression]:
+    """
+    Read entries saved by save_compiled with a single read. A missing or
+    unreadable file, or one from another engine or Python version or failing its checksum,
+    gives no entries, so everything is compiled afresh.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    if len(data) < _HEADER.size:
+        return []
+    checksum = _HEADER.unpack_from(data)[-1]
+    body = memoryview(data)[_HEADER.size :]
+    if data[: _HEADER.size] != _header(checksum) or zlib.crc32(body) != checksum:
+        return []
+    try:
+        return [CompiledExpression.restore(*record) for record in marshal.loads(body)]
+    except (EOFError, ValueError, TypeError):
+        return []
@@ -0,0 +1,140 @@
+"""
+Background evaluation of live previews, kept off the GUI thread
+"""
+
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from .incremental import IncrementalEvaluator
+
+# Integer results above this size are not worth computing for a preview
+PREVIEW_MAX_BITS = 1 << 17
+
+
+class PreviewResult(NamedTuple):
+    """Outcome of evaluating one preview request"""
+
+    generation: int
+    text: str
+    value: object
+    error: Optional[BaseException]
+
+
+class _Request(NamedTuple):
+    generation: int
+    text: str
+    degrees: bool
+    variables: Dict[str, float]
+    cursor: Optional[int]
+    submitted: float
+
+
+class PreviewWorker:
+    """
+    Evaluates preview requests on a daemon thread. Requests are debounced
+    by delay seconds and only the latest one matters: a newer submit()
+    replaces any pending request and makes results of older ones stale.
+    The GUI thread never waits; it collects results with poll().
+    """
+
+    def __init__(self, delay: float = 0.05, max_bits: int = PREVIEW_MAX_BITS):
+        self.delay = delay
+        self.evaluator = IncrementalEvaluator(max_bits=max_bits)
+        self._condition = threading.Condition()
+        self._pending: Optional[_Request] = None
+        self._result: Optional[PreviewResult] = None
+        self._generation = 0
+        self._running = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        text: str,
+        degrees: bool = True,
+        variables: Optional[Dict[str, float]] = None,
+        cursor: Optional[int] = None,
+    ) -> int:
+        """Queue text for evaluation, superseding earlier requests"""
+        with self._condition:
+            self._generation += 1
+            self._pending = _Request(
+                self._generation,
+                text,
+                degrees,
+                dict(variables or {}),
+                cursor,
+                time.monotonic(),
+            )
+            self._result = None
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="preview-worker", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+            return self._generation
+
+    def cancel(self) -> None:
+        """Drop the pending request and any result not yet collected"""
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+            self._result = None
+
+    def poll(self) -> Optional[PreviewResult]:
+        """Take the result of the latest request, if it has finished"""
+        with self._condition:
+            result, self._result = self._result, None
+            return result
+
+    @property
+    def busy(self) -> bool:
+        """Whether a request is pending or being evaluated"""
+        with self._condition:
+            return self._pending is not None or self._running
+
+    def close(self) -> None:
+        """Stop the worker thread"""
+        with self._condition:
+            self._closed = True
+            self._pending = None
+            self._condition.notify()
+
+    def _next_request(self) -> Optional[_Request]:
+        """Wait for a request that has not been superseded for delay seconds"""
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                request = self._pending
+                if request is None:
+                    self._condition.wait()
+                    continue
+                remaining = request.submitted + self.delay - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._pending = None
+                self._running = True
+                return request
+
+    def _run(self) -> None:
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            value, error = None, None
+            try:
+                value = self.evaluator.update(
+                    request.text, request.degrees, request.variables, request.cursor
+                )
+            except Exception as e:
+                error = e
+            with self._condition:
+                self._running = False
+                if request.generation == self._generation:
+                    self._result = PreviewResult(
+                        request.generation, request.text, value, error
+                    )
@@ -0,0 +1,83 @@
+"""
+Opt-in timing of the stages of an evaluation
+"""
+
+import time
+from typing import Dict, Optional
+
+# Stages in pipeline order. lookup is the cache lookup itself, transfer
+# the round trip to a sandbox worker and format the front end's
+# conversion of the result for display.
+STAGES = (
+    "lookup",
+    "tokenize",
+    "parse",
+    "optimize",
+    "compile",
+    "execute",
+    "transfer",
+    "format",
+)
+
+clock = time.perf_counter
+
+
+def format_duration(seconds: float) -> str:
+    """Human-readable duration"""
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+class EvaluationProfile:
+    """
+    Seconds spent in each stage of one evaluation. Passing a profile to
+    evaluate() fills it in; without one, evaluation takes no timings.
+    Stages that did not run, such as compilation on a cache hit, are
+    absent.
+    """
+
+    __slots__ = ("text", "stages")
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add time spent in a stage"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def merge(self, stages: Dict[str, float]) -> None:
+        """Add the stage times of another profile, e.g. from a worker"""
+        for stage, seconds in stages.items():
+            self.add(stage, seconds)
+
+    @property
+    def cached(self) -> bool:
+        """Whether the compiled expression came from the cache"""
+        return "compile" not in self.stages
+
+    @property
+    def total(self) -> float:
+        """Seconds spent in all stages"""
+        return sum(self.stages.values())
+
+    def get(self, stage: str) -> Optional[float]:
+        """Seconds spent in stage, or None if it did not run"""
+        return self.stages.get(stage)
+
+    def summary(self) -> str:
+        """One line listing the stages in pipeline order"""
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        stages = sorted(
+            self.stages.items(), key=lambda item: order.get(item[0], len(order))
+        )
+        parts = [f"{stage} {format_duration(seconds)}" for stage, seconds in stages]
+        parts.append(f"total {format_duration(self.total)}")
+        summary = ", ".join(parts)
+        return f"{summary} (cached)" if self.cached else summary
+
+    def __repr__(self) -> str:
+        return f"EvaluationProfile({self.text!r}, {self.stages!r})"
@@ -0,0 +1,288 @@
+"""
+Adaptive Gauss-Kronrod integration of compiled expressions
+"""
+
+import math
+import sys
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .cache import ExpressionCache, default_cache
+from .errors import ConvergenceError, ExpressionError
+from .functions import CONSTANTS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; nodes are then evaluated one at a time
+    np = None
+
+DEFAULT_TOLERANCE = 1e-10
+DEFAULT_RELATIVE_TOLERANCE = 1e-10
+DEFAULT_MAX_EVALUATIONS = 30_000
+_EPSILON = sys.float_info.epsilon
+
+# Non-negative nodes of the 15-point Kronrod rule on [-1, 1], their weights
+# and the weights of the 7-point Gauss rule using every other node
+_HALF_NODES = (
+    0.991455371120812639206854697526329,
+    0.949107912342758524526189684047851,
+    0.864864423359769072789712788640926,
+    0.741531185599394439863864773280788,
+    0.586087235467691130294144845693013,
+    0.405845151377397166906606412076961,
+    0.207784955007898467600689403773245,
+    0.0,
+)
+_HALF_KRONROD = (
+    0.022935322010529224963732008058970,
+    0.063092092629978553290700663189204,
+    0.104790010322250183839876322541518,
+    0.140653259715525918745189590510238,
+    0.169004726639267902826583426598550,
+    0.190350578064785409913256402421014,
+    0.204432940075298892414161999234649,
+    0.209482141084727828012999174891714,
+)
+_HALF_GAUSS = (
+    0.0,
+    0.129484966168869693270611432679082,
+    0.0,
+    0.279705391489276667901467771423780,
+    0.0,
+    0.381830050505118944950369775488975,
+    0.0,
+    0.417959183673469387755102040816327,
+)
+
+
+def _mirror(half: Sequence[float], sign: float = 1.0) -> Tuple[float, ...]:
+    """Values at all 15 nodes, from -1 to 1, given those from 1 down to 0"""
+    return tuple(sign * value for value in half[:-1]) + tuple(reversed(half))
+
+
+NODES = _mirror(_HALF_NODES, -1.0)
+KRONROD_WEIGHTS = _mirror(_HALF_KRONROD)
+GAUSS_WEIGHTS = _mirror(_HALF_GAUSS)
+NODE_COUNT = len(NODES)
+# NODES and the weights as arrays, made on first use
+_ARRAYS: Dict[str, object] = {}
+
+
+class Quadrature(NamedTuple):
+    """A definite integral and what it cost to compute"""
+
+    value: float
+    # Estimated absolute error of value
+    error: float
+    # Number of times the integrand was evaluated
+    evaluations: int
+    # Number of subintervals the range ended up split into
+    panels: int
+    converged: bool
+
+
+def _estimate(
+    half: float, kronrod: float, gauss: float, spread: float, size: float
+) -> Tuple[float, float]:
+    """
+    Integral over one panel and its error estimate, from sums over the
+    nodes of the weighted values (kronrod, gauss), of their absolute
+    deviations from the mean (spread) and of their absolute values (size).
+    The difference of the two rules is scaled as in QUADPACK, which is
+    far less pessimistic for smooth integrands.
+    """
+    width = abs(half)
+    error = width * abs(kronrod - gauss)
+    spread *= width
+    if spread and error:
+        error = spread * min(1.0, (200 * error / spread) ** 1.5)
+    # Nothing below the rounding error of the sum itself can be resolved
+    return half * kronrod, max(error, 50 * _EPSILON * width * size)
+
+
+def _panels_python(
+    function: Callable, panels: List[Tuple[float, float]]
+) -> List[Tuple[float, float]]:
+    """Integral and error of each panel, calling function at each node"""
+    results = []
+    for low, high in panels:
+        center, half = 0.5 * (low + high), 0.5 * (high - low)
+        values = [float(function(center + half * node)) for node in NODES]
+        kronrod = math.fsum(w * v for w, v in zip(KRONROD_WEIGHTS, values))
+        gauss = math.fsum(w * v for w, v in zip(GAUSS_WEIGHTS, values))
+        mean = 0.5 * kronrod
+        spread = math.fsum(w * abs(v - mean) for w, v in zip(KRONROD_WEIGHTS, values))
+        size = math.fsum(w * abs(v) for w, v in zip(KRONROD_WEIGHTS, values))
+        results.append(_estimate(half, kronrod, gauss, spread, size))
+    return results
+
+
+def _panels_numpy(
+    function: Callable, panels: List[Tuple[float, float]]
+) -> List[Tuple[float, float]]:
+    """
+    Integral and error of each panel, from one call on all their nodes;
+    the same estimate as _estimate, for every panel at once
+    """
+    if not _ARRAYS:
+        _ARRAYS.update(
+            nodes=np.array(NODES),
+            weights=np.array([KRONROD_WEIGHTS, GAUSS_WEIGHTS]).T,
+        )
+    bounds = np.array(panels)
+    centers = 0.5 * (bounds[:, 0] + bounds[:, 1])
+    halves = 0.5 * (bounds[:, 1] - bounds[:, 0])
+    points = centers[:, None] + halves[:, None] * _ARRAYS["nodes"]
+    values = np.asarray(function(points.ravel()), dtype=float)
+    if values.shape != (points.size,):
+        values = np.broadcast_to(values, (points.size,))
+    values = values.reshape(points.shape)
+    weights = _ARRAYS["weights"]
+    kronrod, gauss = (values @ weights).T
+    spread = np.abs(values - 0.5 * kronrod[:, None]) @ weights[:, 0]
+    size = np.abs(values) @ weights[:, 0]
+    widths = np.abs(halves)
+    errors = widths * np.abs(kronrod - gauss)
+    spread *= widths
+    with np.errstate(all="ignore"):
+        scaled = spread * np.minimum(1.0, (200 * errors / spread) ** 1.5)
+    errors = np.where((spread != 0) & (errors != 0), scaled, errors)
+    errors = np.maximum(errors, 50 * _EPSILON * widths * size)
+    return list(zip((halves * kronrod).tolist(), errors.tolist()))
+
+
+def _check_limits(
+    tolerance: float, relative_tolerance: float, max_evaluations: int
+) -> None:
+    if tolerance < 0 or relative_tolerance < 0:
+        raise ValueError("Tolerances cannot be negative")
+    if not (tolerance or relative_tolerance):
+        raise ValueError("At least one tolerance must be positive")
+    if max_evaluations < NODE_COUNT:
+        raise ValueError(f"At least {NODE_COUNT} evaluations are needed")
+
+
+def quadrature(
+    function: Callable,
+    a: float,
+    b: float,
+    tolerance: float = DEFAULT_TOLERANCE,
+    relative_tolerance: float = DEFAULT_RELATIVE_TOLERANCE,
+    max_evaluations: int = DEFAULT_MAX_EVALUATIONS,
+    vectorized: bool = False,
+) -> Quadrature:
+    """
+    Integrate function from a to b with the 15-point Gauss-Kronrod rule,
+    bisecting the panels whose error estimate exceeds their share of
+    max(tolerance, relative_tolerance * |integral|) until the total error
+    is within it or max_evaluations would be exceeded. With vectorized,
+    function takes a NumPy array of points, and every round of bisection
+    evaluates the nodes of all new panels in a single call.
+    """
+    _check_limits(tolerance, relative_tolerance, max_evaluations)
+    a, b = float(a), float(b)
+    if not (math.isfinite(a) and math.isfinite(b)):
+        raise ValueError("Integration limits must be finite")
+    if a == b:
+        return Quadrature(0.0, 0.0, 0, 0, True)
+    rule = _panels_numpy if vectorized else _panels_python
+    panels = [(a, b)]
+    estimates = rule(function, panels)
+    evaluations = NODE_COUNT
+    width = abs(b - a)
+    while True:
+        value = math.fsum(estimate for estimate, _ in estimates)
+        error = math.fsum(panel_error for _, panel_error in estimates)
+        if not (math.isfinite(value) and math.isfinite(error)):
+            raise ValueError("Integrand is undefined or infinite between the limits")
+        target = max(tolerance, relative_tolerance * abs(value))
+        if error <= target:
+            return Quadrature(value, error, evaluations, len(panels), True)
+        # Bisect the panels over their share of the target, worst first, as
+        # many as the remaining evaluations allow
+        budget = (max_evaluations - evaluations) // (2 * NODE_COUNT)
+        over = [
+            index
+            for index, (low, high) in enumerate(panels)
+            if estimates[index][1] * width > target * abs(high - low)
+            and low != 0.5 * (low + high) != high
+        ]
+        over.sort(key=lambda index: estimates[index][1], reverse=True)
+        split = over[:budget]
+        if not split:
+            return Quadrature(value, error, evaluations, len(panels), False)
+        halves = []
+        for index in split:
+            low, high = panels[index]
+            middle = 0.5 * (low + high)
+            halves += [(low, middle), (middle, high)]
+        chosen = set(split)
+        kept = [index for index in range(len(panels)) if index not in chosen]
+        panels = [panels[index] for index in kept] + halves
+        estimates = [estimates[index] for index in kept] + rule(function, halves)
+        evaluations += NODE_COUNT * len(halves)
+
+
+def integral(function: Callable, a: float, b: float) -> float:
+    """
+    The integral of a function of one float from a to b, as computed for
+    integrate() in expressions; raises ConvergenceError if the default
+    tolerances cannot be met
+    """
+    result = quadrature(function, a, b)
+    if not result.converged:
+        raise ConvergenceError(
+            f"integrate() did not converge; error estimate {result.error:.3g}"
+        )
+    return result.value
+
+
+def integrate(
+    expression: str,
+    variable: str,
+    a: float,
+    b: float,
+    /,
+    degrees: bool = True,
+    tolerance: float = DEFAULT_TOLERANCE,
+    relative_tolerance: float = DEFAULT_RELATIVE_TOLERANCE,
+    max_evaluations: int = DEFAULT_MAX_EVALUATIONS,
+    cache: Optional[ExpressionCache] = None,
+    **values,
+) -> Quadrature:
+    """
+    Integrate expression with respect to variable from a to b, e.g.
+    integrate("x^2 * sin(x)", "x", 0, 180). Every other name takes its
+    value from values. The expression is compiled once; with NumPy each
+    round of bisection evaluates it on the nodes of all new panels at once,
+    otherwise point by point. The result carries the error estimate and
+    evaluation count, and is returned even when converged is False. The
+    limits are positional, so values may include names such as a and b.
+    """
+    if cache is None:
+        cache = default_cache
+    if variable in CONSTANTS:
+        raise ExpressionError(f"Cannot integrate over constant {variable!r}")
+    values.pop(variable, None)
+    compiled = cache.get(expression, degrees)
+    for name in compiled.variables:
+        if name != variable and name not in values:
+            raise ExpressionError(f"Unknown name {name!r}")
+    if np is not None:
+        from .vectorized import evaluate_many
+
+        def function(points):
+            with np.errstate(all="ignore"):
+                return evaluate_many(
+                    expression, degrees, cache, **values, **{variable: points}
+                )
+
+        vectorized = True
+    else:
+
+        def function(x):
+            return compiled.evaluate(**values, **{variable: x})
+
+        vectorized = False
+    return quadrature(
+        function, a, b, tolerance, relative_tolerance, max_evaluations, vectorized
+    )
@@ -0,0 +1,271 @@
+"""
+Evaluation in a pool of worker processes with time and memory budgets
+"""
+
+import multiprocessing
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .backends import NumericBackend
+from .errors import (
+    EvaluationTimeout,
+    ExpressionError,
+    MemoryLimitExceeded,
+    ResourceLimitError,
+)
+from .profiling import EvaluationProfile, clock
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; only time limits apply there
+    resource = None
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+
+# Workers are never forked from the caller directly: a fork taken while
+# another thread holds a lock (e.g. the expression cache's) deadlocks
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Exception types a worker may report, re-raised as themselves in the caller
+_ERROR_TYPES = {
+    "ExpressionError": ExpressionError,
+    "ValueError": ValueError,
+    "ZeroDivisionError": ZeroDivisionError,
+    "OverflowError": OverflowError,
+    "TypeError": TypeError,
+}
+
+
+def _apply_memory_limit(limit: Optional[int]) -> None:
+    """Cap the address space of the current process"""
+    if not limit or resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(
+    conn, memory_limit: Optional[int], cache_file: Optional[str] = None
+) -> None:
+    """
+    Serve requests from conn until it is closed: ("evaluate", text,
+    degrees, variables, profiled, mode) or ("call", function, args, kwargs).
+    Compiled expressions saved in cache_file are loaded first.
+    """
+    _apply_memory_limit(memory_limit)
+    from .backends import get_backend
+    from .evaluator import evaluate
+
+    if cache_file:
+        from .cache import default_cache
+
+        default_cache.load(cache_file)
+
+    backends: Dict[tuple, NumericBackend] = {}
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        profile = None
+        try:
+            if request[0] == "call":
+                _, function, args, kwargs = request
+                value = function(*args, **kwargs)
+            else:
+                _, text, degrees, variables, profiled, mode = request
+                profile = EvaluationProfile(text) if profiled else None
+                backend = None
+                if mode is not None:
+                    if mode not in backends:
+                        backends[mode] = get_backend(*mode)
+                    backend = backends[mode]
+                value = evaluate(
+                    text, degrees, variables=variables, backend=backend, profile=profile
+                )
+            reply = (True, value, profile.stages if profile is not None else None)
+        except MemoryError:
+            reply = (False, "MemoryError", "Memory limit exceeded")
+        except Exception as e:
+            reply = (False, type(e).__name__, str(e))
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send((False, "MemoryError", "Result too large to return"))
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe"""
+
+    def __init__(
+        self, context, memory_limit: Optional[int], cache_file: Optional[str] = None
+    ):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit, cache_file),
+            name="calc-sandbox",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, kill: bool = False) -> None:
+        """Shut the process down, killing it if it is busy"""
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                self.process.kill()
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    A pool of warm worker processes evaluating expressions under a
+    wall-clock timeout and a memory limit. A worker that exceeds a budget
+    is killed and replaced, and the caller gets EvaluationTimeout or
+    MemoryLimitExceeded; ordinary math errors are re-raised unchanged.
+    Workers start with the compiled expressions saved in cache_file.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        timeout: float = DEFAULT_TIMEOUT,
+        memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+        context=None,
+        cache_file: Optional[str] = None,
+    ):
+        if workers < 1:
+            raise ValueError("A sandbox pool needs at least one worker")
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.cache_file = cache_file
+        self.context = context or multiprocessing.get_context(START_METHOD)
+        self.replaced = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        for _ in range(workers):
+            self._add_worker()
+
+    def _add_worker(self) -> None:
+        worker = _Worker(self.context, self.memory_limit, self.cache_file)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker: _Worker) -> None:
+        """Kill a worker that broke its budget and start a fresh one"""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self.replaced += 1
+        worker.stop(kill=True)
+        if not self._closed:
+            self._add_worker()
+
+    def _run(self, request: tuple, timeout: Optional[float]):
+        """
+        Send request to an idle worker and return its reply, enforcing the
+        budgets; blocks while every worker is busy
+        """
+        if self._closed:
+            raise RuntimeError("Sandbox pool is closed")
+        if timeout is None:
+            timeout = self.timeout
+        worker = self._idle.get()
+        try:
+            if self._closed:
+                raise RuntimeError("Sandbox pool is closed")
+            worker.conn.send(request)
+            if not worker.conn.poll(timeout):
+                self._replace(worker)
+                worker = None
+                raise EvaluationTimeout(f"Evaluation exceeded {timeout:g}s")
+            reply = worker.conn.recv()
+        except (EOFError, OSError):
+            # The process died, e.g. killed by the OS for using too much memory
+            self._replace(worker)
+            worker = None
+            raise ResourceLimitError("Evaluation worker exited unexpectedly")
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+        if reply[0]:
+            return reply
+        _, error_type, message = reply
+        if error_type == "MemoryError":
+            raise MemoryLimitExceeded(message)
+        raise _ERROR_TYPES.get(error_type, ExpressionError)(message)
+
+    def evaluate(
+        self,
+        text: str,
+        degrees: bool = True,
+        variables: Optional[Dict[str, float]] = None,
+        timeout: Optional[float] = None,
+        profile: Optional[EvaluationProfile] = None,
+        backend: Optional[NumericBackend] = None,
+    ):
+        """
+        Evaluate text in a worker process, enforcing the budgets. profile
+        receives the worker's stage times and the round trip as transfer.
+        A backend other than float is recreated in the worker by name.
+        """
+        mode = None
+        if backend is not None and not backend.native:
+            mode = (backend.name, getattr(backend, "precision", None))
+        started = clock()
+        _, value, stages = self._run(
+            ("evaluate", text, degrees, variables, profile is not None, mode), timeout
+        )
+        if profile is not None:
+            worker_time = sum(stages.values())
+            profile.merge(stages)
+            profile.add("transfer", clock() - started - worker_time)
+        return value
+
+    def call(
+        self,
+        function: Callable,
+        args: Sequence = (),
+        kwargs: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Return function(*args, **kwargs) computed in a worker process under
+        the budgets. function must be importable by name, i.e. defined at
+        the top level of a module, and its arguments and result picklable.
+        """
+        return self._run(("call", function, tuple(args), kwargs or {}), timeout)[1]
+
+    def close(self) -> None:
+        """Stop all worker processes"""
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self) -> "SandboxPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
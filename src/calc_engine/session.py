@@ -0,0 +1,108 @@
+"""
+Evaluation for an interactive front end, without any GUI dependencies
+"""
+
+from typing import TYPE_CHECKING, Dict, Optional
+
+from .backends import NumericBackend
+from .evaluator import evaluate
+from .profiling import EvaluationProfile, clock
+
+if TYPE_CHECKING:
+    from .metrics import EvaluationMetrics
+
+
+class EvaluationSession:
+    """
+    Evaluates expressions for one calculator window. When sandboxed, they
+    run in a worker process under a time limit; the worker (and the
+    multiprocessing machinery) is only started on first use, and if it
+    cannot be started evaluation falls back to this process. The worker
+    starts with the compiled expressions saved in cache_file.
+    """
+
+    def __init__(
+        self,
+        sandboxed: bool = True,
+        timeout: Optional[float] = None,
+        cache_file: Optional[str] = None,
+    ):
+        self.sandboxed = sandboxed
+        self.timeout = timeout
+        self.cache_file = cache_file
+        self._sandbox = None
+
+    def sandbox(self):
+        """Return the worker pool, starting it if needed, or None"""
+        if self._sandbox is None and self.sandboxed:
+            from .sandbox import DEFAULT_TIMEOUT, SandboxPool
+
+            timeout = DEFAULT_TIMEOUT if self.timeout is None else self.timeout
+            try:
+                self._sandbox = SandboxPool(
+                    workers=1, timeout=timeout, cache_file=self.cache_file
+                )
+            except OSError:
+                self.sandboxed = False
+        return self._sandbox
+
+    def evaluate(
+        self,
+        expression: str,
+        degrees: bool = True,
+        variables: Optional[Dict[str, float]] = None,
+        profile: Optional[EvaluationProfile] = None,
+        backend: Optional[NumericBackend] = None,
+    ):
+        """
+        Evaluate an expression, in the sandbox if there is one; profile
+        receives the stage times
+        """
+        sandbox = self.sandbox()
+        if sandbox is None:
+            return evaluate(
+                expression,
+                degrees=degrees,
+                variables=variables,
+                backend=backend,
+                profile=profile,
+            )
+        return sandbox.evaluate(
+            expression, degrees, variables, profile=profile, backend=backend
+        )
+
+    def calculate(
+        self,
+        expression: str,
+        degrees: bool = True,
+        variables: Optional[Dict[str, float]] = None,
+        profile: Optional[EvaluationProfile] = None,
+        backend: Optional[NumericBackend] = None,
+        metrics: Optional["EvaluationMetrics"] = None,
+    ):
+        """
+        evaluate() as the calculators use it: float-mode results are
+        returned as floats, profile also gets the "format" stage, and the
+        time taken and any error are recorded in metrics
+        """
+        started = clock()
+        try:
+            result = self.evaluate(expression, degrees, variables, profile, backend)
+            if backend is None or backend.native:
+                converting = clock()
+                result = float(result)
+                if profile is not None:
+                    profile.add("format", clock() - converting)
+        except Exception as e:
+            if metrics is not None:
+                metrics.record(clock() - started, error=e)
+            raise
+        if metrics is not None:
+            metrics.record(clock() - started, profile=profile)
+        return result
+
+    def close(self) -> None:
+        """Stop the worker process, if one was started"""
+        if self._sandbox is not None:
+            self._sandbox.close()
+            self._sandbox = None
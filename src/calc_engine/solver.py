@@ -0,0 +1,467 @@
+"""
+Numeric root finding on compiled expressions
+"""
+
+import math
+import numbers
+import sys
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .autodiff import DUAL, Dual, lift
+from .cache import ExpressionCache, default_cache
+from .compiler import CompiledExpression
+from .errors import ConvergenceError, ExpressionError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; solve_many() then solves point by point
+    np = None
+
+DEFAULT_TOLERANCE = 1e-12
+DEFAULT_MAX_ITERATIONS = 100
+METHODS = ("newton", "brent")
+# The bracket search probes guess +- step * 2^k, for k below this
+_SEARCH_DOUBLINGS = 64
+# Times a Newton step landing where f is undefined is halved before giving up
+_DAMPING_HALVINGS = 60
+_EPSILON = sys.float_info.epsilon
+
+
+class Root(NamedTuple):
+    """A solution of f(x) = 0 and how it was found"""
+
+    x: float
+    # f(x), which is not exactly zero unless x is an exact root
+    residual: float
+    iterations: int
+    method: str
+
+
+def equation_text(expression: str) -> str:
+    """Rewrite "lhs = rhs" as "(lhs) - (rhs)", which is zero at its solutions"""
+    if "=" not in expression:
+        return expression
+    left, right = expression.split("=", 1)
+    if "=" in right:
+        raise ExpressionError("An equation can only contain one '='")
+    return f"({left}) - ({right})"
+
+
+def _same_sign(a: float, b: float) -> bool:
+    return (a > 0 and b > 0) or (a < 0 and b < 0)
+
+
+def _tolerance(tolerance: float, x: float) -> float:
+    """Absolute tolerance, widened where float spacing near x is coarser"""
+    return tolerance + 4 * _EPSILON * abs(x)
+
+
+def _float(value: object) -> object:
+    """value, as a float if it is a number of another type"""
+    if isinstance(value, numbers.Number) and not isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+class Equation:
+    """
+    expression = 0 as a function of one variable, compiled once for floats
+    and once for dual numbers (which also give the slope); every other
+    name in the expression takes its value from values (exact numbers,
+    e.g. Decimal and Fraction, as floats)
+    """
+
+    def __init__(
+        self,
+        expression: str,
+        variable: str = "x",
+        degrees: bool = True,
+        values: Optional[Dict[str, object]] = None,
+        cache: Optional[ExpressionCache] = None,
+    ):
+        if cache is None:
+            cache = default_cache
+        self.text = equation_text(expression)
+        self.variable = variable
+        self.values = {
+            name: _float(value)
+            for name, value in (values or {}).items()
+            if name != variable
+        }
+        self.function = self._bind(cache.get(self.text, degrees))
+        self.dual = self._bind(cache.get(self.text, degrees, DUAL))
+
+    def _bind(self, compiled: CompiledExpression) -> Callable:
+        """compiled as a function of the variable alone"""
+        names = compiled.variables
+        if self.variable not in names:
+            raise ExpressionError(f"Expression does not depend on {self.variable!r}")
+        args = []
+        for name in names:
+            if name != self.variable:
+                if name not in self.values:
+                    raise ExpressionError(f"Unknown name {name!r}")
+                args.append(self.values[name])
+        index = names.index(self.variable)
+        before, after = tuple(args[:index]), tuple(args[index:])
+        function = compiled.function
+        return lambda x: function(*before, x, *after)
+
+    def __call__(self, x: float) -> float:
+        """f(x)"""
+        return float(self.function(x))
+
+    def slope(self, x: float) -> Tuple[float, float]:
+        """f(x) and f'(x), from one evaluation with dual numbers"""
+        result = lift(self.dual(Dual(x, 1)))
+        return float(result.value), float(result.slope)
+
+
+def find_bracket(
+    equation: Equation, guess: float = 0.0
+) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Look outwards from guess, in steps doubling from 1% of its size, for
+    an interval over which f changes sign. Returns its ends a, b and f(a),
+    f(b), or None. Points where f is undefined are skipped.
+    """
+    step = 0.01 * max(1.0, abs(guess))
+    try:
+        value = equation(guess)
+    except (ArithmeticError, ValueError):
+        value = None
+    else:
+        if value == 0:
+            return guess, guess, value, value
+    # Last point probed on each side, with f there
+    sides = [(guess, value), (guess, value)]
+    for k in range(_SEARCH_DOUBLINGS):
+        for side, direction in enumerate((1, -1)):
+            x = guess + direction * step * 2**k
+            try:
+                fx = equation(x)
+            except (ArithmeticError, ValueError):
+                continue
+            last, f_last = sides[side]
+            if fx == 0 or (f_last is not None and not _same_sign(fx, f_last)):
+                if f_last is None:
+                    return x, x, fx, fx
+                return last, x, f_last, fx
+            sides[side] = (x, fx)
+    return None
+
+
+def _newton_bisection(
+    equation: Equation,
+    a: float,
+    b: float,
+    fa: float,
+    tolerance: float,
+    max_iterations: int,
+) -> Root:
+    """
+    Newton's method with exact slopes, kept inside the sign-change bracket
+    [a, b]: a Newton step that would leave the bracket, or that shrinks
+    too slowly, is replaced by bisection, so convergence is guaranteed
+    """
+    low, high = (a, b) if fa < 0 else (b, a)
+    x = 0.5 * (a + b)
+    step = older = abs(b - a)
+    for iteration in range(1, max_iterations + 1):
+        try:
+            f, df = equation.slope(x)
+        except (ArithmeticError, ValueError):
+            # Defined here, but with no usable slope (e.g. sqrt at 0)
+            f, df = equation(x), math.nan
+        if f == 0:
+            return Root(x, f, iteration, "newton")
+        if f < 0:
+            low = x
+        else:
+            high = x
+        following = 0.5 * (low + high)
+        if df and math.isfinite(df) and abs(2 * f) <= abs(older * df):
+            newton = x - f / df
+            inside = min(low, high) < newton < max(low, high)
+            # A last step too small to move x off the bracket's end is kept
+            if inside or abs(newton - x) <= _tolerance(tolerance, x):
+                following = newton
+        older, step = step, abs(following - x)
+        x = following
+        if step <= _tolerance(tolerance, x):
+            return Root(x, equation(x), iteration, "newton")
+    raise ConvergenceError(f"No root found within {max_iterations} iterations")
+
+
+def _brent(
+    equation: Equation,
+    a: float,
+    b: float,
+    fa: float,
+    fb: float,
+    tolerance: float,
+    max_iterations: int,
+) -> Root:
+    """
+    Brent's method: inverse quadratic interpolation or secant steps inside
+    the bracket [a, b], falling back to bisection; needs no slopes
+    """
+    c, fc = b, fb
+    d = e = b - a
+    for iteration in range(1, max_iterations + 1):
+        if _same_sign(fb, fc):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 0.5 * _tolerance(tolerance, b)
+        middle = 0.5 * (c - b)
+        if abs(middle) <= tol or fb == 0:
+            return Root(b, fb, iteration, "brent")
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # Secant step
+                p = 2 * middle * s
+                q = 1 - s
+            else:
+                # Inverse quadratic interpolation
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * middle * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * middle * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = middle
+        else:
+            d = e = middle
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, middle)
+        fb = equation(b)
+    raise ConvergenceError(f"No root found within {max_iterations} iterations")
+
+
+def _newton(
+    equation: Equation, x: float, tolerance: float, max_iterations: int
+) -> Root:
+    """
+    Plain Newton's method from x, for roots without a sign change. A step
+    that lands where f is undefined is halved back towards x until f is
+    defined again.
+    """
+    f, df = _defined_slope(equation, x)
+    if f is None:
+        raise ConvergenceError(f"f is undefined at the starting point {x}")
+    for iteration in range(1, max_iterations + 1):
+        if f == 0:
+            return Root(x, f, iteration, "newton")
+        if not df or not math.isfinite(df):
+            raise ConvergenceError(f"Newton's method stopped at a zero slope at {x}")
+        step = f / df
+        for _ in range(_DAMPING_HALVINGS):
+            following = x - step
+            if not math.isfinite(following):
+                raise ConvergenceError("Newton's method diverged")
+            f, df = _defined_slope(equation, following)
+            if f is not None:
+                break
+            step *= 0.5
+        else:
+            raise ConvergenceError(f"Newton's method left the domain of f at {x}")
+        x = following
+        if abs(step) <= _tolerance(tolerance, x):
+            return Root(x, f, iteration, "newton")
+    raise ConvergenceError(f"No root found within {max_iterations} iterations")
+
+
+def _defined_slope(
+    equation: Equation, x: float
+) -> Tuple[Optional[float], Optional[float]]:
+    """f(x) and f'(x), or None, None where f is undefined or not finite"""
+    try:
+        f, df = equation.slope(x)
+    except (ArithmeticError, ValueError):
+        return None, None
+    if not math.isfinite(f):
+        return None, None
+    return f, df
+
+
+def _check_limits(method: str, tolerance: float, max_iterations: int) -> None:
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}; choose from {', '.join(METHODS)}")
+    if not tolerance > 0:
+        raise ValueError("Tolerance must be positive")
+    if max_iterations < 1:
+        raise ValueError("At least one iteration is needed")
+
+
+def solve(
+    expression: str,
+    variable: str = "x",
+    bracket: Optional[Tuple[float, float]] = None,
+    guess: Optional[float] = None,
+    degrees: bool = True,
+    method: str = "newton",
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+    cache: Optional[ExpressionCache] = None,
+    **values,
+) -> Root:
+    """
+    Solve expression = 0, or an equation "lhs = rhs", for variable, e.g.
+    solve("x^3 - 2x - 5") or solve("x^2 = a", a=2). The expression is
+    compiled once. Within bracket, whose ends must give f opposite signs,
+    or else within one found by searching outwards from guess (default 0),
+    "newton" uses Newton steps with exact slopes safeguarded by bisection
+    and "brent" uses Brent's method. If no sign change is found, plain
+    Newton's method runs from guess. The root is accurate to about
+    tolerance; ConvergenceError is raised after max_iterations.
+    """
+    _check_limits(method, tolerance, max_iterations)
+    equation = Equation(expression, variable, degrees, values, cache)
+    if bracket is None:
+        start = 0.0 if guess is None else float(guess)
+        found = find_bracket(equation, start)
+        if found is None:
+            if method == "brent":
+                raise ConvergenceError(f"No sign change found around {start}")
+            return _newton(equation, start, tolerance, max_iterations)
+        a, b, fa, fb = found
+    else:
+        a, b = (float(end) for end in bracket)
+        fa, fb = equation(a), equation(b)
+        if _same_sign(fa, fb):
+            raise ValueError("The expression must change sign over the bracket")
+    if fa == 0:
+        return Root(a, fa, 0, method)
+    if fb == 0:
+        return Root(b, fb, 0, method)
+    if method == "brent":
+        return _brent(equation, a, b, fa, fb, tolerance, max_iterations)
+    return _newton_bisection(equation, a, b, fa, tolerance, max_iterations)
+
+
+def solve_many(
+    expression: str,
+    bracket: Tuple[object, object],
+    variable: str = "x",
+    degrees: bool = True,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+    cache: Optional[ExpressionCache] = None,
+    **values,
+):
+    """
+    Solve one equation for many parameter values at once, e.g.
+    solve_many("x^2 - a", (0, 10), a=numpy.arange(1, 1000)). Parameters
+    and bracket ends may be arrays. With NumPy, safeguarded Newton steps
+    run on every point together and an array of roots is returned, nan
+    where the bracket has no sign change or the solver did not converge;
+    without it each point is solved in turn and a list is returned.
+    """
+    _check_limits("newton", tolerance, max_iterations)
+    low, high = bracket
+    if np is None:
+        # Check the expression and names once, before errors mean "no root"
+        Equation(expression, variable, degrees, values, cache)
+        points = dict(values, _low=low, _high=high)
+        return _solve_python(
+            expression, variable, degrees, tolerance, max_iterations, cache, points
+        )
+    values = {
+        name: value if isinstance(value, (int, float)) else np.asarray(value, float)
+        for name, value in values.items()
+    }
+    equation = Equation(expression, variable, degrees, values, cache)
+    shape = np.broadcast(low, high, *values.values()).shape
+    low = np.array(np.broadcast_to(np.asarray(low, float), shape))
+    high = np.array(np.broadcast_to(np.asarray(high, float), shape))
+
+    def evaluate(x) -> Tuple["np.ndarray", "np.ndarray"]:
+        result = lift(equation.dual(Dual(x, 1)))
+        value = np.broadcast_to(result.value, shape)
+        return value, np.broadcast_to(result.slope, shape)
+
+    with np.errstate(all="ignore"):
+        f_low = evaluate(low)[0]
+        f_high = evaluate(high)[0]
+        roots = np.full(shape, np.nan)
+        roots = np.where(f_high == 0, high, roots)
+        roots = np.where(f_low == 0, low, roots)
+        active = np.sign(f_low) * np.sign(f_high) < 0
+        # Orient each bracket so that f(low) < 0
+        swap = f_low > 0
+        low, high = np.where(swap, high, low), np.where(swap, low, high)
+        x = 0.5 * (low + high)
+        step = older = np.abs(high - low)
+        for _ in range(max_iterations):
+            if not active.any():
+                break
+            f, df = evaluate(x)
+            exact = active & (f == 0)
+            roots = np.where(exact, x, roots)
+            active &= ~exact & ~np.isnan(f)
+            negative = f < 0
+            low = np.where(active & negative, x, low)
+            high = np.where(active & ~negative, x, high)
+            newton = x - f / df
+            inside = (newton > np.minimum(low, high)) & (newton < np.maximum(low, high))
+            inside |= np.abs(newton - x) <= tolerance + 4 * _EPSILON * np.abs(x)
+            use_newton = inside & (np.abs(2 * f) <= np.abs(older * df))
+            following = np.where(use_newton, newton, 0.5 * (low + high))
+            older, step = step, np.abs(following - x)
+            x = np.where(active, following, x)
+            done = active & (step <= tolerance + 4 * _EPSILON * np.abs(x))
+            roots = np.where(done, x, roots)
+            active &= ~done
+    return roots
+
+
+def _solve_python(
+    expression: str,
+    variable: str,
+    degrees: bool,
+    tolerance: float,
+    max_iterations: int,
+    cache: Optional[ExpressionCache],
+    points: Dict[str, object],
+) -> List[float]:
+    """
+    solve_many() one point at a time, for when NumPy is missing; the
+    bracket ends are in points as _low and _high
+    """
+    columns = {
+        name: list(value)
+        for name, value in points.items()
+        if not isinstance(value, (int, float))
+    }
+    lengths = {len(column) for column in columns.values()} or {1}
+    if len(lengths) > 1:
+        raise ValueError("All arrays must have the same length")
+    roots = []
+    for index in range(lengths.pop()):
+        point = dict(points)
+        point.update((name, column[index]) for name, column in columns.items())
+        bracket = (point.pop("_low"), point.pop("_high"))
+        try:
+            root = solve(
+                expression,
+                variable,
+                bracket,
+                degrees=degrees,
+                tolerance=tolerance,
+                max_iterations=max_iterations,
+                cache=cache,
+                **point,
+            )
+        except (ArithmeticError, ValueError):
+            roots.append(math.nan)
+        else:
+            roots.append(root.x)
+    return roots
@@ -0,0 +1,72 @@
+"""
+Single-pass tokenizer for calculator expressions
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Tuple, Union
+
+from .errors import ExpressionError
+
+NUMBER = "NUMBER"
+NAME = "NAME"
+OP = "OP"
+END = "END"
+
+# Display symbols accepted by the GUI, mapped to their canonical operator
+_OPERATOR_ALIASES = {"×": "*", "÷": "/", "**": "^"}
+_NAME_ALIASES = {"π": "pi"}
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*|π)
+  | (?P<op>\*\*|[-+*/^()!,|×÷√])
+  | (?P<bad>.)
+    """,
+    re.VERBOSE,
+)
+
+
+class Token(NamedTuple):
+    """A lexical token with its source position"""
+
+    kind: str
+    value: Union[str, int, float]
+    pos: int
+    # Source text of a non-integer number, for backends that are exact
+    text: str = ""
+
+
+def _parse_number(text: str) -> Union[int, float]:
+    """Convert a numeric literal, keeping integers exact"""
+    if text.isdigit():
+        return int(text)
+    return float(text)
+
+
+def scan(text: str, start: int = 0) -> Iterator[Tuple[Token, int]]:
+    """Yield tokens from start onwards, each with its end position"""
+    for match in _TOKEN_RE.finditer(text, start):
+        kind = match.lastgroup
+        value = match.group()
+        pos = match.start()
+        if kind == "ws":
+            continue
+        if kind == "number":
+            number = _parse_number(value)
+            text = "" if isinstance(number, int) else value
+            yield Token(NUMBER, number, pos, text), match.end()
+        elif kind == "name":
+            yield Token(NAME, _NAME_ALIASES.get(value, value), pos), match.end()
+        elif kind == "op":
+            yield Token(OP, _OPERATOR_ALIASES.get(value, value), pos), match.end()
+        else:
+            raise ExpressionError(f"Unexpected character {value!r}", pos)
+
+
+def tokenize(text: str) -> List[Token]:
+    """Split an expression into tokens in a single scan of the input"""
+    tokens = [token for token, _ in scan(text)]
+    tokens.append(Token(END, "", len(text)))
+    return tokens
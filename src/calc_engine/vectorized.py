@@ -0,0 +1,219 @@
+"""
+Batch evaluation of one expression over arrays of variable values
+"""
+
+import math
+from typing import Callable, Dict, List, Optional
+
+from .cache import ExpressionCache, default_cache
+from .compiler import CompiledExpression
+from .errors import ExpressionError
+from .functions import fact, power
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to a pure-Python loop
+    np = None
+
+# Factorials from here on overflow a float
+_FLOAT_FACT_LIMIT = 171
+# Integrands close over the other variables' values, so an expression
+# calling this cannot be bound to arrays
+_INTEGRATE = "F_integrate("
+
+
+def _float_function(function: Callable) -> Callable:
+    """function of one element giving nan outside its domain, inf on overflow"""
+
+    def element(a):
+        try:
+            return function(a)
+        except ValueError:
+            return math.nan
+        except OverflowError:
+            return math.inf
+
+    return element
+
+
+def _float_fact(a):
+    """fact() of one element as a float, treating errors as _float_function"""
+    # Huge exact factorials are not computed only to overflow converting them
+    if a >= _FLOAT_FACT_LIMIT:
+        return math.inf
+    try:
+        return float(fact(a))
+    except ValueError:
+        return math.nan
+    except OverflowError:
+        return math.inf
+
+
+def _array_integrate(function, a, b):
+    raise ExpressionError("integrate() cannot be evaluated over arrays")
+
+
+def _array_namespace(degrees: bool) -> Dict[str, object]:
+    """Build a namespace mapping every engine function to a NumPy ufunc"""
+
+    def array_power(a, b):
+        if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+            return np.power(a, b)
+        return power(a, b)
+
+    def array_log(a, base=None):
+        if base is None:
+            return np.log10(a)
+        return np.log(a) / np.log(base)
+
+    factorial = np.frompyfunc(_float_fact, 1, 1)
+    gamma = np.frompyfunc(_float_function(math.gamma), 1, 1)
+    lgamma = np.frompyfunc(_float_function(math.lgamma), 1, 1)
+
+    def array_fact(a):
+        return np.asarray(factorial(a), dtype=float)
+
+    def array_gamma(a):
+        return np.asarray(gamma(a), dtype=float)
+
+    def array_lgamma(a):
+        return np.asarray(lgamma(a), dtype=float)
+
+    if degrees:
+        trig = {
+            "F_sin": lambda a: np.sin(np.radians(a)),
+            "F_cos": lambda a: np.cos(np.radians(a)),
+            "F_tan": lambda a: np.tan(np.radians(a)),
+            "F_asin": lambda a: np.degrees(np.arcsin(a)),
+            "F_acos": lambda a: np.degrees(np.arccos(a)),
+            "F_atan": lambda a: np.degrees(np.arctan(a)),
+        }
+    else:
+        trig = {
+            "F_sin": np.sin,
+            "F_cos": np.cos,
+            "F_tan": np.tan,
+            "F_asin": np.arcsin,
+            "F_acos": np.arccos,
+            "F_atan": np.arctan,
+        }
+    return dict(
+        trig,
+        __builtins__={},
+        F_pow=array_power,
+        F_sqrt=np.sqrt,
+        F_ln=np.log,
+        F_log=array_log,
+        F_log10=np.log10,
+        F_exp=np.exp,
+        F_abs=np.abs,
+        F_fact=array_fact,
+        F_gamma=array_gamma,
+        F_lgamma=array_lgamma,
+        F_integrate=_array_integrate,
+        K_inf=math.inf,
+        K_nan=math.nan,
+    )
+
+
+_ARRAY_NAMESPACES: Dict[bool, Dict[str, object]] = {}
+
+
+def _namespace_for(degrees: bool) -> Dict[str, object]:
+    namespace = _ARRAY_NAMESPACES.get(degrees)
+    if namespace is None:
+        namespace = _ARRAY_NAMESPACES[degrees] = _array_namespace(degrees)
+    return namespace
+
+
+def array_functions(degrees: bool) -> Dict[str, Callable]:
+    """The NumPy implementation of every engine function, by name"""
+    prefix = "F_"
+    return {
+        name[len(prefix) :]: value
+        for name, value in _namespace_for(degrees).items()
+        if name.startswith(prefix)
+    }
+
+
+def _vector_function(compiled: CompiledExpression) -> Callable:
+    """Return the array implementation of a compiled expression"""
+    if compiled.vector_function is None:
+        compiled.vector_function = compiled.bind(_namespace_for(compiled.code_degrees))
+    return compiled.vector_function
+
+
+def _arguments(compiled: CompiledExpression, arrays: Dict[str, object]) -> list:
+    """Order the supplied arrays by the expression's parameters"""
+    try:
+        return [arrays[name] for name in compiled.variables]
+    except KeyError as e:
+        raise ExpressionError(f"Unknown name {e.args[0]!r}") from None
+
+
+def _evaluate_numpy(compiled: CompiledExpression, args: list):
+    """Evaluate with NumPy ufuncs, broadcasting scalars"""
+    args = [np.asarray(arg, dtype=float) for arg in args]
+    result = np.asarray(_vector_function(compiled)(*args), dtype=float)
+    shape = np.broadcast(*args).shape if args else ()
+    if result.shape != shape:
+        result = np.broadcast_to(result, shape).copy()
+    return result
+
+
+def _evaluate_python(compiled: CompiledExpression, args: list) -> List[float]:
+    """Evaluate point by point with the scalar function"""
+    length = None
+    columns = []
+    for arg in args:
+        if not isinstance(arg, (int, float)):
+            arg = list(arg)
+            if length is None:
+                length = len(arg)
+            elif len(arg) != length:
+                raise ValueError("All arrays must have the same length")
+        columns.append(arg)
+    if length is None:
+        length = 1
+    columns = [
+        [column] * length if isinstance(column, (int, float)) else column
+        for column in columns
+    ]
+    rows = zip(*columns) if columns else [()] * length
+    function = compiled.function
+    results = []
+    for row in rows:
+        try:
+            results.append(float(function(*row)))
+        except (ValueError, ZeroDivisionError):
+            # Match NumPy, which yields nan for points outside a domain
+            results.append(math.nan)
+        except OverflowError:
+            # and inf for results too large for a float
+            results.append(math.inf)
+    return results
+
+
+def evaluate_many(
+    expression: str,
+    degrees: bool = True,
+    cache: Optional[ExpressionCache] = None,
+    **arrays,
+):
+    """
+    Evaluate one expression over arrays of variable values, e.g.
+    evaluate_many("sin(x)*sqrt(x)+ln(x)", x=values). The expression is
+    compiled once. With NumPy installed every function maps to a ufunc and
+    an ndarray is returned; otherwise a list of floats is computed in pure
+    Python. Points outside a function's domain give nan. Expressions
+    containing integrate() are evaluated point by point, into an ndarray.
+    """
+    if cache is None:
+        cache = default_cache
+    compiled = cache.get(expression, degrees)
+    args = _arguments(compiled, arrays)
+    if np is not None and compiled.code is not None:
+        if _INTEGRATE in compiled.source:
+            return np.asarray(_evaluate_python(compiled, args), dtype=float)
+        return _evaluate_numpy(compiled, args)
+    return _evaluate_python(compiled, args)
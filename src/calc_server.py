@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Local JSON evaluation service for the calculator
+
+Each request is one line of JSON, e.g.
+    {"id": 1, "op": "evaluate", "expression": "y = sin(30) + ans"}
+    {"id": 2, "op": "power", "args": [2, 10]}
+and is answered by one line with the same id and either "result" or
+"error". A connection is one session with its own memory, variables and
+last result. Its requests are answered in order, so a client may send
+several before reading any replies. Expressions and math operations are
+computed in sandbox worker processes under a time and memory budget, so
+one expensive request, e.g. "9^9^9", cannot stall the others.
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import math
+import os
+import stat
+import sys
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from calc_engine import evaluate
+from calc_engine.cache import CacheFile
+from calc_engine.metrics import EvaluationMetrics, MetricsExport
+from calc_engine.microbatch import DEFAULT_MAX_BATCH, MicroBatcher
+from calc_engine.profiling import clock
+from calc_engine.sandbox import DEFAULT_TIMEOUT, SandboxPool
+from calculator import AdvancedCalculator, run_operation, split_assignment
+
+if TYPE_CHECKING:
+    import argparse
+
+DEFAULT_PORT = 7341
+MAX_LINE = 64 * 1024
+# Requests read ahead of the one being answered, per connection
+MAX_PIPELINED = 256
+# Sandbox worker processes, i.e. expensive requests computed at once
+DEFAULT_WORKERS = 4
+
+# AdvancedCalculator methods callable as {"op": name, "args": [...]}
+OPERATIONS = frozenset(
+    {
+        "add",
+        "subtract",
+        "multiply",
+        "divide",
+        "power",
+        "square_root",
+        "sin",
+        "cos",
+        "tan",
+        "asin",
+        "acos",
+        "atan",
+        "log",
+        "log10",
+        "ln",
+        "factorial",
+        "absolute",
+        "ceiling",
+        "floor",
+        "round_number",
+        "degrees_to_radians",
+        "radians_to_degrees",
+        "store_memory",
+        "recall_memory",
+        "clear_memory",
+        "set_variable",
+        "get_variable",
+        "clear_variables",
+        "set_backend",
+    }
+)
+# Operations on the session's own state; cheap, so run in the server process
+SESSION_OPERATIONS = frozenset(
+    {
+        "store_memory",
+        "recall_memory",
+        "clear_memory",
+        "set_variable",
+        "get_variable",
+        "clear_variables",
+        "set_backend",
+    }
+)
+
+EVALUATION_METRICS = EvaluationMetrics("server")
+
+
+class ProtocolError(Exception):
+    """A request that is not well formed"""
+
+
+class RemoteError(Exception):
+    """An error reply received by CalculatorClient"""
+
+    def __init__(self, type_name: str, message: str):
+        super().__init__(f"{type_name}: {message}")
+        self.type_name = type_name
+        self.message = message
+
+
+def encode_result(value):
+    """
+    JSON form of a result: Decimal and Fraction values and non-finite
+    floats ("inf", "-inf", "nan") are sent as strings
+    """
+    if isinstance(value, dict):
+        return {key: encode_result(item) for key, item in value.items()}
+    if value is None or isinstance(value, (bool, int)):
+        return value
+    if isinstance(value, float) and math.isfinite(value):
+        return value
+    return str(value)
+
+
+class CalculatorServer:
+    """
+    Serves calculator sessions over TCP and Unix sockets. Expression
+    requests from all connections that arrive within batch_window seconds
+    of each other are evaluated together by a MicroBatcher. Evaluations
+    and math operations run in a pool of sandbox worker processes, each
+    limited to timeout seconds, while the event loop keeps serving other
+    connections. sandboxed=False computes them on the event loop thread
+    instead, which only suits trusted clients. The workers start with the
+    compiled expressions saved in cache_file.
+    """
+
+    def __init__(
+        self,
+        batch_window: float = 0.0,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        workers: int = DEFAULT_WORKERS,
+        timeout: float = DEFAULT_TIMEOUT,
+        sandboxed: bool = True,
+        cache_file: Optional[str] = None,
+    ):
+        self.sandbox = (
+            SandboxPool(workers, timeout, cache_file=cache_file) if sandboxed else None
+        )
+        self.batcher = MicroBatcher(batch_window, max_batch, sandbox=self.sandbox)
+        self._servers: List[asyncio.AbstractServer] = []
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def start_tcp(
+        self, host: str = "127.0.0.1", port: int = DEFAULT_PORT
+    ) -> asyncio.AbstractServer:
+        """Listen on host:port; port 0 picks a free port"""
+        server = await asyncio.start_server(
+            self.handle_connection, host, port, limit=MAX_LINE
+        )
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """
+        Listen on a Unix socket at path, replacing a stale socket; any other
+        file at path is left alone and FileExistsError raised
+        """
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            os.unlink(path)
+        server = await asyncio.start_unix_server(
+            self.handle_connection, path, limit=MAX_LINE
+        )
+        self._servers.append(server)
+        return server
+
+    async def close(self) -> None:
+        """Stop listening, drop open connections and stop the sandbox"""
+        for server in self._servers:
+            server.close()
+        for writer in list(self._writers):
+            writer.close()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        if self.sandbox is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.sandbox.close)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Run one session: answer each request line in order"""
+        calc = AdvancedCalculator()
+        lines: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(MAX_PIPELINED)
+        responder = asyncio.create_task(self._respond(lines, calc, writer))
+        self._writers.add(writer)
+        try:
+            while not responder.done():
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await lines.put(b"")
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                await lines.put(line)
+        finally:
+            if not responder.done():
+                await lines.put(None)
+            try:
+                await responder
+            except ConnectionError:
+                pass
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(
+        self,
+        lines: "asyncio.Queue[Optional[bytes]]",
+        calc: AdvancedCalculator,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        while True:
+            line = await lines.get()
+            if line is None:
+                return
+            if line:
+                reply = await self.handle_line(line, calc)
+            else:
+                reply = self._error(
+                    None, ProtocolError(f"Request longer than {MAX_LINE} bytes")
+                )
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+            if not line:
+                return
+
+    async def handle_line(self, line: bytes, calc: AdvancedCalculator) -> dict:
+        """The reply to one request line"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                raise ProtocolError(f"Malformed JSON: {e}")
+            if not isinstance(request, dict):
+                raise ProtocolError("A request must be a JSON object")
+            request_id = request.get("id")
+            result = await self.dispatch(request, calc)
+        except Exception as e:
+            return self._error(request_id, e)
+        return {"id": request_id, "result": encode_result(result)}
+
+    @staticmethod
+    def _error(request_id, error: Exception) -> dict:
+        return {
+            "id": request_id,
+            "error": {"type": type(error).__name__, "message": str(error)},
+        }
+
+    async def dispatch(self, request: dict, calc: AdvancedCalculator):
+        """Carry out a decoded request in the session calc"""
+        op = request.get("op")
+        if op == "evaluate":
+            expression = request.get("expression")
+            if not isinstance(expression, str):
+                raise ProtocolError("evaluate needs an expression string")
+            return await self.evaluate(expression, calc)
+        if op == "session":
+            return {
+                "memory": calc.memory,
+                "last_result": calc.last_result,
+                "variables": calc.variables,
+                "mode": calc.backend.name,
+            }
+        if op == "ping":
+            return "pong"
+        if op not in OPERATIONS:
+            raise ProtocolError(f"Unknown operation: {op}")
+        args = request.get("args", [])
+        kwargs = request.get("kwargs", {})
+        if not isinstance(args, list) or not isinstance(kwargs, dict):
+            raise ProtocolError("args must be a list and kwargs an object")
+        if op in SESSION_OPERATIONS or self.sandbox is None:
+            return getattr(calc, op)(*args, **kwargs)
+        return await self._in_sandbox(
+            self.sandbox.call, run_operation, (op, args, kwargs)
+        )
+
+    @staticmethod
+    async def _in_sandbox(method, *args, **kwargs):
+        """Await a blocking SandboxPool method without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(method, *args, **kwargs)
+        )
+
+    async def evaluate(self, expression: str, calc: AdvancedCalculator):
+        """
+        evaluate_expression() for the server: float-mode expressions go
+        through the batcher, other modes are evaluated alone, in the
+        sandbox if there is one
+        """
+        name, expression = split_assignment(expression)
+        started = clock()
+        try:
+            if calc.backend.native:
+                result = await self.batcher.evaluate(
+                    expression, calc.variable_table()
+                )
+                result = float(result)
+            elif self.sandbox is not None:
+                result = await self._in_sandbox(
+                    self.sandbox.evaluate,
+                    expression,
+                    variables=calc.variable_table(),
+                    backend=calc.backend,
+                )
+            else:
+                result = evaluate(
+                    expression, variables=calc.variable_table(), backend=calc.backend
+                )
+        except Exception as e:
+            EVALUATION_METRICS.record(clock() - started, error=e)
+            raise ValueError(f"Invalid expression: {e}")
+        EVALUATION_METRICS.record(clock() - started)
+        calc.store_result(result, name)
+        return result
+
+
+class CalculatorClient:
+    """
+    Client for CalculatorServer. Concurrent call()s are pipelined on the
+    one connection and matched to their replies by id.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect_tcp(
+        cls, host: str = "127.0.0.1", port: int = DEFAULT_PORT
+    ) -> "CalculatorClient":
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> "CalculatorClient":
+        reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def _receive(self) -> None:
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._waiting.pop(reply.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+            self._waiting.clear()
+
+    async def call(self, op: str, *args, **fields):
+        """
+        Send a request and return its result, raising RemoteError for an
+        error reply. Positional args are the operation's arguments.
+        """
+        if self._receiver.done():
+            raise ConnectionError("Connection closed")
+        request_id = next(self._ids)
+        request = dict(fields, id=request_id, op=op)
+        if args:
+            request["args"] = list(args)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        reply = await future
+        if "error" in reply:
+            raise RemoteError(reply["error"]["type"], reply["error"]["message"])
+        return reply["result"]
+
+    async def evaluate(self, expression: str):
+        """Evaluate an expression in this connection's session"""
+        return await self.call("evaluate", expression=expression)
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._receiver
+
+
+def parse_arguments(argv=None) -> "argparse.Namespace":
+    """Parse command line options"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calculator evaluation server")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="TCP port (0: any free port)"
+    )
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=0.0,
+        help="seconds to gather concurrent expressions into one batch",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=DEFAULT_MAX_BATCH,
+        help="evaluate a batch at once when it holds this many expressions",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="sandbox processes computing requests",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="seconds one expression or operation may take",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve Prometheus metrics over HTTP on this port",
+    )
+    parser.add_argument(
+        "--metrics-file", help="keep Prometheus metrics written to this file"
+    )
+    parser.add_argument(
+        "--cache-file",
+        help="load compiled expressions from this file and save them on exit",
+    )
+    return parser.parse_args(argv)
+
+
+async def serve(args: "argparse.Namespace") -> None:
+    """Run the server until cancelled"""
+    cache_file = CacheFile(args.cache_file)
+    server = CalculatorServer(
+        args.batch_window,
+        args.max_batch,
+        args.workers,
+        args.timeout,
+        cache_file=cache_file.path,
+    )
+    if args.unix:
+        await server.start_unix(args.unix)
+        print(f"Serving on {args.unix}")
+    else:
+        listener = await server.start_tcp(args.host, args.port)
+        host, port = listener.sockets[0].getsockname()[:2]
+        print(f"Serving on {host}:{port}")
+    metrics = MetricsExport(args.metrics_port, args.metrics_file)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        metrics.close()
+        await server.close()
+        cache_file.close()
+
+
+def main(argv=None) -> int:
+    """Server entry point"""
+    args = parse_arguments(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
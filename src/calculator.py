@@ -6,7 +6,52 @@ Advanced Calculator with Trigonometric and Mathematical Functions
 import math
 import re
 import sys
-from typing import Union
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple, Union
+
+from calc_engine.backends import BACKENDS, FLOAT, NumericBackend, get_backend
+from calc_engine.cache import CacheFile
+from calc_engine.context import EvaluationContext
+from calc_engine.factorial import factorial
+from calc_engine.functions import ARITY, CONSTANTS
+from calc_engine.metrics import EvaluationMetrics, MetricsExport
+from calc_engine.profiling import EvaluationProfile, clock
+from calc_engine.session import EvaluationSession
+
+if TYPE_CHECKING:
+    import argparse
+    from decimal import Decimal
+    from fractions import Fraction
+
+    from calc_engine.autodiff import Derivative
+    from calc_engine.memo import Memoizer
+    from calc_engine.quadrature import Quadrature
+    from calc_engine.solver import Root
+
+VARIABLE_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z_0-9]*")
+RESERVED_NAMES = {"ans", *CONSTANTS, *ARITY}
+EVALUATION_METRICS = EvaluationMetrics("console")
+# Console expressions are evaluated in this process
+SESSION = EvaluationSession(sandboxed=False)
+
+# Operations whose results depend only on their arguments; the angle mode
+# is an argument, so degrees and radians results are cached apart
+MEMOIZABLE = (
+    "power",
+    "square_root",
+    "sin",
+    "cos",
+    "tan",
+    "asin",
+    "acos",
+    "atan",
+    "log",
+    "log10",
+    "ln",
+    "factorial",
+    "gamma",
+    "lgamma",
+)
+DEFAULT_MEMOIZED = ("power", "log", "factorial")
 
 
 class AdvancedCalculator:
@@ -14,9 +59,40 @@ class AdvancedCalculator:
     A calculator class that supports basic arithmetic and advanced mathematical functions
     """
 
-    def __init__(self):
-        self.last_result = 0
-        self.memory = 0
+    def __init__(self, context: Optional[EvaluationContext] = None):
+        # Memory, variables and the last result; the operations themselves
+        # keep no state
+        self.context = context or EvaluationContext()
+        self.backend: NumericBackend = FLOAT
+        # When set, evaluate_expression() records per-stage timings
+        self.profiling = False
+        self.last_profile: Optional[EvaluationProfile] = None
+        # Set by memoize()
+        self.memo: Optional["Memoizer"] = None
+
+    @property
+    def last_result(self):
+        return self.context.last_result
+
+    @last_result.setter
+    def last_result(self, value) -> None:
+        self.context.last_result = value
+
+    @property
+    def memory(self):
+        return self.context.memory
+
+    @memory.setter
+    def memory(self, value) -> None:
+        self.context.memory = value
+
+    @property
+    def variables(self) -> dict:
+        return self.context.variables
+
+    @variables.setter
+    def variables(self, value: dict) -> None:
+        self.context.variables = value
 
     def add(self, a: float, b: float) -> float:
         """Addition"""
@@ -103,11 +179,28 @@ class AdvancedCalculator:
             raise ValueError("Natural logarithm input must be positive")
         return math.log(a)
 
-    def factorial(self, n: int) -> int:
-        """Factorial function"""
-        if not isinstance(n, int) or n < 0:
-            raise ValueError("Factorial input must be a non-negative integer")
-        return math.factorial(n)
+    def factorial(self, n: float) -> Union[int, float]:
+        """
+        Factorial: exact for whole numbers (5.0 gives 120), Gamma(n + 1) for
+        other values
+        """
+        if n == int(n):
+            if n < 0:
+                raise ValueError("Factorial of a negative integer is not defined")
+            return factorial(int(n))
+        return math.gamma(n + 1)
+
+    def gamma(self, a: float) -> float:
+        """Gamma function"""
+        if a <= 0 and a == int(a):
+            raise ValueError("Gamma is not defined for zero or negative integers")
+        return math.gamma(a)
+
+    def lgamma(self, a: float) -> float:
+        """Natural logarithm of the absolute value of the Gamma function"""
+        if a <= 0 and a == int(a):
+            raise ValueError("Gamma is not defined for zero or negative integers")
+        return math.lgamma(a)
 
     def absolute(self, a: float) -> float:
         """Absolute value"""
@@ -136,7 +229,6 @@ class AdvancedCalculator:
     def store_memory(self, value: float) -> None:
         """Store value in memory"""
         self.memory = value
-        print(f"Stored {value} in memory")
 
     def recall_memory(self) -> float:
         """Recall value from memory"""
@@ -145,7 +237,141 @@ class AdvancedCalculator:
     def clear_memory(self) -> None:
         """Clear memory"""
         self.memory = 0
-        print("Memory cleared")
+
+    def set_variable(self, name: str, value: float) -> None:
+        """Store a named variable for use in expressions"""
+        if not VARIABLE_NAME_RE.fullmatch(name) or name in RESERVED_NAMES:
+            raise ValueError(f"Invalid variable name: {name}")
+        self.variables[name] = value
+
+    def get_variable(self, name: str) -> float:
+        """Look up a named variable ("ans" is the last result)"""
+        if name == "ans":
+            return self.last_result
+        if name not in self.variables:
+            raise ValueError(f"Unknown variable: {name}")
+        return self.variables[name]
+
+    def clear_variables(self) -> None:
+        """Remove all named variables"""
+        self.variables.clear()
+
+    def variable_table(self) -> dict:
+        """Variables visible to expressions, including ans"""
+        return self.context.variable_table()
+
+    def store_result(self, result, name: Optional[str] = None) -> None:
+        """Make result the last result and, if name is given, a variable"""
+        if name is not None:
+            self.set_variable(name, result)
+        self.last_result = result
+
+    def derivative(
+        self, expression: str, variable: str, value: float, degrees: bool = True
+    ) -> "Derivative":
+        """
+        Value and derivative of expression with respect to variable at
+        value, computed exactly in one pass; other names are the calculator's
+        variables
+        """
+        from calc_engine.autodiff import derivative
+
+        if not VARIABLE_NAME_RE.fullmatch(variable) or variable in RESERVED_NAMES:
+            raise ValueError(f"Invalid variable name: {variable}")
+        values = self.variable_table()
+        values[variable] = value
+        return derivative(expression, variable, degrees, **values)
+
+    def solve(
+        self,
+        expression: str,
+        variable: str = "x",
+        bracket: Optional[Tuple[float, float]] = None,
+        guess: Optional[float] = None,
+        degrees: bool = True,
+    ) -> "Root":
+        """
+        Solve expression = 0, or "lhs = rhs", for variable, within bracket
+        or searching outwards from guess; other names are the calculator's
+        variables
+        """
+        from calc_engine.solver import solve
+
+        if not VARIABLE_NAME_RE.fullmatch(variable) or variable in RESERVED_NAMES:
+            raise ValueError(f"Invalid variable name: {variable}")
+        values = self.variable_table()
+        values.pop(variable, None)
+        return solve(expression, variable, bracket, guess, degrees, **values)
+
+    def integrate(
+        self, expression: str, variable: str, a: float, b: float, degrees: bool = True
+    ) -> "Quadrature":
+        """
+        Integral of expression with respect to variable from a to b, with
+        its error estimate; other names are the calculator's variables
+        """
+        from calc_engine.quadrature import integrate
+
+        if not VARIABLE_NAME_RE.fullmatch(variable) or variable in RESERVED_NAMES:
+            raise ValueError(f"Invalid variable name: {variable}")
+        values = self.variable_table()
+        values.pop(variable, None)
+        return integrate(expression, variable, a, b, degrees, **values)
+
+    def memoize(
+        self,
+        operations: Iterable[str] = DEFAULT_MEMOIZED,
+        capacity: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> "Memoizer":
+        """
+        Cache the results of operations, each in its own LRU cache of
+        capacity entries holding at most max_bytes of results. Results
+        larger than max_bytes, such as huge factorials, are not kept.
+        Returns the Memoizer, whose info() gives per-operation statistics.
+        """
+        from calc_engine import memo
+
+        operations = tuple(operations)
+        unknown = [name for name in operations if name not in MEMOIZABLE]
+        if unknown:
+            raise ValueError(f"Cannot memoize: {', '.join(unknown)}")
+        self.unmemoize()
+        self.memo = memo.Memoizer(
+            memo.DEFAULT_CAPACITY if capacity is None else capacity,
+            memo.DEFAULT_MAX_BYTES if max_bytes is None else max_bytes,
+        )
+        for name in operations:
+            # The instance attribute shadows the method
+            setattr(self, name, self.memo.wrap(name, getattr(self, name)))
+        return self.memo
+
+    def unmemoize(self) -> None:
+        """Stop memoizing and drop the cached results"""
+        if self.memo is None:
+            return
+        for name in self.memo.caches:
+            delattr(self, name)
+        self.memo = None
+
+    def set_backend(self, name: str, precision: Optional[int] = None) -> None:
+        """
+        Choose how expressions compute: "float" (fast, the default),
+        "decimal" with precision significant digits, or exact "fraction"
+        """
+        self.backend = get_backend(name, precision)
+        # Stored values are carried over into the new number type
+        convert = float if self.backend.native else self.backend.number
+        self.last_result = convert(self.last_result)
+        self.variables = {key: convert(value) for key, value in self.variables.items()}
+
+
+def run_operation(name: str, args: Iterable = (), kwargs: Optional[dict] = None):
+    """
+    Result of the AdvancedCalculator operation name on a fresh calculator,
+    for operations that keep no state; usable in a sandbox worker
+    """
+    return getattr(AdvancedCalculator(), name)(*args, **(kwargs or {}))
 
 
 def print_menu():
@@ -184,49 +410,55 @@ def print_menu():
     print(" 24. Recall Memory (MR)")
     print(" 25. Clear Memory (MC)")
     print("\n 26. Expression Calculator")
+    print(" 27. Number Mode (float, decimal, fraction)")
+    print(" 28. Derivative of an Expression")
+    print(" 29. Solve an Equation")
+    print(" 30. Integrate an Expression")
     print("  0. Exit")
     print("=" * 60)
 
 
-def evaluate_expression(expression: str, calc: AdvancedCalculator) -> float:
+def split_assignment(expression: str) -> Tuple[Optional[str], str]:
+    """Split "name = expression" into name and expression; name may be None"""
+    if "=" not in expression:
+        return None, expression
+    name, expression = (part.strip() for part in expression.split("=", 1))
+    return name, expression
+
+
+def evaluate_expression(
+    expression: str, calc: AdvancedCalculator
+) -> Union[float, "Decimal", "Fraction"]:
     """
-    Evaluate mathematical expressions with support for advanced functions
+    Evaluate mathematical expressions with support for advanced functions.
+    "name = expression" assigns the result to a variable in calc. The result
+    has the type of calc's number mode. With calc.profiling set, the stage
+    timings are left in calc.last_profile.
     """
-    # Replace function names with their Python equivalents
-    expression = expression.replace("^", "**")
-    expression = re.sub(r"\bsin\(([^)]+)\)", r"math.sin(math.radians(\1))", expression)
-    expression = re.sub(r"\bcos\(([^)]+)\)", r"math.cos(math.radians(\1))", expression)
-    expression = re.sub(r"\btan\(([^)]+)\)", r"math.tan(math.radians(\1))", expression)
-    expression = re.sub(r"\bsqrt\(([^)]+)\)", r"math.sqrt(\1)", expression)
-    expression = re.sub(r"\bln\(([^)]+)\)", r"math.log(\1)", expression)
-    expression = re.sub(r"\blog10\(([^)]+)\)", r"math.log10(\1)", expression)
-    expression = re.sub(r"\babs\(([^)]+)\)", r"abs(\1)", expression)
-    expression = re.sub(r"\bpi\b", str(math.pi), expression)
-    expression = re.sub(r"\be\b", str(math.e), expression)
-
-    # Add implicit multiplication for parentheses
-    expression = re.sub(r"(\d)(\()", r"\1*\2", expression)
-    expression = re.sub(r"(\))(\d)", r"\1*\2", expression)
-    expression = re.sub(r"(\))(\()", r"\1*\2", expression)
-
+    name, expression = split_assignment(expression)
+    profile = EvaluationProfile(expression) if calc.profiling else None
     try:
-        # Use eval with restricted globals for safety
-        allowed_names = {
-            "math": math,
-            "sin": math.sin,
-            "cos": math.cos,
-            "tan": math.tan,
-            "sqrt": math.sqrt,
-            "log": math.log,
-            "log10": math.log10,
-            "abs": abs,
-            "pi": math.pi,
-            "e": math.e,
-        }
-        result = eval(expression, {"__builtins__": {}}, allowed_names)
-        return float(result)
+        result = SESSION.calculate(
+            expression,
+            True,
+            calc.variable_table(),
+            profile,
+            calc.backend,
+            EVALUATION_METRICS,
+        )
     except Exception as e:
         raise ValueError(f"Invalid expression: {e}")
+    calc.store_result(result, name)
+    calc.last_profile = profile
+    return result
+
+
+def format_result(result: Union[float, "Decimal", "Fraction"]) -> str:
+    """Text shown for an expression result"""
+    # Show fractions together with their decimal value
+    if getattr(result, "denominator", 1) != 1:
+        return f"{result} ≈ {float(result)}"
+    return str(result)
 
 
 def get_float_input(prompt: str) -> float:
@@ -247,9 +479,109 @@ def get_int_input(prompt: str) -> int:
             print("Please enter a valid integer.")
 
 
-def main():
+def parse_arguments(argv=None) -> "argparse.Namespace":
+    """Parse command line options"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Advanced Calculator")
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="evaluate one expression per line of FILE (default: stdin) and exit",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="file for batch results (default: stdout)"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="worker processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="lines per chunk when evaluating a list of lines",
+    )
+    parser.add_argument(
+        "--radians", action="store_true", help="trigonometry in radians"
+    )
+    parser.add_argument("--mode", choices=BACKENDS, default="float", help="number mode")
+    parser.add_argument("--precision", type=int, help="digits in decimal mode")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="show how long each stage of an expression evaluation takes",
+    )
+    parser.add_argument(
+        "--memoize",
+        action="store_true",
+        help="cache results of power, log and factorial",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-file", help="keep Prometheus metrics written to this file"
+    )
+    parser.add_argument(
+        "--cache-file",
+        help="load compiled expressions from this file and save them on exit",
+    )
+    return parser.parse_args(argv)
+
+
+def run_batch(args: "argparse.Namespace") -> int:
+    """Evaluate a file of expressions; return the process exit status"""
+    # Batch mode pulls in multiprocessing, so it is only imported when used
+    from calc_engine import batch as batching
+
+    batch = batching.BatchEvaluator(
+        workers=args.workers,
+        chunk_size=args.chunk_size or batching.DEFAULT_CHUNK_SIZE,
+        degrees=not args.radians,
+        mode=args.mode,
+        precision=args.precision,
+    )
+    if args.output == "-":
+        sys.stdout.flush()
+        destination = sys.stdout.buffer
+    else:
+        destination = open(args.output, "wb", buffering=batching.OUTPUT_BUFFER_SIZE)
+    try:
+        if args.batch == "-":
+            errors = batch.run(sys.stdin.buffer, destination)
+        else:
+            # Files are memory-mapped and split between the workers
+            errors = batch.run_file(args.batch, destination)
+    finally:
+        if destination is sys.stdout.buffer:
+            destination.flush()
+        else:
+            destination.close()
+    if errors:
+        print(f"{errors} of {batch.count} expressions failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
     """Main calculator function"""
+    args = parse_arguments(argv)
+    metrics = MetricsExport(args.metrics_port, args.metrics_file)
+    cache_file = CacheFile(args.cache_file)
+    if args.batch is not None:
+        try:
+            return run_batch(args)
+        finally:
+            metrics.close()
+            cache_file.close()
+
     calc = AdvancedCalculator()
+    calc.profiling = args.profile
+    if args.memoize:
+        calc.memoize()
 
     print("Welcome to the Advanced Calculator!")
     print(
@@ -260,7 +592,7 @@ def main():
         print_menu()
 
         try:
-            choice = input("\nEnter your choice (0-26): ").strip()
+            choice = input("\nEnter your choice (0-30): ").strip()
 
             if choice == "0":
                 print("Thank you for using the Advanced Calculator!")
@@ -348,7 +680,7 @@ def main():
                 print(f"log_{base}({a}) = {result}")
 
             elif choice == "16":  # Factorial
-                n = get_int_input("Enter non-negative integer: ")
+                n = get_float_input("Enter number: ")
                 result = calc.factorial(n)
                 print(f"{n}! = {result}")
 
@@ -386,6 +718,7 @@ def main():
             elif choice == "23":  # Store Memory
                 value = get_float_input("Enter value to store: ")
                 calc.store_memory(value)
+                print(f"Stored {value} in memory")
 
             elif choice == "24":  # Recall Memory
                 result = calc.recall_memory()
@@ -393,20 +726,69 @@ def main():
 
             elif choice == "25":  # Clear Memory
                 calc.clear_memory()
+                print("Memory cleared")
 
             elif choice == "26":  # Expression Calculator
                 print("\nExpression Calculator")
-                print("Supported functions: sin, cos, tan, sqrt, ln, log10, abs")
+                print(
+                    "Supported functions: sin, cos, tan, asin, acos, atan, sqrt, ln, "
+                    "log, log10, exp, abs, fact, gamma, lgamma, integrate"
+                )
                 print("Constants: pi, e")
-                print("Operators: +, -, *, /, ^ (power), ()")
+                print("Variables: ans (last result), name = expression to assign")
+                print("Operators: +, -, *, /, ^ (power), ! (factorial), |x|, ()")
                 print("Example: sin(30) + cos(60) * sqrt(16)")
 
                 expression = input("Enter expression: ")
                 result = evaluate_expression(expression, calc)
-                print(f"Result: {result}")
+                formatting = clock()
+                text = format_result(result)
+                profile = calc.last_profile
+                if profile is not None:
+                    profile.add("format", clock() - formatting)
+                print(f"Result: {text}")
+                if profile is not None:
+                    print(f"Timing: {profile.summary()}")
+
+            elif choice == "27":  # Number Mode
+                print(f"\nCurrent mode: {calc.backend.name}")
+                name = input(f"Enter mode ({', '.join(BACKENDS)}): ").strip().lower()
+                precision = None
+                if name == "decimal":
+                    precision = get_int_input("Enter significant digits: ")
+                calc.set_backend(name, precision)
+                print(f"Number mode set to {name}")
+
+            elif choice == "28":  # Derivative
+                expression = input("Enter expression (e.g. x^2 * sin(x)): ")
+                variable = input("Differentiate with respect to: ").strip()
+                value = get_float_input(f"Enter {variable}: ")
+                result = calc.derivative(expression, variable, value)
+                print(f"Value: {result.value}")
+                print(f"d/d{variable}: {result.slope}")
+
+            elif choice == "29":  # Solve
+                expression = input("Enter equation (e.g. x^3 - 2x - 5 or x^2 = 2): ")
+                variable = input("Solve for (default x): ").strip() or "x"
+                guess = input("Starting guess (optional): ").strip()
+                root = calc.solve(expression, variable, guess=float(guess or 0))
+                print(f"{variable} = {root.x}")
+                print(f"Residual: {root.residual} after {root.iterations} iterations")
+
+            elif choice == "30":  # Integrate
+                expression = input("Enter expression (e.g. x^2 * sin(x)): ")
+                variable = input("Integrate over (default x): ").strip() or "x"
+                a = get_float_input("Enter lower limit: ")
+                b = get_float_input("Enter upper limit: ")
+                result = calc.integrate(expression, variable, a, b)
+                print(f"Integral: {result.value}")
+                print(f"Error estimate: {result.error:.3g}")
+                print(f"Evaluations: {result.evaluations} over {result.panels} panels")
+                if not result.converged:
+                    print("Warning: the requested accuracy was not reached")
 
             else:
-                print("Invalid choice. Please enter a number between 0 and 26.")
+                print("Invalid choice. Please enter a number between 0 and 30.")
 
         except (ValueError, ZeroDivisionError) as e:
             print(f"Error: {e}")
@@ -416,6 +798,9 @@ def main():
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
 
+    metrics.close()
+    cache_file.close()
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -5,11 +5,28 @@ A calculator with pop-up window and advanced mathematical functions
 """
 
 import math
-import re
 import tkinter as tk
 from tkinter import font, messagebox, ttk
 from typing import Union
 
+from calc_engine.cache import CacheFile
+from calc_engine.errors import EvaluationTimeout, ResourceLimitError
+from calc_engine.factorial import fact
+from calc_engine.metrics import EvaluationMetrics, MetricsExport
+from calc_engine.preview import PreviewWorker
+from calc_engine.profiling import EvaluationProfile
+from calc_engine.session import EvaluationSession
+from calculator import AdvancedCalculator, split_assignment
+
+# Live preview timing: wait for a pause in typing, then poll for the result
+PREVIEW_DEBOUNCE_MS = 80
+PREVIEW_POLL_MS = 20
+
+# Budget for a calculation before it is abandoned
+EVALUATION_TIMEOUT_S = 2.0
+
+EVALUATION_METRICS = EvaluationMetrics("gui")
+
 
 class AdvancedCalculatorGUI:
     """
@@ -22,9 +39,33 @@ class AdvancedCalculatorGUI:
         self.setup_variables()
         self.setup_styles()
         self.create_widgets()
-        self.memory = 0
         self.history = []
 
+    # Memory, variables and ans live in calc, as in the console calculator
+    @property
+    def last_result(self):
+        return self.calc.last_result
+
+    @last_result.setter
+    def last_result(self, value) -> None:
+        self.calc.last_result = value
+
+    @property
+    def memory(self):
+        return self.calc.memory
+
+    @memory.setter
+    def memory(self, value) -> None:
+        self.calc.memory = value
+
+    @property
+    def variables(self) -> dict:
+        return self.calc.variables
+
+    @variables.setter
+    def variables(self, value: dict) -> None:
+        self.calc.variables = value
+
     def setup_window(self):
         """Configure the main window"""
         self.root.title("Advanced Calculator")
@@ -52,10 +93,27 @@ class AdvancedCalculatorGUI:
         self.result_var.set("")
         self.expression = ""
         self.current_input = "0"
-        self.last_result = 0
+        # "name = expression" assigns a variable that later expressions use
+        self.calc = AdvancedCalculator()
         self.degrees_mode = tk.BooleanVar(value=True)
         self.showing_result = False
         self.cursor_pos = 1  # Cursor position in display (after the "0")
+        self.preview = PreviewWorker(delay=PREVIEW_DEBOUNCE_MS / 1000)
+        # Compiled expressions kept between runs, if CALC_CACHE_FILE is set
+        self.cache_file = CacheFile()
+        # Calculations run in a worker process so a runaway one cannot
+        # freeze the window; it is started on the first calculation
+        self.session = EvaluationSession(
+            sandboxed=True,
+            timeout=EVALUATION_TIMEOUT_S,
+            cache_file=self.cache_file.path,
+        )
+        self.preview_poll_id = None
+        # Per-stage timing of calculations, toggled with F12
+        self.profiling = False
+        self.last_profile = None
+        # Prometheus export, if CALC_METRICS_PORT or CALC_METRICS_FILE is set
+        self.metrics = MetricsExport()
 
     def setup_styles(self):
         """Configure custom styles"""
@@ -162,6 +220,8 @@ class AdvancedCalculatorGUI:
         # Memory and history
         self.create_memory_history(main_frame)
 
+        self.root.bind("<F12>", self.toggle_profiling)
+
     def create_display(self, parent):
         """Create the calculator display"""
         display_frame = ttk.Frame(parent)
@@ -475,8 +535,8 @@ class AdvancedCalculatorGUI:
                 self.root.after(1, self.update_cursor_position)
                 return
 
-        # Allow direct number and operator input via keyboard
-        elif event.char.isdigit() or event.char in ".+-*/()":
+        # Allow direct number, operator and name (functions, ans) input via keyboard
+        elif event.char.isalnum() or event.char in ".+-*/^(),|!=":
             self.append_to_display(event.char)
             return "break"
         else:
@@ -556,21 +616,48 @@ class AdvancedCalculatorGUI:
         self.update_live_calculation()
 
     def update_live_calculation(self):
-        """Update the secondary display with live calculation preview"""
-        try:
-            current_expr = self.expression + self.current_input
-            if current_expr and current_expr != "0":
-                # Try to evaluate current expression for preview
-                if self.can_evaluate(current_expr):
-                    result = self.evaluate_expression(current_expr)
-                    self.result_var.set(f"= {result}")
-                else:
-                    self.result_var.set("")
-            else:
-                self.result_var.set("")
-        except:
+        """Queue a live calculation preview for the background worker"""
+        current_expr = self.expression + self.current_input
+        cursor = len(self.expression) + self.cursor_pos
+        name, body = split_assignment(current_expr)
+        if name is not None:
+            # Only the right-hand side of an assignment is previewed
+            offset = len(current_expr) - len(current_expr.split("=", 1)[1].lstrip())
+            cursor = min(max(cursor - offset, 0), len(body))
+            current_expr = body
+        if current_expr and current_expr != "0":
+            # Evaluated off the Tk thread; only the part around the cursor is
+            # re-parsed, and the result is picked up by poll_preview
+            self.preview.submit(
+                current_expr,
+                degrees=self.degrees_mode.get(),
+                variables=self.calc.variable_table(),
+                cursor=cursor,
+            )
+            self.schedule_preview_poll()
+        else:
+            self.preview.cancel()
             self.result_var.set("")
 
+    def schedule_preview_poll(self):
+        """Check for a finished preview on the next poll tick"""
+        if self.preview_poll_id is None:
+            self.preview_poll_id = self.root.after(PREVIEW_POLL_MS, self.poll_preview)
+
+    def poll_preview(self):
+        """Show the latest preview result computed in the background"""
+        self.preview_poll_id = None
+        result = self.preview.poll()
+        if result is not None and not self.showing_result:
+            try:
+                if result.error is not None:
+                    raise result.error
+                self.result_var.set(f"= {float(result.value)}")
+            except Exception:
+                self.result_var.set("")
+        if self.preview.busy:
+            self.schedule_preview_poll()
+
     def can_evaluate(self, expr):
         """Check if expression can be safely evaluated"""
         if not expr or expr == "0":
@@ -638,6 +725,7 @@ class AdvancedCalculatorGUI:
 
         current = self.display_var.get()
         if current != "0":
+            self.preview.cancel()
             self.expression += current + calc_op
             self.display_var.set("0")
             self.current_input = ""
@@ -646,6 +734,7 @@ class AdvancedCalculatorGUI:
 
     def calculate_result(self):
         """Calculate and display result with animation"""
+        self.preview.cancel()
         try:
             # Get the complete expression from the display
             current = self.display_var.get()
@@ -661,13 +750,22 @@ class AdvancedCalculatorGUI:
             self.animate_result_transition(current, result)
 
             self.last_result = result
-            self.history_label.config(text=f"Last: {result}")
+            if self.last_profile is not None:
+                self.history_label.config(
+                    text=f"Last: {result}\n{self.last_profile.summary()}"
+                )
+            else:
+                self.history_label.config(text=f"Last: {result}")
 
             # Reset for next calculation
             self.expression = ""
             self.current_input = ""
             self.showing_result = True
             self.update_expression_display()
+        except EvaluationTimeout:
+            self.show_error("Calculation took too long")
+        except ResourceLimitError:
+            self.show_error("Calculation too large")
         except ValueError as e:
             self.show_error(f"Math Error: {str(e)}")
         except ZeroDivisionError:
@@ -696,113 +794,30 @@ class AdvancedCalculatorGUI:
         self.root.update()
 
     def evaluate_expression(self, expression):
-        """Safely evaluate mathematical expression"""
-        # Replace function names with their Python equivalents
-        expression = expression.replace("^", "**")
-        expression = expression.replace("×", "*")
-        expression = expression.replace("÷", "/")
-
-        # Handle trigonometric functions
-        if self.degrees_mode.get():
-            expression = re.sub(
-                r"(?<!math\.)\bsin\(([^)]+)\)",
-                r"math.sin(math.radians(\1))",
-                expression,
-            )
-            expression = re.sub(
-                r"(?<!math\.)\bcos\(([^)]+)\)",
-                r"math.cos(math.radians(\1))",
-                expression,
-            )
-            expression = re.sub(
-                r"(?<!math\.)\btan\(([^)]+)\)",
-                r"math.tan(math.radians(\1))",
-                expression,
-            )
-            expression = re.sub(
-                r"(?<!math\.)\basin\(([^)]+)\)",
-                r"math.degrees(math.asin(\1))",
-                expression,
-            )
-            expression = re.sub(
-                r"(?<!math\.)\bacos\(([^)]+)\)",
-                r"math.degrees(math.acos(\1))",
-                expression,
-            )
-            expression = re.sub(
-                r"(?<!math\.)\batan\(([^)]+)\)",
-                r"math.degrees(math.atan(\1))",
-                expression,
-            )
-        else:
-            expression = re.sub(
-                r"(?<!math\.)\bsin\(([^)]+)\)", r"math.sin(\1)", expression
-            )
-            expression = re.sub(
-                r"(?<!math\.)\bcos\(([^)]+)\)", r"math.cos(\1)", expression
-            )
-            expression = re.sub(
-                r"(?<!math\.)\btan\(([^)]+)\)", r"math.tan(\1)", expression
-            )
-            expression = re.sub(
-                r"(?<!math\.)\basin\(([^)]+)\)", r"math.asin(\1)", expression
-            )
-            expression = re.sub(
-                r"(?<!math\.)\bacos\(([^)]+)\)", r"math.acos(\1)", expression
-            )
-            expression = re.sub(
-                r"(?<!math\.)\batan\(([^)]+)\)", r"math.atan(\1)", expression
-            )
-
-        # Handle other functions (order matters - specific patterns first)
-        expression = re.sub(r"√\(([^)]+)\)", r"math.sqrt(\1)", expression)
-        expression = re.sub(
-            r"(?<!math\.)\bsqrt\(([^)]+)\)", r"math.sqrt(\1)", expression
-        )  # Negative lookbehind to avoid double replacement
-        expression = re.sub(r"\bln\(([^)]+)\)", r"math.log(\1)", expression)
-        expression = re.sub(
-            r"(?<!math\.)\blog\(([^)]+)\)", r"math.log10(\1)", expression
-        )  # Negative lookbehind
-        expression = re.sub(r"\|([^|]+)\|", r"abs(\1)", expression)  # |x| notation
-        expression = re.sub(
-            r"(?<!math\.)\babs\(([^)]+)\)", r"abs(\1)", expression
-        )  # Negative lookbehind
-        expression = re.sub(
-            r"\bfact\(([^)]+)\)", r"math.factorial(int(\1))", expression
+        """
+        Safely evaluate mathematical expression; "name = expression" also
+        stores the result in the variable name
+        """
+        name, expression = split_assignment(expression)
+        profile = EvaluationProfile(expression) if self.profiling else None
+        result = self.session.calculate(
+            expression,
+            self.degrees_mode.get(),
+            self.calc.variable_table(),
+            profile,
+            metrics=EVALUATION_METRICS,
         )
-
-        # Replace constants
-        expression = re.sub(r"\bπ\b", str(math.pi), expression)
-        expression = re.sub(r"\bpi\b", str(math.pi), expression)
-        expression = re.sub(r"\be\b", str(math.e), expression)
-
-        # Add implicit multiplication
-        expression = re.sub(r"(\d)(\()", r"\1*\2", expression)
-        expression = re.sub(r"(\))(\d)", r"\1*\2", expression)
-        expression = re.sub(r"(\))(\()", r"\1*\2", expression)
-
-        # Safe evaluation
-        allowed_names = {
-            "math": math,
-            "sin": math.sin,
-            "cos": math.cos,
-            "tan": math.tan,
-            "asin": math.asin,
-            "acos": math.acos,
-            "atan": math.atan,
-            "sqrt": math.sqrt,
-            "log": math.log,
-            "log10": math.log10,
-            "abs": abs,
-            "pi": math.pi,
-            "e": math.e,
-            "factorial": math.factorial,
-            "degrees": math.degrees,
-            "radians": math.radians,
-        }
-
-        result = eval(expression, {"__builtins__": {}}, allowed_names)
-        return float(result)
+        if name is not None:
+            self.calc.set_variable(name, result)
+        self.last_profile = profile
+        return result
+
+    def toggle_profiling(self, event=None):
+        """Turn per-stage timing of calculations on or off"""
+        self.profiling = not self.profiling
+        self.last_profile = None
+        state = "on" if self.profiling else "off"
+        self.history_label.config(text=f"Stage timing {state}")
 
     def handle_trig_function(self, func):
         """Handle trigonometric function - insert function call"""
@@ -876,21 +891,20 @@ class AdvancedCalculatorGUI:
                 except:
                     current_value = float(current_expr)
 
-            # Convert to integer for factorial
-            int_value = int(current_value)
-            if int_value != current_value:
-                raise ValueError("Factorial requires an integer")
-            if int_value < 0:
-                raise ValueError("Factorial of negative number")
-            if int_value > 170:  # Factorial limit to prevent overflow
+            # Whole numbers give exact factorials, others Gamma(x + 1)
+            if current_value == int(current_value):
+                current_value = int(current_value)
+                if current_value < 0:
+                    raise ValueError("Factorial of negative number")
+            if current_value > 170:  # Factorial limit to prevent overflow
                 raise ValueError("Number too large for factorial")
 
-            result = math.factorial(int_value)
+            result = fact(current_value)
 
             # Show the result immediately
             self.clear_all()
             self.display_var.set(str(result))
-            self.result_var.set(f"{int_value}! = {result}")
+            self.result_var.set(f"{current_value}! = {result}")
             self.last_result = result
             self.showing_result = True
 
@@ -947,6 +961,7 @@ class AdvancedCalculatorGUI:
 
     def clear_all(self):
         """Clear everything and reset display"""
+        self.preview.cancel()
         self.display_var.set("0")
         self.result_var.set("")
         self.expression = ""
@@ -969,6 +984,7 @@ class AdvancedCalculatorGUI:
         if self.showing_result:
             self.clear_all()
         else:
+            self.preview.cancel()
             self.display_var.set("0")
             self.current_input = "0"
             self.result_var.set("")
@@ -1085,7 +1101,13 @@ class AdvancedCalculatorGUI:
 
     def run(self):
         """Start the calculator"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.preview.close()
+            self.session.close()
+            self.metrics.close()
+            self.cache_file.close()
 
 
 def main():
@@ -1107,4 +1129,7 @@ def main():
 
 
 if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()
     main()
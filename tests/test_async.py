@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio calculator interface
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import calc_async
+from calc_async import AsyncCalculator
+from calc_engine import EvaluationTimeout
+
+
+class SlowEvaluate:
+    """Stand-in for evaluate() that sleeps and records how many run at once"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = []
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text, degrees=True, variables=None, backend=None):
+        with self.lock:
+            self.calls.append(text)
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+        return len(self.calls)
+
+
+@pytest.fixture
+def slow(monkeypatch):
+    """Make evaluations take 50 ms each"""
+    stand_in = SlowEvaluate(0.05)
+    monkeypatch.setattr(calc_async, 'evaluate', stand_in)
+    return stand_in
+
+
+class TestAsyncCalculator:
+    """Test evaluation from asyncio code"""
+
+    def test_evaluate_uses_the_session(self):
+        """Assignments and ans work as in evaluate_expression"""
+
+        async def main():
+            async with AsyncCalculator() as calc:
+                assert await calc.evaluate('x = 2^10') == 1024
+                assert await calc.evaluate('x + ans') == 2048
+                assert await calc.evaluate('sin(30)') == pytest.approx(0.5)
+                return calc.calc
+
+        session = asyncio.run(main())
+        assert session.variables == {'x': 1024}
+        assert session.last_result == pytest.approx(0.5)
+
+    def test_errors_are_value_errors(self):
+        """Failures are reported like evaluate_expression's"""
+
+        async def main():
+            async with AsyncCalculator() as calc:
+                with pytest.raises(ValueError, match='Invalid expression'):
+                    await calc.evaluate('1/0')
+                with pytest.raises(ValueError):
+                    await calc.evaluate('2 +')
+
+        asyncio.run(main())
+
+    def test_evaluate_all_in_order(self):
+        """Results come back in input order and leave the session alone"""
+
+        async def main():
+            async with AsyncCalculator() as calc:
+                calc.calc.set_variable('y', 3)
+                results = await calc.evaluate_all(
+                    ['y^2', '1/0', 'sqrt(16)'], return_exceptions=True
+                )
+                with pytest.raises(ValueError):
+                    await calc.evaluate_all(['1', 'nonsense('])
+                return results, calc.calc.last_result
+
+        (square, error, root), last_result = asyncio.run(main())
+        assert square == 9
+        assert isinstance(error, ValueError)
+        assert root == 4
+        assert last_result == 0
+
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_evaluate_many_over_arrays(self, executor):
+        """One expression is evaluated over arrays off the loop"""
+
+        async def main():
+            async with AsyncCalculator(executor, max_workers=1) as calc:
+                calc.calc.set_variable('k', 1)
+                values = await calc.evaluate_many('x^2 + k', x=[1, 2, 3])
+                with pytest.raises(ValueError):
+                    await calc.evaluate_many('x + y', x=[1, 2])
+                return list(values), calc.calc.last_result
+
+        values, last_result = asyncio.run(main())
+        assert values == [2, 5, 10]
+        assert last_result == 0
+
+    def test_decimal_mode(self):
+        """Results keep the session's number type"""
+
+        async def main():
+            async with AsyncCalculator() as calc:
+                calc.calc.set_backend('decimal', 30)
+                return await calc.evaluate('1/3')
+
+        assert str(asyncio.run(main())) == '0.333333333333333333333333333333'
+
+    def test_concurrency_limit(self, slow):
+        """No more than max_concurrency evaluations run at once"""
+
+        async def main():
+            async with AsyncCalculator(max_workers=4, max_concurrency=2) as calc:
+                return await calc.evaluate_all(str(n) for n in range(6))
+
+        assert len(asyncio.run(main())) == 6
+        assert slow.most_running == 2
+
+    def test_timeout_frees_the_loop(self, slow):
+        """A slow evaluation times out without blocking other coroutines"""
+        slow.seconds = 0.5
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            ticker = asyncio.create_task(tick())
+            async with AsyncCalculator(timeout=0.05) as calc:
+                started = time.perf_counter()
+                with pytest.raises(EvaluationTimeout):
+                    await calc.evaluate('1')
+                elapsed = time.perf_counter() - started
+            ticker.cancel()
+            return elapsed
+
+        assert asyncio.run(main()) < 0.4
+        assert len(ticks) > 1
+
+    def test_cancel_removes_queued_work(self, slow):
+        """Cancelled calls that have not started never run"""
+
+        async def main():
+            async with AsyncCalculator(max_workers=1, max_concurrency=2) as calc:
+                first = asyncio.create_task(calc.evaluate('1'))
+                queued = [asyncio.create_task(calc.evaluate(str(n))) for n in (2, 3)]
+                await asyncio.sleep(0.01)
+                for task in queued:
+                    task.cancel()
+                await first
+                for task in queued:
+                    with pytest.raises(asyncio.CancelledError):
+                        await task
+                # The slots are given back
+                await calc.evaluate('4')
+
+        asyncio.run(main())
+        assert slow.calls == ['1', '4']
+
+    def test_process_executor(self):
+        """A process executor evaluates in worker processes"""
+
+        async def main():
+            async with AsyncCalculator('process', max_workers=1) as calc:
+                assert await calc.evaluate('r = 6 * 7') == 42
+                calc.calc.set_backend('fraction')
+                assert str(await calc.evaluate('r / 4')) == '21/2'
+                with pytest.raises(EvaluationTimeout):
+                    await calc.evaluate('fact(300000) / fact(299999)', timeout=0.05)
+
+        asyncio.run(main())
+
+    def test_rejects_bad_settings(self):
+        """Unknown executors and empty pools are refused"""
+        with pytest.raises(ValueError):
+            AsyncCalculator('fibers')
+        with pytest.raises(ValueError):
+            AsyncCalculator(max_workers=0)
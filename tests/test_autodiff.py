@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for forward-mode automatic differentiation
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ExpressionError, evaluate
+from calc_engine.autodiff import Dual, derivative, digamma
+from calculator import AdvancedCalculator
+
+# Every engine function, at a point inside its domain
+FUNCTIONS = [
+    ('sin(x)', 0.7),
+    ('cos(x)', 0.7),
+    ('tan(x)', 0.7),
+    ('asin(x)', 0.3),
+    ('acos(x)', 0.3),
+    ('atan(x)', 0.7),
+    ('sqrt(x)', 2.5),
+    ('ln(x)', 2.5),
+    ('log(x)', 2.5),
+    ('log(x, 3)', 2.5),
+    ('log(8, x)', 2.5),
+    ('log10(x)', 2.5),
+    ('exp(x)', 1.5),
+    ('abs(x)', -1.5),
+    ('fact(x)', 3.5),
+    ('x!', 4),
+    ('gamma(x)', 2.5),
+    ('lgamma(x)', 2.5),
+    ('x^3 - 2/x + x^x', 1.5),
+    ('2^x * (x - 1)/(x + 1)', 1.5),
+]
+
+
+def central_difference(expression, x, degrees, h=1e-6):
+    """The finite-difference estimate derivative() replaces"""
+    above = float(evaluate(expression, degrees, variables={'x': x + h}))
+    below = float(evaluate(expression, degrees, variables={'x': x - h}))
+    return (above - below) / (2 * h)
+
+
+class TestDerivative:
+    """Test values and slopes of expressions"""
+
+    @pytest.mark.parametrize('degrees', [False, True])
+    @pytest.mark.parametrize('expression, x', FUNCTIONS)
+    def test_every_function(self, expression, x, degrees):
+        """Slopes agree with finite differences and values with evaluate()"""
+        result = derivative(expression, 'x', degrees, x=x)
+        assert result.value == pytest.approx(evaluate(expression, degrees, variables={'x': x}))
+        expected = central_difference(expression, x, degrees)
+        assert result.slope == pytest.approx(expected, rel=1e-6, abs=1e-8)
+
+    def test_degree_chain_rule(self):
+        """Degree-mode trigonometry includes the pi/180 factor"""
+        assert derivative('sin(x)', 'x', x=60).slope == pytest.approx(0.5 * math.pi / 180)
+        radians = derivative('asin(x)', 'x', False, x=0.5).slope
+        assert derivative('asin(x)', 'x', x=0.5).slope == pytest.approx(
+            radians * 180 / math.pi
+        )
+
+    def test_other_variables_are_constants(self):
+        """Only the chosen variable is differentiated"""
+        result = derivative('x^2 * y + y', 'x', x=3, y=2)
+        assert (result.value, result.slope) == (20, 12)
+        assert derivative('y * pi', 'x', x=1, y=2).slope == 0
+
+    def test_integer_results_stay_exact(self):
+        """Polynomials of integers give integer values and slopes"""
+        result = derivative('(-x)^3 + 4!', 'x', x=2)
+        assert (result.value, result.slope) == (16, -12)
+        assert isinstance(result.value, int)
+
+    def test_errors(self):
+        """Missing values and undefined points are reported"""
+        with pytest.raises(ExpressionError):
+            derivative('x + 1', 'x', y=2)
+        with pytest.raises(ExpressionError):
+            derivative('x + y', 'x', x=2)
+        with pytest.raises(ValueError):
+            derivative('ln(x)', 'x', x=-1)
+
+    def test_digamma(self):
+        """digamma matches known values and refuses poles"""
+        assert digamma(1) == pytest.approx(-0.5772156649015329, abs=1e-13)
+        assert digamma(0.5) == pytest.approx(-1.9635100260214235, abs=1e-13)
+        assert digamma(-0.5) == pytest.approx(0.03648997397857652, abs=1e-13)
+        with pytest.raises(ValueError):
+            digamma(-2)
+
+    def test_dual_arithmetic(self):
+        """Dual numbers mix with plain numbers on either side"""
+        x = Dual(3, 1)
+        result = 2 / x - (1 - x) * 4
+        assert result.value == pytest.approx(2 / 3 + 8)
+        assert result.slope == pytest.approx(-2 / 9 + 4)
+
+
+class TestArrays:
+    """Test differentiating at many points at once"""
+
+    def test_numpy_arrays(self):
+        """Arrays give arrays of values and slopes, nan outside the domain"""
+        np = pytest.importorskip('numpy')
+        points = np.array([0.0, 30.0, 90.0])
+        result = derivative('sin(x) * y', 'x', x=points, y=2)
+        assert result.value == pytest.approx(2 * np.sin(np.radians(points)))
+        assert result.slope == pytest.approx(2 * np.cos(np.radians(points)) * np.pi / 180)
+        result = derivative('ln(x) + fact(x)', 'x', x=[-1, 1, 2])
+        assert np.isnan(result.slope[0])
+        assert result.slope[1:] == pytest.approx([1 + digamma(2), 0.5 + 2 * digamma(3)])
+
+    def test_constant_expressions_broadcast(self):
+        """Expressions not using the arrays still give one entry per point"""
+        np = pytest.importorskip('numpy')
+        result = derivative('y^2', 'x', x=np.zeros(4), y=3)
+        assert list(result.value) == [9] * 4
+        assert list(result.slope) == [0] * 4
+
+    def test_without_numpy(self, monkeypatch):
+        """Sequences are differentiated point by point when NumPy is missing"""
+        import calc_engine.autodiff as autodiff
+
+        monkeypatch.setattr(autodiff, 'np', None)
+        result = autodiff.derivative('x^2', 'x', x=[1, 2, -1])
+        assert result.value == [1, 4, 1]
+        assert result.slope == [2, 4, -2]
+        result = autodiff.derivative('ln(x)', 'x', x=[-1, 1])
+        assert math.isnan(result.slope[0])
+        with pytest.raises(ValueError):
+            autodiff.derivative('x * y', 'x', x=[1, 2], y=[1])
+
+
+class TestCalculatorDerivative:
+    """Test AdvancedCalculator.derivative()"""
+
+    def test_uses_calculator_variables(self):
+        """Variables and ans are visible; the variable is not stored"""
+        calc = AdvancedCalculator()
+        calc.set_variable('a', 3)
+        calc.store_result(10)
+        result = calc.derivative('a * t^2 + ans', 't', 2)
+        assert (result.value, result.slope) == (22, 12)
+        assert 't' not in calc.variables
+
+    @pytest.mark.parametrize('mode', ['decimal', 'fraction'])
+    def test_exact_modes(self, mode):
+        """Decimal and Fraction variables are scalars, not arrays"""
+        calc = AdvancedCalculator()
+        calc.set_backend(mode)
+        calc.set_variable('a', calc.backend.number(0.5))
+        result = calc.derivative('a * x^2', 'x', 3)
+        assert (result.value, result.slope) == (4.5, 3)
+        assert not hasattr(result.value, 'shape')
+
+    def test_rejects_reserved_names(self):
+        """Constants and functions cannot be differentiated by"""
+        calc = AdvancedCalculator()
+        for name in ('pi', 'sin', 'ans', '2x'):
+            with pytest.raises(ValueError):
+                calc.derivative('x', name, 1)
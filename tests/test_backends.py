@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Tests for the float, Decimal and Fraction numeric backends
+"""
+
+import os
+import sys
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import (
+    DecimalBackend,
+    ExpressionCache,
+    FractionBackend,
+    compile_function,
+    evaluate,
+    get_backend,
+)
+from calc_engine.backends import FLOAT
+from calculator import AdvancedCalculator, evaluate_expression
+
+
+class TestFloatBackend:
+    """Test that the default backend is unchanged"""
+
+    def test_default_is_float(self):
+        """Without a backend results are plain numbers"""
+        assert evaluate('0.1 + 0.2') == 0.1 + 0.2
+        assert evaluate('0.1 + 0.2', backend=FLOAT) == 0.1 + 0.2
+        assert get_backend('float') is FLOAT
+
+    def test_unknown_backend(self):
+        """Unknown backend names are rejected"""
+        with pytest.raises(ValueError):
+            get_backend('complex')
+
+
+class TestDecimalBackend:
+    """Test Decimal evaluation at a configurable precision"""
+
+    def test_literals_are_exact(self):
+        """Decimal literals are not rounded through binary floats"""
+        assert evaluate('0.1 + 0.2', backend=DecimalBackend()) == Decimal('0.3')
+
+    def test_literals_keep_every_digit(self):
+        """Literals longer than a float holds keep their digits"""
+        text = '0.12345678901234567890123'
+        assert evaluate(text, backend=DecimalBackend(50)) == Decimal(text)
+        assert evaluate(text, backend=DecimalBackend(5)) == Decimal('0.12346')
+        assert evaluate('1e999', backend=DecimalBackend()) == Decimal('Infinity')
+
+    def test_precision(self):
+        """Results are rounded to the requested number of digits"""
+        result = evaluate('1/3', backend=DecimalBackend(50))
+        assert result == Decimal('0.' + '3' * 50)
+        assert str(evaluate('sqrt(2)', backend=DecimalBackend(40))) == (
+            '1.414213562373095048801688724209698078570'
+        )
+
+    def test_constants_at_full_precision(self):
+        """pi and e carry the backend's precision"""
+        backend = DecimalBackend(40)
+        assert str(evaluate('pi', backend=backend)) == (
+            '3.141592653589793238462643383279502884197'
+        )
+        assert str(evaluate('e', backend=backend)) == (
+            '2.718281828459045235360287471352662497757'
+        )
+
+    def test_trigonometry(self):
+        """sin, cos and tan are exact to the precision at special angles"""
+        backend = DecimalBackend(30)
+        assert evaluate('sin(30)', backend=backend) == Decimal('0.5')
+        assert evaluate('cos(60)', backend=backend) == Decimal('0.5')
+        assert evaluate('tan(45)', backend=backend) == Decimal(1)
+        assert evaluate('sin(pi)', degrees=False, backend=backend) == pytest.approx(0)
+        assert float(evaluate('asin(0.5)', backend=backend)) == pytest.approx(30)
+
+    def test_logarithms(self):
+        """Logarithms are computed in Decimal"""
+        backend = DecimalBackend(30)
+        assert evaluate('log(8, 2)', backend=backend) == Decimal(3)
+        assert evaluate('log(1000)', backend=backend) == Decimal(3)
+        assert evaluate('ln(e)', backend=backend) == pytest.approx(1)
+
+    def test_variables_are_converted(self):
+        """Float variables are converted to Decimal"""
+        assert evaluate('x + 1', variables={'x': 0.1}, backend=DecimalBackend()) == (
+            Decimal('1.1')
+        )
+
+    def test_errors_match_float(self):
+        """Errors have the same types as with floats"""
+        backend = DecimalBackend()
+        with pytest.raises(ZeroDivisionError):
+            evaluate('1/0', backend=backend)
+        with pytest.raises(ValueError):
+            evaluate('sqrt(-1)', backend=backend)
+
+    def test_precision_must_be_positive(self):
+        """A precision below one digit is rejected"""
+        with pytest.raises(ValueError):
+            DecimalBackend(0)
+
+
+class TestFractionBackend:
+    """Test exact rational evaluation"""
+
+    def test_exact_arithmetic(self):
+        """Rational results are exact"""
+        backend = FractionBackend()
+        assert evaluate('1/3 + 1/6', backend=backend) == Fraction(1, 2)
+        assert evaluate('0.1 + 0.2', backend=backend) == Fraction(3, 10)
+        assert evaluate('(2/3)^3', backend=backend) == Fraction(8, 27)
+        assert evaluate('2^-2', backend=backend) == Fraction(1, 4)
+
+    def test_literals_keep_every_digit(self):
+        """Literals are exact, not the nearest float"""
+        backend = FractionBackend()
+        text = '0.12345678901234567890123'
+        assert evaluate(text, backend=backend) == Fraction(text)
+        assert evaluate('1.5e-30 * 2', backend=backend) == Fraction(3, 10**30)
+        assert evaluate('1e-999999999', backend=backend) == 0
+
+    def test_exact_functions(self):
+        """sqrt of perfect squares, abs and fact stay exact"""
+        backend = FractionBackend()
+        assert evaluate('sqrt(9/4)', backend=backend) == Fraction(3, 2)
+        assert evaluate('|-1/3|', backend=backend) == Fraction(1, 3)
+        assert evaluate('5!/3', backend=backend) == Fraction(40)
+
+    def test_irrational_results_are_floats(self):
+        """Irrational functions and constants convert to float"""
+        backend = FractionBackend()
+        assert isinstance(evaluate('sqrt(2)', backend=backend), float)
+        assert evaluate('1/2 + sin(30)', backend=backend) == pytest.approx(1)
+        assert isinstance(evaluate('pi / 2', backend=backend), float)
+
+    def test_errors_match_float(self):
+        """Errors have the same types as with floats"""
+        backend = FractionBackend()
+        with pytest.raises(ZeroDivisionError):
+            evaluate('1/0', backend=backend)
+        with pytest.raises(ValueError):
+            evaluate('(-8)^(1/3)', backend=backend)
+
+
+class TestBackendCompilation:
+    """Test how backends interact with compilation and caching"""
+
+    def test_cache_separates_backends(self):
+        """One text compiled for two backends gives two entries"""
+        cache = ExpressionCache()
+        assert evaluate('1/4', cache=cache) == 0.25
+        assert evaluate('1/4', cache=cache, backend=FractionBackend()) == Fraction(1, 4)
+        assert len(cache) == 2
+        assert ('1/4', True, FractionBackend()) in cache
+        assert ('1/4', True) in cache
+
+    def test_compiled_function(self):
+        """Compiled functions convert positional arguments"""
+        f = compile_function('x/3 + y', ['x', 'y'], backend=FractionBackend())
+        assert f(1, 0.5) == Fraction(5, 6)
+
+    def test_float_keeps_folding(self):
+        """Only the float backend folds constants ahead of time"""
+        assert 'sin' not in compile_function('sin(30) + x', ['x']).source
+        assert 'sin' in compile_function(
+            'sin(30) + x', ['x'], backend=DecimalBackend()
+        ).source
+
+
+class TestCalculatorBackend:
+    """Test the number mode of the console calculator"""
+
+    def test_set_backend(self):
+        """Expression results follow the calculator's number mode"""
+        calc = AdvancedCalculator()
+        assert evaluate_expression('1/3', calc) == pytest.approx(1 / 3)
+        calc.set_backend('fraction')
+        assert evaluate_expression('1/3', calc) == Fraction(1, 3)
+        assert evaluate_expression('ans * 3', calc) == 1
+        calc.set_backend('decimal', 10)
+        assert evaluate_expression('2/3', calc) == Decimal('0.6666666667')
+
+    def test_switching_converts_stored_values(self):
+        """Variables and ans are converted to the new number type"""
+        calc = AdvancedCalculator()
+        calc.set_backend('decimal')
+        evaluate_expression('x = 1/8', calc)
+        calc.set_backend('float')
+        assert isinstance(calc.last_result, float)
+        assert evaluate_expression('x + ans', calc) == 0.25
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming batch evaluation and the console --batch mode
+"""
+
+import io
+import itertools
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine.batch import (
+    BatchEvaluator,
+    decode_lines,
+    evaluate_lines,
+    line_ranges,
+    map_file,
+    read_blocks,
+)
+from calculator import main
+
+LINES = ['1 + 1', 'sin(30)', '', '1/0', '2^100', 'foo(', '3!']
+EXPECTED = [
+    '2',
+    str(0.49999999999999994),
+    '',
+    'Error: division by zero',
+    str(2**100),
+    "Error: Unknown function 'foo' at position 0",
+    '6',
+]
+
+
+class TestEvaluateLines:
+    """Test evaluation of one chunk"""
+
+    def test_results_and_errors(self):
+        """Each line gives one output line; failures are counted"""
+        output, errors = evaluate_lines(LINES)
+        assert output == EXPECTED
+        assert errors == 2
+
+    def test_repeated_lines_match(self):
+        """Compiling a repeated expression does not change its result"""
+        output, _ = evaluate_lines(['sin(30) + 2^0.5'] * 3)
+        assert len(set(output)) == 1
+
+
+class TestBatchEvaluator:
+    """Test ordered, chunked dispatch"""
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_order_is_kept(self, workers):
+        """Results come back in input order across chunks and workers"""
+        batch = BatchEvaluator(workers=workers, chunk_size=2)
+        assert list(batch.evaluate(LINES)) == EXPECTED
+        assert batch.errors == 2
+        assert batch.count == len(LINES)
+
+    def test_many_chunks(self):
+        """Long inputs are split over many chunks without reordering"""
+        lines = [f'{i} * 2' for i in range(500)]
+        batch = BatchEvaluator(workers=2, chunk_size=7, max_pending=3)
+        assert list(batch.evaluate(lines)) == [str(i * 2) for i in range(500)]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_input_is_streamed(self, workers):
+        """An endless input can be consumed without reading it all"""
+        batch = BatchEvaluator(workers=workers, chunk_size=4, max_pending=2)
+        results = batch.evaluate(itertools.repeat('2 + 2'))
+        assert list(itertools.islice(results, 10)) == ['4'] * 10
+        results.close()
+
+    def test_backend_and_radians(self):
+        """Workers use the requested angle mode and number mode"""
+        batch = BatchEvaluator(workers=2, degrees=False, mode='fraction')
+        assert list(batch.evaluate(['1/3', 'cos(0)'])) == ['1/3', '1.0']
+
+    def test_invalid_settings(self):
+        """Bad settings are rejected up front"""
+        with pytest.raises(ValueError):
+            BatchEvaluator(workers=0)
+        with pytest.raises(ValueError):
+            BatchEvaluator(chunk_size=0)
+        with pytest.raises(ValueError):
+            BatchEvaluator(mode='complex')
+
+
+class TestMappedInput:
+    """Test the memory-mapped reader and byte-range splitting"""
+
+    def test_ranges_end_at_newlines(self):
+        """Ranges cover the input exactly and never split a line"""
+        data = b''.join(f'{i} + {i}\n'.encode() for i in range(100))
+        ranges = list(line_ranges(data, 16))
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[end - 1 : end] == b'\n'
+        assert b''.join(data[a:b] for a, b in ranges) == data
+
+    def test_last_line_without_newline(self):
+        """A final line without a newline ends the last range"""
+        data = b'1\n22\n333'
+        assert list(line_ranges(data, 1)) == [(0, 2), (2, 5), (5, 8)]
+        assert decode_lines(data[5:8]) == ['333']
+
+    def test_decode_lines(self):
+        """Lines are decoded as UTF-8; blank lines are kept"""
+        assert decode_lines('1\n\n2×3\n'.encode('utf-8')) == ['1', '', '2×3']
+        assert decode_lines(b'') == []
+
+    def test_read_blocks(self):
+        """Stream blocks are extended to whole lines"""
+        stream = io.BytesIO(b'11\n2222\n3\n')
+        assert list(read_blocks(stream, 3)) == [b'11\n', b'2222\n', b'3\n']
+
+    def test_empty_file(self, tmp_path):
+        """An empty file maps to no data"""
+        path = tmp_path / 'empty.txt'
+        path.write_bytes(b'')
+        assert len(map_file(str(path))) == 0
+        output = io.BytesIO()
+        assert BatchEvaluator(workers=1).run_file(str(path), output) == 0
+        assert output.getvalue() == b''
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_file(self, tmp_path, workers):
+        """Mapped files give the same output as evaluating the lines"""
+        path = tmp_path / 'input.txt'
+        path.write_bytes('\r\n'.join(LINES).encode('utf-8'))
+        output = io.BytesIO()
+        batch = BatchEvaluator(workers=workers, chunk_bytes=8)
+        assert batch.run_file(str(path), output) == 2
+        assert output.getvalue().decode('utf-8').split('\n')[:-1] == EXPECTED
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_stream(self, workers):
+        """Binary streams are read in blocks of whole lines"""
+        source = io.BytesIO(('\n'.join(LINES) + '\n').encode('utf-8'))
+        output = io.BytesIO()
+        batch = BatchEvaluator(workers=workers, chunk_bytes=5)
+        assert batch.run(source, output) == 2
+        assert output.getvalue().decode('utf-8').split('\n')[:-1] == EXPECTED
+
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_invalid_utf8_fails_one_line(self, tmp_path, workers):
+        """A line that is not UTF-8 is an error; the others are evaluated"""
+        data = b'1 + 1\n2 \xff 3\n2 * 3\n'
+        path = tmp_path / 'input.txt'
+        path.write_bytes(data)
+        for run in ('file', 'stream'):
+            output = io.BytesIO()
+            batch = BatchEvaluator(workers=workers, chunk_bytes=4)
+            if run == 'file':
+                errors = batch.run_file(str(path), output)
+            else:
+                errors = batch.run(io.BytesIO(data), output)
+            first, bad, last = output.getvalue().decode('utf-8').split('\n')[:-1]
+            assert (errors, first, last) == (1, '2', '6')
+            assert bad.startswith('Error')
+
+
+class TestBatchCommandLine:
+    """Test calculator.py --batch"""
+
+    def test_file_to_file(self, tmp_path, capsys):
+        """A file of expressions is evaluated into the output file"""
+        source = tmp_path / 'input.txt'
+        source.write_text('\n'.join(LINES) + '\n', encoding='utf-8')
+        destination = tmp_path / 'output.txt'
+        status = main(['--batch', str(source), '-o', str(destination), '--workers', '2'])
+        assert status == 1
+        assert destination.read_text(encoding='utf-8').splitlines() == EXPECTED
+        assert '2 of 7 expressions failed' in capsys.readouterr().err
+
+    def test_clean_run_succeeds(self, tmp_path):
+        """A batch without errors exits with status 0"""
+        source = tmp_path / 'input.txt'
+        source.write_text('1 + 2\n2 * 3\n', encoding='utf-8')
+        destination = tmp_path / 'output.txt'
+        status = main(['--batch', str(source), '-o', str(destination), '--workers', '1'])
+        assert status == 0
+        assert destination.read_text(encoding='utf-8') == '3\n6\n'
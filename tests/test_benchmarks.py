@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark runner and its baseline comparison
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Add src and benchmarks directories to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+import run_benchmarks
+from run_benchmarks import Result, compare
+
+
+def baseline(**best):
+    """Baseline data with the given best times"""
+    return {
+        'format': run_benchmarks.FORMAT_VERSION,
+        'benchmarks': {name: {'best_ns': ns, 'median_ns': ns} for name, ns in best.items()},
+    }
+
+
+class TestCompare:
+    """Test regression detection against a baseline"""
+
+    def test_within_threshold(self):
+        """Test that small slowdowns are not regressions"""
+        [c] = compare(baseline(a=100.0), [Result('a', 120.0, 120.0, 1)], 0.25)
+        assert c.ratio == pytest.approx(1.2)
+        assert not c.regressed
+
+    def test_regression(self):
+        """Test that slowdowns beyond the threshold are regressions"""
+        [c] = compare(baseline(a=100.0), [Result('a', 300.0, 300.0, 1)], 0.25)
+        assert c.regressed
+
+    def test_threshold_is_configurable(self):
+        """Test a tighter threshold"""
+        [c] = compare(baseline(a=100.0), [Result('a', 120.0, 120.0, 1)], 0.1)
+        assert c.regressed
+
+    def test_speedup(self):
+        """Test that faster results pass"""
+        [c] = compare(baseline(a=100.0), [Result('a', 50.0, 50.0, 1)])
+        assert c.ratio == pytest.approx(0.5)
+        assert not c.regressed
+
+    def test_new_benchmark(self):
+        """Test that benchmarks missing from the baseline pass"""
+        [c] = compare(baseline(), [Result('a', 50.0, 50.0, 1)])
+        assert c.baseline_ns is None
+        assert not c.regressed
+
+
+class TestBaselineFile:
+    """Test reading and writing baselines"""
+
+    def test_missing(self, tmp_path):
+        """Test that a missing baseline gives None"""
+        assert run_benchmarks.load_baseline(tmp_path / 'none.json') is None
+
+    def test_wrong_format(self, tmp_path):
+        """Test that other formats are rejected"""
+        path = tmp_path / 'baseline.json'
+        path.write_text(json.dumps({'format': 0}))
+        with pytest.raises(ValueError):
+            run_benchmarks.load_baseline(path)
+
+    def test_stored_baseline(self):
+        """Test that the committed baseline covers every benchmark"""
+        stored = run_benchmarks.load_baseline(run_benchmarks.DEFAULT_BASELINE)
+        assert set(stored['benchmarks']) == {b.name for b in run_benchmarks.BENCHMARKS}
+
+    def test_save_and_compare(self, tmp_path, capsys):
+        """Test saving a baseline and comparing a later run with it"""
+        path = str(tmp_path / 'baseline.json')
+        options = ['-k', 'cache.hit', '--baseline', path, '--repeat', '1', '--min-time', '0']
+        assert run_benchmarks.main(options + ['--save']) == 0
+        saved = json.loads((tmp_path / 'baseline.json').read_text())
+        assert list(saved['benchmarks']) == ['cache.hit']
+        # A huge threshold keeps timing noise from failing the test
+        assert run_benchmarks.main(options + ['--threshold', '100']) == 0
+        assert 'cache.hit' in capsys.readouterr().out
+
+
+class TestBenchmarks:
+    """Test that every benchmark runs"""
+
+    @pytest.mark.parametrize('bench', run_benchmarks.BENCHMARKS, ids=lambda b: b.name)
+    def test_runs(self, bench):
+        """Test one quick sample of each benchmark"""
+        try:
+            result = run_benchmarks.run_benchmark(bench, repeat=1, min_time=0)
+        except ImportError as e:
+            pytest.skip(str(e))
+        assert result.best_ns > 0
+        assert result.calls >= 1
+
+    def test_select(self):
+        """Test choosing benchmarks by name"""
+        names = {b.name for b in run_benchmarks.select(['cache.'])}
+        assert names == {'cache.hit', 'cache.miss', 'cache.eviction'}
@@ -5,7 +5,6 @@ Comprehensive test suite for the Advanced Calculator
 
 import math
 import pytest
-import re
 import sys
 import os
 
@@ -22,38 +21,8 @@ class TestExpressionEvaluation:
     """Test expression evaluation functionality"""
     
     def evaluate_expression(self, expression):
-        """Safely evaluate mathematical expression - copied from calculator"""
-        # Replace function names with their Python equivalents
-        expression = expression.replace('^', '**')
-        expression = expression.replace('×', '*')
-        expression = expression.replace('÷', '/')
-        
-        # Handle trigonometric functions (degrees mode)
-        expression = re.sub(r'\bsin\(([^)]+)\)', r'math.sin(math.radians(\1))', expression)
-        expression = re.sub(r'\bcos\(([^)]+)\)', r'math.cos(math.radians(\1))', expression)
-        expression = re.sub(r'\btan\(([^)]+)\)', r'math.tan(math.radians(\1))', expression)
-        
-        # Handle other functions
-        expression = re.sub(r'√\(([^)]+)\)', r'math.sqrt(\1)', expression)
-        expression = re.sub(r'\bsqrt\(([^)]+)\)', r'math.sqrt(\1)', expression)
-        expression = re.sub(r'\bln\(([^)]+)\)', r'math.log(\1)', expression)
-        expression = re.sub(r'\blog\(([^)]+)\)', r'math.log10(\1)', expression)
-        expression = re.sub(r'\babs\(([^)]+)\)', r'abs(\1)', expression)
-        
-        try:
-            # Use eval with restricted namespace for safety
-            allowed_names = {
-                "__builtins__": {},
-                "math": math,
-                "abs": abs,
-                "round": round,
-                "min": min,
-                "max": max
-            }
-            result = eval(expression, allowed_names)
-            return result
-        except Exception as e:
-            raise ValueError(f"Invalid expression: {str(e)}")
+        """Evaluate with the console calculator, through the shared engine"""
+        return calculator.evaluate_expression(expression, calculator.AdvancedCalculator())
     
     def test_basic_arithmetic(self):
         """Test basic arithmetic operations"""
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for shared evaluation engines and per-request contexts
+"""
+
+import math
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ExpressionCache, get_backend
+from calc_engine.context import EvaluationContext, EvaluationEngine
+from calculator import AdvancedCalculator, evaluate_expression
+
+
+class TestEvaluationContext:
+    """Test the per-request state"""
+
+    def test_slots(self):
+        """Contexts have a fixed set of attributes"""
+        context = EvaluationContext()
+        assert not hasattr(context, '__dict__')
+        with pytest.raises(AttributeError):
+            context.unknown = 1
+
+    def test_variable_table_and_copy(self):
+        """ans is the last result, and copies are independent"""
+        context = EvaluationContext({'x': 2}, last_result=5)
+        assert context.variable_table() == {'x': 2, 'ans': 5}
+        copy = context.copy()
+        copy.variables['y'] = 3
+        assert 'y' not in context.variables
+
+
+class TestEvaluationEngine:
+    """Test evaluation through a shared engine"""
+
+    def test_immutable(self):
+        """Engine attributes cannot be replaced"""
+        engine = EvaluationEngine()
+        with pytest.raises(AttributeError):
+            engine.backend = get_backend('fraction')
+        with pytest.raises(AttributeError):
+            engine.other = 1
+
+    def test_evaluate_updates_context(self):
+        """The result becomes the context's ans"""
+        engine = EvaluationEngine()
+        context = EvaluationContext({'x': 3})
+        assert engine.evaluate('x^2', context) == 9
+        assert engine.evaluate('ans + 1', context) == 10
+        assert context.last_result == 10
+        assert engine.evaluate('sin(30)') == pytest.approx(0.5)
+
+    def test_angle_mode(self):
+        """Each context chooses degrees or radians"""
+        engine = EvaluationEngine()
+        radians = EvaluationContext(degrees=False)
+        assert engine.evaluate('sin(pi/2)', radians) == pytest.approx(1.0)
+        assert engine.evaluate('sin(90)', EvaluationContext()) == pytest.approx(1.0)
+
+    def test_thread_table_skips_shared_cache(self):
+        """Repeated expressions in a thread do not touch the shared cache"""
+        cache = ExpressionCache()
+        engine = EvaluationEngine(cache=cache, local_capacity=2)
+        for _ in range(3):
+            engine.evaluate('1 + 2')
+        assert cache.info().misses == 1
+        assert cache.info().hits == 0
+        engine.evaluate('2 + 3')
+        engine.evaluate('3 + 4')
+        engine.evaluate('1 + 2')
+        assert cache.info().hits == 1
+
+    def test_backend(self):
+        """Engines compute with their backend's numbers"""
+        engine = EvaluationEngine(get_backend('fraction'))
+        assert str(engine.evaluate('1/3 + 1/6')) == '1/2'
+
+    def test_concurrent_contexts(self):
+        """Threads sharing an engine never see each other's variables"""
+        engine = EvaluationEngine()
+        start = threading.Barrier(8)
+
+        def work(n):
+            start.wait()
+            context = EvaluationContext({'x': n})
+            results = [engine.evaluate(f'x * {i} + ans', context) for i in range(200)]
+            return results[-1], context.last_result
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(work, range(8)))
+        for n, (last, ans) in enumerate(results):
+            assert last == ans == n * sum(range(200))
+
+
+class TestCalculatorContext:
+    """Test that AdvancedCalculator keeps its state in a context"""
+
+    def test_state_lives_in_context(self):
+        """Memory, variables and ans are the context's"""
+        context = EvaluationContext()
+        calc = AdvancedCalculator(context)
+        calc.store_memory(4)
+        calc.set_variable('x', 2)
+        evaluate_expression('x + 1', calc)
+        assert (context.memory, context.variables, context.last_result) == (4, {'x': 2}, 3)
+        calc.clear_memory()
+        assert context.memory == 0
+
+    def test_set_backend_converts_context(self):
+        """Switching number mode converts the stored values"""
+        calc = AdvancedCalculator()
+        calc.set_variable('x', 0.5)
+        calc.set_backend('fraction')
+        assert str(calc.context.variables['x']) == '1/2'
+        assert math.isclose(calc.factorial(5), 120)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared expression engine
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ExpressionError, evaluate, parse, tokenize
+from calc_engine.nodes import BinOp, Call, Name, Number
+
+
+class TestTokenizer:
+    """Test the single-pass tokenizer"""
+
+    def test_numbers_and_operators(self):
+        """Test that literals and operators are recognised"""
+        values = [token.value for token in tokenize("12 + 3.5e2*x")]
+        assert values == [12, '+', 350.0, '*', 'x', '']
+
+    def test_display_symbols(self):
+        """Test that GUI display symbols map to canonical operators"""
+        values = [token.value for token in tokenize("2×π÷3**2")]
+        assert values == [2, '*', 'pi', '/', 3, '^', 2, '']
+
+    def test_bad_character(self):
+        """Test that unknown characters are reported with their position"""
+        with pytest.raises(ExpressionError, match="position 2"):
+            tokenize("1 $ 2")
+
+
+class TestParser:
+    """Test operator precedence and the parsed tree shape"""
+
+    def test_precedence(self):
+        """Test that multiplication binds tighter than addition"""
+        assert parse("1+2*3") == BinOp('+', Number(1), BinOp('*', Number(2), Number(3)))
+
+    def test_power_is_right_associative(self):
+        """Test that 2^3^2 parses as 2^(3^2)"""
+        assert evaluate("2^3^2") == 512
+        assert evaluate("-2^2") == -4
+
+    def test_implicit_multiplication(self):
+        """Test implicit multiplication forms"""
+        assert evaluate("2(3)") == 6
+        assert evaluate("(1+2)(3+4)") == 21
+        assert evaluate("(2)3") == 6
+        assert abs(evaluate("2pi") - 2 * math.pi) < 1e-12
+        assert parse("3sin(30)") == BinOp('*', Number(3), Call('sin', (Number(30),)))
+
+    def test_constants(self):
+        """Test named constants"""
+        assert parse("pi") == Name('pi')
+        assert evaluate("e") == math.e
+
+    def test_syntax_errors(self):
+        """Test that malformed input raises ExpressionError"""
+        for expression in ["sin(30", "2 3", "1+", "foo(1)", "sqrt(1, 2)", ")"]:
+            with pytest.raises(ExpressionError):
+                parse(expression)
+
+
+class TestEvaluation:
+    """Test evaluation of parsed expressions"""
+
+    def test_nested_calls(self):
+        """Test nested function calls that the regex rewrite could not handle"""
+        expected = math.sin(math.radians(math.cos(math.radians(30))))
+        assert evaluate("sin(cos(30))") == expected
+        assert evaluate("sqrt(sqrt(16))") == 2
+
+    def test_angle_modes(self):
+        """Test degrees and radians modes"""
+        assert abs(evaluate("sin(90)") - 1) < 1e-12
+        assert abs(evaluate("sin(pi/2)", degrees=False) - 1) < 1e-12
+        assert abs(evaluate("asin(1)") - 90) < 1e-12
+
+    def test_gui_notation(self):
+        """Test absolute value bars, square root sign and factorial"""
+        assert evaluate("|-3|") == 3
+        assert evaluate("||-3|-5|") == 2
+        assert evaluate("√(25+0)") == 5
+        assert evaluate("5!") == 120
+        assert evaluate("fact(5)") == 120
+
+    def test_logarithms(self):
+        """Test log, log with base, ln and log10"""
+        assert evaluate("log(100)") == 2
+        assert abs(evaluate("log(8, 2)") - 3) < 1e-12
+        assert abs(evaluate("ln(e)") - 1) < 1e-12
+
+    def test_math_errors(self):
+        """Test that math errors surface as their natural exception types"""
+        with pytest.raises(ZeroDivisionError):
+            evaluate("1/0")
+        with pytest.raises(ValueError):
+            evaluate("sqrt(-1)")
+        with pytest.raises(ExpressionError):
+            evaluate("x + 1")
+
+
+class TestConsoleEvaluator:
+    """Test the console calculator's expression entry point"""
+
+    def test_evaluate_expression(self):
+        """Test that the console evaluator returns floats and wraps errors"""
+        import calculator
+
+        calc = calculator.AdvancedCalculator()
+        assert calculator.evaluate_expression("sin(30) + cos(60) * sqrt(16)", calc) == pytest.approx(2.5)
+        with pytest.raises(ValueError, match="Invalid expression"):
+            calculator.evaluate_expression("1 / 0", calc)
+
+    def test_variables_and_ans(self):
+        """Test assignment, variable references and ans"""
+        import calculator
+
+        calc = calculator.AdvancedCalculator()
+        assert calculator.evaluate_expression("r = 2 + 1", calc) == 3
+        assert calc.get_variable("r") == 3
+        assert calculator.evaluate_expression("pi r^2", calc) == pytest.approx(9 * math.pi)
+        assert calculator.evaluate_expression("ans / pi", calc) == pytest.approx(9)
+        with pytest.raises(ValueError):
+            calc.set_variable("sin", 1)
+        with pytest.raises(ValueError, match="Invalid expression"):
+            calculator.evaluate_expression("undefined + 1", calc)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for expression compilation and the compiled-expression cache
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import (
+    ExpressionCache,
+    ExpressionError,
+    compile_expression,
+    compile_function,
+    evaluate,
+    evaluate_node,
+    parse,
+)
+
+
+class TestCompiler:
+    """Test that compiled expressions agree with the tree-walking evaluator"""
+
+    EXPRESSIONS = [
+        "1 + 2 * 3",
+        "2^10 - 3^-1",
+        "sin(cos(30)) + tan(45)",
+        "|-3| + √16 + 5!",
+        "log(8, 2) + ln(e) + log10(1000)",
+        "-(2 + 3)(4 - 1) / 7",
+    ]
+
+    @pytest.mark.parametrize("expression", EXPRESSIONS)
+    @pytest.mark.parametrize("degrees", [True, False])
+    def test_matches_tree_walker(self, expression, degrees):
+        """Test compiled and interpreted results are identical"""
+        compiled = compile_expression(expression, degrees)
+        assert compiled.evaluate() == evaluate_node(parse(expression), degrees)
+
+    def test_variables(self):
+        """Test that free names become parameters of the compiled function"""
+        compiled = compile_expression("x^2 + y")
+        assert compiled.variables == ('x', 'y')
+        assert compiled.evaluate(x=3, y=1) == 10
+
+    def test_compile_function(self):
+        """Test compiled functions bind parameters positionally"""
+        f = compile_function("x^2 + y*sin(x)", params=["x", "y"])
+        assert f(3, 0) == 9
+        assert f(90, 2) == pytest.approx(8102)
+        assert compile_function("y - x", params=["x", "y"])(1, 5) == 4
+        assert compile_function("2", params=["x"])(7) == 2
+
+    def test_compile_function_rejects_bad_params(self):
+        """Test unknown names and invalid parameter lists"""
+        with pytest.raises(ExpressionError):
+            compile_function("x + z", params=["x"])
+        with pytest.raises(ExpressionError):
+            compile_function("x", params=["x", "x"])
+        with pytest.raises(ExpressionError):
+            compile_function("pi", params=["pi"])
+
+    def test_deep_nesting_falls_back(self):
+        """Test expressions too deep for the Python compiler still evaluate"""
+        expression = "1+(" * 250 + "1" + ")" * 250
+        assert compile_expression(expression).evaluate() == 251
+
+
+class TestExpressionCache:
+    """Test LRU behaviour and statistics of the cache"""
+
+    def test_hits_and_misses(self):
+        """Test that repeated lookups hit and share the compiled form"""
+        cache = ExpressionCache(capacity=8)
+        first = cache.get("1 + 1")
+        assert cache.get(" 1 + 1 ") is first
+        info = cache.info()
+        assert (info.hits, info.misses, info.size) == (1, 1, 1)
+
+    def test_mode_is_part_of_key(self):
+        """Test that degrees and radians compile separately"""
+        cache = ExpressionCache()
+        assert cache.get("sin(90)", True).evaluate() == pytest.approx(1)
+        assert cache.get("sin(90)", False).evaluate() == pytest.approx(0.8939966636)
+        assert cache.info().misses == 2
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = ExpressionCache(capacity=2)
+        cache.get("1")
+        cache.get("2")
+        cache.get("1")
+        cache.get("3")
+        assert ("1", True) in cache
+        assert ("2", True) not in cache
+        assert cache.info().evictions == 1
+
+    def test_resize_and_clear(self):
+        """Test shrinking the capacity and clearing the cache"""
+        cache = ExpressionCache(capacity=4)
+        for text in ["1", "2", "3", "4"]:
+            cache.get(text)
+        cache.resize(1)
+        assert len(cache) == 1
+        cache.clear()
+        assert cache.info() == (0, 0, 0, 0, 1)
+
+    def test_evaluate_uses_given_cache(self):
+        """Test evaluate() with an explicit cache"""
+        cache = ExpressionCache()
+        assert evaluate("6 * 7", cache=cache) == 42
+        assert evaluate("6 * 7", cache=cache) == 42
+        assert cache.info().hits == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,217 +1,143 @@
 #!/usr/bin/env python3
 """
-Comprehensive test suite for the Advanced Calculator
+Expression evaluation tests: every front end goes through the shared engine
 """
 
 import math
-import pytest
-import re
-import sys
 import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import evaluate
+from calc_engine.session import EvaluationSession
+from calculator import AdvancedCalculator, evaluate_expression
+
+# Expressions and their values in degree mode, including the functions on
+# which the old per-front-end evaluators disagreed
+CASES = [
+    ('sin(30)', 0.5),
+    ('sin(2+3)', math.sin(math.radians(5))),
+    ('sin(45+45)', 1.0),
+    ('cos(π/4)', math.cos(math.radians(math.pi / 4))),
+    ('√(25+0)', 5.0),
+    ('√(2*8)', 4.0),
+    ('log(10*10)', 2.0),
+    ('log(8, 2)', 3.0),
+    ('ln(e^2)', 2.0),
+    ('asin(0.5)', 30.0),
+    ('atan(1)', 45.0),
+    ('fact(5)', 120.0),
+    ('4!', 24.0),
+    ('|-3| + |2-7|', 8.0),
+    ('abs(-5)', 5.0),
+    ('2×3÷4', 1.5),
+    ('2^3^2', 512.0),
+    ('2(3+4)', 14.0),
+]
+
+
+class _HeadlessVar:
+    """Stands in for a tkinter variable"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+@pytest.fixture(scope='module')
+def gui():
+    """The GUI's evaluation path, without a window or sandbox process"""
+    pytest.importorskip('tkinter')
+    from calculator_gui import AdvancedCalculatorGUI
+
+    gui = AdvancedCalculatorGUI.__new__(AdvancedCalculatorGUI)
+    gui.session = EvaluationSession(sandboxed=False)
+    gui.degrees_mode = _HeadlessVar(True)
+    gui.calc = AdvancedCalculator()
+    gui.profiling = False
+    gui.last_profile = None
+    return gui
+
 
-# Add current directory to path to import calculator modules
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-try:
-    import calculator
-except ImportError:
-    calculator = None
-
-class TestExpressionEvaluation:
-    """Test expression evaluation functionality"""
-    
-    def evaluate_expression(self, expression):
-        """Safely evaluate mathematical expression - copied from calculator"""
-        # Replace function names with their Python equivalents
-        expression = expression.replace('^', '**')
-        expression = expression.replace('×', '*')
-        expression = expression.replace('÷', '/')
-        
-        # Handle trigonometric functions (degrees mode)
-        expression = re.sub(r'\bsin\(([^)]+)\)', r'math.sin(math.radians(\1))', expression)
-        expression = re.sub(r'\bcos\(([^)]+)\)', r'math.cos(math.radians(\1))', expression)
-        expression = re.sub(r'\btan\(([^)]+)\)', r'math.tan(math.radians(\1))', expression)
-        
-        # Handle other functions
-        expression = re.sub(r'√\(([^)]+)\)', r'math.sqrt(\1)', expression)
-        expression = re.sub(r'\bsqrt\(([^)]+)\)', r'math.sqrt(\1)', expression)
-        expression = re.sub(r'\bln\(([^)]+)\)', r'math.log(\1)', expression)
-        expression = re.sub(r'\blog\(([^)]+)\)', r'math.log10(\1)', expression)
-        expression = re.sub(r'\babs\(([^)]+)\)', r'abs(\1)', expression)
-        
+class TestFrontEndsAgree:
+    """Test that the console and GUI give the engine's results"""
+
+    @pytest.mark.parametrize('expression, expected', CASES)
+    def test_engine(self, expression, expected):
+        """The engine computes the expected value"""
+        assert evaluate(expression) == pytest.approx(expected)
+
+    @pytest.mark.parametrize('expression, expected', CASES)
+    def test_console(self, expression, expected):
+        """The console calculator matches the engine"""
+        result = evaluate_expression(expression, AdvancedCalculator())
+        assert isinstance(result, float)
+        assert result == float(evaluate(expression))
+
+    @pytest.mark.parametrize('expression, expected', CASES)
+    def test_gui(self, gui, expression, expected):
+        """The GUI matches the engine"""
+        result = gui.evaluate_expression(expression)
+        assert isinstance(result, float)
+        assert result == float(evaluate(expression))
+
+    def test_radians(self, gui):
+        """The GUI's angle mode reaches the engine"""
+        gui.degrees_mode = _HeadlessVar(False)
         try:
-            # Use eval with restricted namespace for safety
-            allowed_names = {
-                "__builtins__": {},
-                "math": math,
-                "abs": abs,
-                "round": round,
-                "min": min,
-                "max": max
-            }
-            result = eval(expression, allowed_names)
-            return result
-        except Exception as e:
-            raise ValueError(f"Invalid expression: {str(e)}")
-    
-    def test_basic_arithmetic(self):
-        """Test basic arithmetic operations"""
-        assert self.evaluate_expression("2 + 3") == 5
-        assert self.evaluate_expression("10 - 4") == 6
-        assert self.evaluate_expression("6 * 7") == 42
-        assert self.evaluate_expression("15 / 3") == 5
-        assert self.evaluate_expression("2 ** 3") == 8
-    
-    def test_trigonometric_functions(self):
-        """Test trigonometric functions"""
-        # Test sin, cos, tan with known values
-        assert abs(self.evaluate_expression("sin(0)") - 0) < 1e-10
-        assert abs(self.evaluate_expression("cos(0)") - 1) < 1e-10
-        assert abs(self.evaluate_expression("sin(90)") - 1) < 1e-10
-        assert abs(self.evaluate_expression("cos(90)") - 0) < 1e-10
-    
-    def test_mathematical_functions(self):
-        """Test mathematical functions"""
-        assert self.evaluate_expression("sqrt(16)") == 4
-        assert abs(self.evaluate_expression("log(10)") - 1) < 1e-10
-        assert abs(self.evaluate_expression("ln(2.718281828)") - 1) < 1e-6
-        assert self.evaluate_expression("abs(-5)") == 5
-    
-    def test_complex_expressions(self):
-        """Test complex expressions combining multiple functions"""
-        # Test the specific case from the user's screenshot
-        result = self.evaluate_expression("sin(77) + sin(44)")
-        assert isinstance(result, (int, float))
-        assert not math.isnan(result)
-        
-        # Test more complex expressions
-        result = self.evaluate_expression("sqrt(25) + cos(0) * 3")
-        assert abs(result - 8) < 1e-10
-        
-        result = self.evaluate_expression("log(100) + ln(math.e)")
-        assert abs(result - 3) < 1e-10
-    
-    def test_parentheses_precedence(self):
-        """Test parentheses and operator precedence"""
-        assert self.evaluate_expression("(2 + 3) * 4") == 20
-        assert self.evaluate_expression("2 + 3 * 4") == 14
-        assert self.evaluate_expression("sin(30 + 60)") == self.evaluate_expression("sin(90)")
-    
-    def test_error_handling(self):
-        """Test error handling for invalid expressions"""
-        with pytest.raises(ValueError):
-            self.evaluate_expression("sqrt(-1)")
-        
-        with pytest.raises(ValueError):
-            self.evaluate_expression("1 / 0")
-        
+            assert gui.evaluate_expression('sin(pi/2)') == pytest.approx(1.0)
+        finally:
+            gui.degrees_mode = _HeadlessVar(True)
+
+    def test_gui_variables(self, gui):
+        """GUI assignments define variables that later expressions use"""
+        gui.calc = AdvancedCalculator()
+        assert gui.evaluate_expression('rate = 2 + 3') == 5
+        assert gui.variables == {'rate': 5}
+        gui.last_result = 4
+        assert gui.evaluate_expression('rate * ans') == 20
         with pytest.raises(ValueError):
-            self.evaluate_expression("invalid_function(5)")
-
-
-class TestCalculatorModule:
-    """Test the calculator module if available"""
-    
-    @pytest.mark.skipif(calculator is None, reason="Calculator module not available")
-    def test_calculator_import(self):
-        """Test that calculator module can be imported"""
-        assert calculator is not None
-    
-    @pytest.mark.skipif(calculator is None, reason="Calculator module not available")
-    def test_calculator_functionality(self):
-        """Test basic calculator functionality if module is available"""
-        # This would test actual calculator functions if they were properly structured
-        # For now, just verify the module exists
-        assert hasattr(calculator, '__file__')
-
-
-class TestFileStructure:
-    """Test project file structure and requirements"""
-    
-    def test_required_files_exist(self):
-        """Test that required project files exist"""
-        required_files = [
-            'calculator.py',
-            'calculator_gui.py',
-            'requirements.txt',
-            'README.md'
-        ]
-        
-        for file in required_files:
-            assert os.path.exists(file), f"Required file {file} is missing"
-    
-    def test_python_files_syntax(self):
-        """Test that Python files have valid syntax"""
-        python_files = ['calculator.py', 'calculator_gui.py']
-        
-        for file in python_files:
-            if os.path.exists(file):
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Try to compile the file to check syntax
-                try:
-                    compile(content, file, 'exec')
-                except SyntaxError as e:
-                    pytest.fail(f"Syntax error in {file}: {e}")
-    
-    def test_requirements_format(self):
-        """Test that requirements.txt is properly formatted"""
-        if os.path.exists('requirements.txt'):
-            with open('requirements.txt', 'r') as f:
-                lines = f.readlines()
-            
-            for line_num, line in enumerate(lines, 1):
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    # Basic check for package name format
-                    if '==' in line:
-                        package, version = line.split('==', 1)
-                        assert package.strip(), f"Empty package name at line {line_num}"
-                        assert version.strip(), f"Empty version at line {line_num}"
-
-
-if __name__ == "__main__":
-    # Run tests when executed directly
-    pytest.main([__file__, "-v"])
-        expression = re.sub(r'\blog\(([^)]+)\)', r'math.log10(\1)', expression)
-        
-        # Replace constants
-        expression = re.sub(r'\bπ\b', str(math.pi), expression)
-        expression = re.sub(r'\bpi\b', str(math.pi), expression)
-        expression = re.sub(r'\be\b', str(math.e), expression)
-        
-        print(f"Original: {expression}")
-        
-        # Safe evaluation
-        allowed_names = {
-            'math': math,
-            'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-            'sqrt': math.sqrt, 'log': math.log, 'log10': math.log10,
-            'abs': abs, 'pi': math.pi, 'e': math.e,
-            'factorial': math.factorial, 'degrees': math.degrees, 'radians': math.radians
-        }
-        
-        result = eval(expression, {"__builtins__": {}}, allowed_names)
-        return float(result)
-    
-    # Test cases
-    test_cases = [
-        "sin(30)",
-        "sin(2+3)",
-        "sin(45+45)",
-        "cos(π/4)",
-        "√(25+0)",
-        "√(2*8)",
-        "log(10*10)"
-    ]
-    
-    for test in test_cases:
-        try:
-            result = evaluate_expression(test)
-            print(f"✅ {test} = {result}")
-        except Exception as e:
-            print(f"❌ {test} -> Error: {e}")
+            gui.evaluate_expression('pi = 3')
 
-if __name__ == "__main__":
-    test_evaluate_expression()
\ No newline at end of file
+    def test_errors(self, gui):
+        """Invalid input fails in every front end"""
+        calc = AdvancedCalculator()
+        for expression in ['sqrt(-1)', '1/0', 'invalid_function(5)', '2 +']:
+            with pytest.raises(ValueError):
+                evaluate_expression(expression, calc)
+            with pytest.raises((ValueError, ZeroDivisionError)):
+                gui.evaluate_expression(expression)
+
+
+class TestSessionModes:
+    """Test the session's handling of number modes"""
+
+    def test_calculate_returns_floats(self):
+        """Float-mode results are converted, other modes keep their type"""
+        from calc_engine import get_backend
+
+        session = EvaluationSession(sandboxed=False)
+        assert session.calculate('fact(5)') == 120.0
+        assert isinstance(session.calculate('fact(5)'), float)
+        third = session.calculate('1/3', backend=get_backend('fraction'))
+        assert str(third) == '1/3'
+
+    def test_non_float_modes_use_the_sandbox(self):
+        """Exact modes are evaluated in the worker under its time limit"""
+        from calc_engine import ResourceLimitError, get_backend
+
+        session = EvaluationSession(sandboxed=True, timeout=1.0)
+        try:
+            result = session.calculate('1/3', backend=get_backend('decimal', 10))
+            assert str(result) == '0.3333333333'
+            assert session._sandbox is not None
+            with pytest.raises(ResourceLimitError):
+                session.calculate('9^9^9', backend=get_backend('fraction'))
+        finally:
+            session.close()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the factorial subsystem and the Gamma functions
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import evaluate, get_backend
+from calc_engine.factorial import (
+    CACHE_MIN,
+    FactorialCache,
+    fact,
+    factorial,
+    log_factorial,
+    range_product,
+)
+from calculator import AdvancedCalculator
+
+
+class TestFactorialCache:
+    """Test exact factorials with checkpoint reuse"""
+
+    def test_range_product(self):
+        """The binary-split product matches a running product"""
+        assert range_product(1, 1) == 1
+        assert range_product(5, 6) == 5
+        assert range_product(1, 101) == math.factorial(100)
+        assert range_product(1000, 1500) == math.factorial(1499) // math.factorial(999)
+
+    def test_small_values_are_not_cached(self):
+        """Cheap factorials bypass the cache"""
+        cache = FactorialCache()
+        assert cache.factorial(20) == math.factorial(20)
+        assert len(cache) == 0
+
+    def test_consecutive_values_reuse_checkpoints(self):
+        """n! builds on a nearby cached k!"""
+        cache = FactorialCache()
+        n = CACHE_MIN + 100
+        for m in range(n, n + 5):
+            assert cache.factorial(m) == math.factorial(m)
+        assert cache.computed == 1
+        assert cache.reused == 4
+        assert cache.factorial(n + 2) == math.factorial(n + 2)
+        assert cache.hits == 1
+
+    def test_distant_values_are_computed(self):
+        """A checkpoint far below n is not worth reusing"""
+        cache = FactorialCache()
+        cache.factorial(CACHE_MIN)
+        assert cache.factorial(CACHE_MIN * 3) == math.factorial(CACHE_MIN * 3)
+        assert cache.computed == 2
+
+    def test_bit_budget(self):
+        """Checkpoints beyond max_bits are evicted oldest first"""
+        size = math.factorial(CACHE_MIN).bit_length()
+        cache = FactorialCache(max_bits=size * 2 + 1000)
+        for m in range(CACHE_MIN, CACHE_MIN + 5):
+            cache.factorial(m)
+        assert cache.bits <= cache.max_bits
+        assert len(cache) == 2
+        assert cache.factorial(CACHE_MIN + 4) == math.factorial(CACHE_MIN + 4)
+        cache.clear()
+        assert (len(cache), cache.bits, cache.hits) == (0, 0, 0)
+
+    def test_negative_values(self):
+        """Negative integers are refused"""
+        with pytest.raises(ValueError):
+            factorial(-1)
+        with pytest.raises(ValueError):
+            fact(-3)
+
+
+class TestGamma:
+    """Test non-integer factorials and the Gamma functions"""
+
+    def test_fact_of_non_integers(self):
+        """fact() uses Gamma(x + 1) instead of truncating"""
+        assert fact(5.0) == 120
+        assert isinstance(fact(5.0), int)
+        assert fact(0.5) == pytest.approx(math.sqrt(math.pi) / 2)
+        assert fact(-0.5) == pytest.approx(math.sqrt(math.pi))
+        assert evaluate('3.5!') == pytest.approx(11.631728396567448)
+
+    def test_log_factorial(self):
+        """The magnitude of huge factorials is available without computing them"""
+        assert log_factorial(10) == pytest.approx(math.log(math.factorial(10)))
+        assert log_factorial(10**9) == pytest.approx(19723265848.226654)
+        with pytest.raises(ValueError):
+            log_factorial(-2)
+
+    def test_expression_functions(self):
+        """gamma and lgamma are available in expressions"""
+        assert evaluate('gamma(5)') == pytest.approx(24)
+        assert evaluate('lgamma(101)') == pytest.approx(math.log(math.factorial(100)))
+        assert evaluate('gamma(0.5)^2') == pytest.approx(math.pi)
+
+    def test_backends(self):
+        """Decimal and fraction modes keep exact integer factorials"""
+        decimal = get_backend('decimal')
+        assert str(evaluate('fact(25)', backend=decimal)) == '15511210043330985984000000'
+        assert float(evaluate('fact(2.5)', backend=decimal)) == pytest.approx(3.32335097)
+        assert float(evaluate('gamma(2.5)', backend=decimal)) == pytest.approx(1.32934039)
+        assert evaluate('fact(4)', backend=get_backend('fraction')) == 24
+
+    def test_vectorized(self):
+        """Array evaluation matches the scalar functions"""
+        pytest.importorskip('numpy')
+        from calc_engine import evaluate_many
+
+        results = evaluate_many('fact(x)', x=[3, 0.5, -1, 200])
+        assert results[0] == 6
+        assert results[1] == pytest.approx(math.sqrt(math.pi) / 2)
+        assert math.isnan(results[2])
+        assert math.isinf(results[3])
+        results = evaluate_many('gamma(x)', x=[4, 0])
+        assert results[0] == pytest.approx(6)
+        assert math.isnan(results[1])
+
+
+class TestCalculatorFactorial:
+    """Test AdvancedCalculator's factorial and Gamma operations"""
+
+    def test_factorial(self):
+        """Whole numbers are exact and other values use Gamma"""
+        calc = AdvancedCalculator()
+        assert calc.factorial(5) == 120
+        assert calc.factorial(5.0) == 120
+        assert calc.factorial(3000) == math.factorial(3000)
+        assert calc.factorial(0.5) == pytest.approx(math.sqrt(math.pi) / 2)
+        with pytest.raises(ValueError):
+            calc.factorial(-1)
+
+    def test_gamma(self):
+        """gamma and lgamma reject their poles"""
+        calc = AdvancedCalculator()
+        assert calc.gamma(6) == pytest.approx(120)
+        assert calc.lgamma(6) == pytest.approx(math.log(120))
+        for pole in (0, -2):
+            with pytest.raises(ValueError):
+                calc.gamma(pole)
+            with pytest.raises(ValueError):
+                calc.lgamma(pole)
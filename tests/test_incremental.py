@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental re-parsing used by the GUI live preview
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ExpressionError, evaluate_node, parse, tokenize
+from calc_engine.incremental import IncrementalEvaluator
+
+
+def reference(text, degrees=True, variables=None):
+    """Evaluate from scratch, returning the exception type on failure"""
+    try:
+        return evaluate_node(parse(text), degrees, variables)
+    except Exception as e:
+        return type(e)
+
+
+def incremental(evaluator, text, degrees=True, variables=None, cursor=None):
+    """Update the incremental evaluator, returning the exception type on failure"""
+    try:
+        return evaluator.update(text, degrees, variables, cursor)
+    except Exception as e:
+        return type(e)
+
+
+class TestIncrementalEvaluator:
+    """Test incremental updates agree with evaluating from scratch"""
+
+    def test_typing_an_expression(self):
+        """Test typing character by character"""
+        evaluator = IncrementalEvaluator()
+        target = "sin(30) + sqrt(16)*|-2| + log(1000)"
+        for i in range(1, len(target) + 1):
+            text = target[:i]
+            assert incremental(evaluator, text, cursor=i) == reference(text)
+            assert evaluator.tokens == tokenize(text)[:-1]
+
+    def test_unchanged_groups_are_reused(self):
+        """Test groups away from the edit keep their parse and value"""
+        evaluator = IncrementalEvaluator()
+        evaluator.update("sin(30) + cos(60) + 1")
+        sin_node = evaluator.tree.left.left
+        assert evaluator.update("sin(30) + cos(60) + 12", cursor=22) == pytest.approx(13)
+        assert evaluator.reused == 2
+        assert evaluator.tree.left.left is sin_node
+        assert evaluator.rescanned <= 4
+
+    def test_edit_inside_group(self):
+        """Test editing inside one group re-parses it but keeps the others"""
+        evaluator = IncrementalEvaluator()
+        evaluator.update("sqrt(16) + sqrt(9)")
+        assert evaluator.update("sqrt(16) + sqrt(49)", cursor=17) == 11
+        assert evaluator.reused == 1
+
+    def test_number_merging(self):
+        """Test edits that merge tokens, such as completing an exponent"""
+        evaluator = IncrementalEvaluator()
+        for text in ["1.5", "1.5e", "1.5e-", "1.5e-3"]:
+            assert incremental(evaluator, text, cursor=len(text)) == reference(text)
+        assert evaluator.update("1.5e-3") == pytest.approx(0.0015)
+
+    def test_mode_and_variables_invalidate_values(self):
+        """Test cached values are dropped when the context changes"""
+        evaluator = IncrementalEvaluator()
+        assert evaluator.update("sin(x)", variables={"x": 90}) == pytest.approx(1)
+        assert evaluator.update("sin(x)", variables={"x": 30}) == pytest.approx(0.5)
+        assert evaluator.update("sin(x)", degrees=False, variables={"x": 0}) == 0
+
+    def test_errors_keep_state_usable(self):
+        """Test incomplete input raises and later edits still work"""
+        evaluator = IncrementalEvaluator()
+        with pytest.raises(ExpressionError):
+            evaluator.update("cos(60) + sin(")
+        assert evaluator.update("cos(60) + sin(30)") == pytest.approx(1)
+        with pytest.raises(ExpressionError):
+            evaluator.update("cos(60) + $")
+        assert evaluator.update("cos(60)") == pytest.approx(0.5)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_random_edits(self, seed):
+        """Test random insertions and deletions against full evaluation"""
+        rng = random.Random(seed)
+        pieces = ["sin(30)", "cos(x)", "|-3|", "log(100, 10)", "(1+2)", "√(4)", "2", "x"]
+        inserts = list("0123456789+-*/()|. ") + pieces
+        for _ in range(20):
+            evaluator = IncrementalEvaluator()
+            text = "+".join(rng.choice(pieces) for _ in range(6))
+            for _ in range(15):
+                pos = rng.randint(0, len(text))
+                if text and rng.random() < 0.3:
+                    start = max(pos - rng.randint(1, 3), 0)
+                    text, cursor = text[:start] + text[pos:], start
+                else:
+                    piece = rng.choice(inserts)
+                    text, cursor = text[:pos] + piece + text[pos:], pos + len(piece)
+                hint = cursor if rng.random() < 0.8 else None
+                expected = reference(text, variables={"x": 2})
+                actual = incremental(evaluator, text, variables={"x": 2}, cursor=hint)
+                if isinstance(expected, type) and isinstance(actual, type):
+                    continue
+                assert actual == expected, text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for memoization of calculator operations
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine.memo import Memoizer, OperationCache
+from calculator import DEFAULT_MEMOIZED, AdvancedCalculator
+
+
+class TestOperationCache:
+    """Test one operation's LRU cache"""
+
+    def test_hits_and_misses(self):
+        """Repeated arguments are served from the cache"""
+        calls = []
+
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        cache = OperationCache(square)
+        assert [cache(3), cache(3), cache(4)] == [9, 9, 16]
+        assert calls == [3, 4]
+        info = cache.info()
+        assert (info.hits, info.misses, info.size) == (1, 2, 2)
+
+    def test_keys_respect_types_and_defaults(self):
+        """Equal values of different types, and defaulted arguments, are handled"""
+        cache = OperationCache(lambda a, b=2: a**b)
+        assert cache(2) == 4
+        assert cache(2, 2) == 4
+        assert cache(2, b=2) == 4
+        assert cache.info().misses == 1
+        assert isinstance(cache(2.0), float)
+        assert math.copysign(1, cache(-0.0, 1)) == -1
+        assert math.copysign(1, cache(0.0, 1)) == 1
+
+    def test_entry_limit_evicts_oldest(self):
+        """Least recently used entries go first"""
+        cache = OperationCache(lambda x: x + 1, capacity=2)
+        cache(1)
+        cache(2)
+        cache(1)
+        cache(3)
+        assert cache.info().evictions == 1
+        cache(1)
+        assert cache.info().hits == 2
+
+    def test_byte_limit(self):
+        """Big integers count against the byte cap and oversized ones are skipped"""
+        cache = OperationCache(lambda n: 10**n, max_bytes=1000)
+        cache(5000)
+        cache(5000)
+        info = cache.info()
+        assert info.size == 0
+        assert info.oversized == 2
+        for n in range(0, 2400, 600):
+            cache(n)
+        info = cache.info()
+        assert info.bytes <= 1000
+        assert info.evictions > 0
+        cache.resize(max_bytes=0)
+        assert cache.info().bytes == 0
+        assert len(cache) == 0
+
+    def test_errors_are_not_cached(self):
+        """A failing call raises every time"""
+        calls = []
+
+        def fail(x):
+            calls.append(x)
+            raise ValueError('bad')
+
+        cache = OperationCache(fail)
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                cache(1)
+        assert calls == [1, 1]
+
+    def test_unhashable_arguments_bypass_cache(self):
+        """Arguments that cannot be keyed are passed straight through"""
+        cache = OperationCache(len)
+        assert cache([1, 2, 3]) == 3
+        assert len(cache) == 0
+
+    def test_clear(self):
+        """clear() empties the cache and its statistics"""
+        memo = Memoizer()
+        cache = memo.wrap('double', lambda x: 2 * x)
+        cache(1)
+        cache(1)
+        memo.clear()
+        assert memo.info()['double'].hits == 0
+        assert len(cache) == 0
+
+
+class TestCalculatorMemoization:
+    """Test memoization of AdvancedCalculator operations"""
+
+    def test_opt_in(self):
+        """Nothing is memoized unless asked"""
+        calc = AdvancedCalculator()
+        assert calc.memo is None
+        memo = calc.memoize()
+        assert set(memo.info()) == set(DEFAULT_MEMOIZED)
+        assert calc.factorial(20) == math.factorial(20)
+        assert calc.factorial(20) == math.factorial(20)
+        assert memo.info()['factorial'].hits == 1
+        assert calc.log(8, 2) == pytest.approx(3)
+        assert calc.power(2, 100) == 2**100
+
+    def test_angle_modes_are_separate(self):
+        """Degree and radian results never mix"""
+        calc = AdvancedCalculator()
+        calc.memoize(['sin', 'asin'])
+        degrees = calc.sin(30)
+        radians = calc.sin(30, degrees=False)
+        assert degrees == pytest.approx(0.5)
+        assert radians == pytest.approx(math.sin(30))
+        assert calc.sin(30, True) == degrees
+        assert calc.sin(30, False) == radians
+        assert calc.asin(0.5) == pytest.approx(30)
+        assert calc.asin(0.5, degrees=False) == pytest.approx(math.pi / 6)
+
+    def test_validation_still_applies(self):
+        """Invalid arguments raise as before"""
+        calc = AdvancedCalculator()
+        calc.memoize()
+        with pytest.raises(ValueError):
+            calc.factorial(-1)
+        with pytest.raises(ValueError):
+            calc.log(8, 1)
+
+    def test_unmemoize(self):
+        """unmemoize() restores the plain methods"""
+        calc = AdvancedCalculator()
+        calc.memoize(['power'])
+        calc.unmemoize()
+        assert calc.memo is None
+        assert 'power' not in vars(calc)
+        assert calc.power(2, 3) == 8
+
+    def test_rejects_impure_operations(self):
+        """Operations with side effects cannot be memoized"""
+        calc = AdvancedCalculator()
+        with pytest.raises(ValueError):
+            calc.memoize(['store_memory'])
+        assert calc.memo is None
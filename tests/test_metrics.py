@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics registry and its Prometheus export
+"""
+
+import math
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import metrics
+from calc_engine.errors import EvaluationTimeout, ExpressionError, MemoryLimitExceeded
+from calc_engine.metrics import (
+    EvaluationMetrics,
+    MetricsExport,
+    MetricsRegistry,
+    error_label,
+)
+from calc_engine.profiling import EvaluationProfile
+from calculator import AdvancedCalculator, evaluate_expression
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+class TestCounter:
+    """Test counters and gauges"""
+
+    def test_inc(self, registry):
+        """Test counting without labels"""
+        counter = registry.counter('requests_total', 'Requests')
+        counter.inc()
+        counter.inc(2)
+        assert counter.get() == 3
+
+    def test_labels(self, registry):
+        """Test separate series per label value"""
+        counter = registry.counter('errors_total', 'Errors', ('type',))
+        counter.labels('ValueError').inc()
+        counter.labels('ValueError').inc()
+        counter.labels('OverflowError').inc()
+        assert counter.get('ValueError') == 2
+        assert counter.get('OverflowError') == 1
+
+    def test_wrong_label_count(self, registry):
+        """Test that label values must match the label names"""
+        counter = registry.counter('errors_total', 'Errors', ('type',))
+        with pytest.raises(ValueError):
+            counter.labels('a', 'b')
+
+    def test_threads(self, registry):
+        """Test that no increments are lost across threads"""
+        counter = registry.counter('hits_total', 'Hits')
+
+        def work():
+            for _ in range(10000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.get() == 80000
+
+    def test_gauge(self, registry):
+        """Test setting and adjusting a gauge"""
+        gauge = registry.gauge('queue_depth', 'Queued requests')
+        gauge.set(5)
+        gauge.inc(-2)
+        assert gauge.get() == 3
+
+    def test_function(self, registry):
+        """Test a metric read from a function when collected"""
+        values = [1]
+        gauge = registry.gauge('size', 'Size', function=lambda: values[0])
+        values[0] = 7
+        assert gauge.get() == 7
+        assert 'size 7\n' in registry.exposition()
+
+    def test_same_metric_returned(self, registry):
+        """Test that registering a name twice gives the same metric"""
+        assert registry.counter('a_total', 'A') is registry.counter('a_total', 'A')
+        with pytest.raises(ValueError):
+            registry.gauge('a_total', 'A')
+
+
+class TestHistogram:
+    """Test fixed-bucket histograms"""
+
+    def test_buckets(self, registry):
+        """Test that observations land in the right buckets"""
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        counts, total, count = histogram.labels().snapshot()
+        assert counts == [2, 1, 1]
+        assert total == pytest.approx(2.65)
+        assert count == 4
+
+    def test_quantile(self, registry):
+        """Test quantile estimates interpolate within a bucket"""
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(1.0, 2.0))
+        for _ in range(10):
+            histogram.observe(1.5)
+        assert histogram.quantile(0.5) == pytest.approx(1.5)
+        assert histogram.quantile(1.0) == pytest.approx(2.0)
+
+    def test_quantile_empty(self, registry):
+        """Test that an empty histogram has no quantiles"""
+        histogram = registry.histogram('latency_seconds', 'Latency')
+        assert math.isnan(histogram.quantile(0.99))
+
+    def test_quantile_overflow(self, registry):
+        """Test observations above every bucket"""
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(1.0,))
+        histogram.observe(10.0)
+        assert histogram.quantile(0.5) == 1.0
+
+    def test_threads(self, registry):
+        """Test that no observations are lost across threads"""
+        histogram = registry.histogram('latency_seconds', 'Latency')
+        threads = [
+            threading.Thread(target=lambda: [histogram.observe(0.001) for _ in range(5000)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert histogram.labels().snapshot()[2] == 20000
+
+
+class TestExposition:
+    """Test the Prometheus text format"""
+
+    def test_counter(self, registry):
+        """Test HELP, TYPE and sample lines"""
+        registry.counter('errors_total', 'Errors', ('type',)).labels('ValueError').inc()
+        assert registry.exposition() == (
+            '# HELP errors_total Errors\n'
+            '# TYPE errors_total counter\n'
+            'errors_total{type="ValueError"} 1\n'
+        )
+
+    def test_histogram(self, registry):
+        """Test cumulative buckets, sum and count"""
+        histogram = registry.histogram('t_seconds', 'T', ('frontend',), buckets=(0.5,))
+        histogram.labels('gui').observe(0.25)
+        histogram.labels('gui').observe(1.0)
+        lines = registry.exposition().splitlines()
+        assert lines[2:] == [
+            't_seconds_bucket{frontend="gui",le="0.5"} 1',
+            't_seconds_bucket{frontend="gui",le="+Inf"} 2',
+            't_seconds_sum{frontend="gui"} 1.25',
+            't_seconds_count{frontend="gui"} 2',
+        ]
+
+    def test_escaping(self, registry):
+        """Test escaping of label values"""
+        counter = registry.counter('x_total', 'X', ('text',))
+        counter.labels('a "b"\\\n').inc()
+        assert 'x_total{text="a \\"b\\"\\\\\\n"} 1' in registry.exposition()
+
+    def test_write(self, registry, tmp_path):
+        """Test writing the exposition to a file"""
+        registry.counter('x_total', 'X').inc()
+        path = tmp_path / 'calc.prom'
+        registry.write(str(path))
+        assert path.read_text() == registry.exposition()
+        assert os.listdir(tmp_path) == ['calc.prom']
+
+
+class TestExport:
+    """Test exporting over HTTP and to a file"""
+
+    def test_http(self, registry):
+        """Test scraping the metrics endpoint"""
+        registry.counter('x_total', 'X').inc(4)
+        export = MetricsExport(port=0, registry=registry)
+        try:
+            url = f'http://127.0.0.1:{export.server.server_port}/metrics'
+            with urllib.request.urlopen(url) as response:
+                assert response.headers['Content-Type'].startswith('text/plain')
+                assert 'x_total 4' in response.read().decode()
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f'http://127.0.0.1:{export.server.server_port}/')
+        finally:
+            export.close()
+
+    def test_file(self, registry, tmp_path):
+        """Test that the file is written at start and on close"""
+        counter = registry.counter('x_total', 'X')
+        path = tmp_path / 'calc.prom'
+        export = MetricsExport(path=str(path), registry=registry)
+        assert 'x_total 0' in path.read_text()
+        counter.inc()
+        export.close()
+        assert 'x_total 1' in path.read_text()
+
+    def test_environment(self, registry, tmp_path, monkeypatch):
+        """Test configuration through environment variables"""
+        path = tmp_path / 'calc.prom'
+        monkeypatch.setenv('CALC_METRICS_FILE', str(path))
+        monkeypatch.delenv('CALC_METRICS_PORT', raising=False)
+        export = MetricsExport(registry=registry)
+        assert export.server is None
+        export.close()
+        assert path.exists()
+
+    def test_nothing_configured(self, monkeypatch):
+        """Test that nothing is exported by default"""
+        monkeypatch.delenv('CALC_METRICS_PORT', raising=False)
+        monkeypatch.delenv('CALC_METRICS_FILE', raising=False)
+        export = MetricsExport()
+        assert export.server is None and export.writer is None
+        export.close()
+
+
+class TestEvaluationMetrics:
+    """Test the engine's evaluation metrics"""
+
+    def test_error_labels(self):
+        """Test errors are labelled as calculate_result catches them"""
+        assert error_label(ZeroDivisionError()) == 'ZeroDivisionError'
+        assert error_label(OverflowError()) == 'OverflowError'
+        assert error_label(ExpressionError('bad')) == 'ValueError'
+        assert error_label(EvaluationTimeout('slow')) == 'EvaluationTimeout'
+        assert error_label(MemoryLimitExceeded('big')) == 'ResourceLimitError'
+        assert error_label(KeyError('x')) == 'KeyError'
+
+    def test_record(self):
+        """Test recording evaluations, errors and stage times"""
+        recorder = EvaluationMetrics('test-record')
+        profile = EvaluationProfile()
+        profile.add('parse', 1e-4)
+        parses = metrics.STAGE_SECONDS.labels('parse').snapshot()[2]
+        recorder.record(2e-5, profile=profile)
+        recorder.record(3e-5, error=ZeroDivisionError())
+        assert metrics.EVALUATIONS.get('test-record') == 2
+        assert metrics.EVALUATION_ERRORS.get('test-record', 'ZeroDivisionError') == 1
+        assert metrics.STAGE_SECONDS.labels('parse').snapshot()[2] == parses + 1
+
+    def test_console(self):
+        """Test that the console calculator records its evaluations"""
+        before = metrics.EVALUATIONS.get('console')
+        errors = metrics.EVALUATION_ERRORS.get('console', 'ZeroDivisionError')
+        calc = AdvancedCalculator()
+        evaluate_expression('1 + 1', calc)
+        with pytest.raises(ValueError):
+            evaluate_expression('1/0', calc)
+        assert metrics.EVALUATIONS.get('console') == before + 2
+        assert metrics.EVALUATION_ERRORS.get('console', 'ZeroDivisionError') == errors + 1
+
+    def test_cache_metrics(self):
+        """Test that cache statistics are exported"""
+        text = metrics.REGISTRY.exposition()
+        for name in ('calc_cache_hits_total', 'calc_cache_misses_total',
+                     'calc_cache_hit_ratio', 'calc_cache_entries'):
+            assert f'# TYPE {name} ' in text
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the constant folding and common-subexpression optimizer
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import compile_expression, compile_function, evaluate_node, optimize, parse
+from calc_engine.nodes import BinOp, Name, Number
+
+
+class TestConstantFolding:
+    """Test folding of subtrees without variables"""
+
+    def test_folds_constant_subtree(self):
+        """Test sin(30)*2^10 becomes a single literal"""
+        tree, shared, stats = optimize(parse("sin(30)*2^10"), degrees=True)
+        assert tree == Number(math.sin(math.radians(30)) * 2 ** 10)
+        assert (stats.nodes_before, stats.nodes_after) == (6, 1)
+
+    def test_folds_named_constants(self):
+        """Test pi and e are folded alongside variables"""
+        tree, _, _ = optimize(parse("2pi*x"), degrees=False)
+        assert tree == BinOp('*', Number(2 * math.pi), Name('x'))
+
+    def test_keeps_failing_subtree(self):
+        """Test 1/0 is not folded so the error happens at run time"""
+        compiled = compile_expression("x + 1/0")
+        with pytest.raises(ZeroDivisionError):
+            compiled.evaluate(x=1)
+
+    def test_int_and_float_literals_differ(self):
+        """Test folding keeps integer results exact"""
+        tree, _, _ = optimize(parse("2^70"), degrees=False)
+        assert tree.value == 2 ** 70
+
+
+class TestCommonSubexpressions:
+    """Test repeated subexpressions are computed once"""
+
+    def test_shared_subexpression(self):
+        """Test sqrt(x+1) is reused through a temporary"""
+        compiled = compile_expression("sqrt(x+1)/(1+sqrt(x+1))")
+        assert compiled.source.count("F_sqrt") == 1
+        assert compiled.stats.shared == 1
+        assert compiled.stats.nodes_after < compiled.stats.nodes_before
+        assert compiled.evaluate(x=3) == pytest.approx(2 / 3)
+
+    def test_degree_conversion_shared(self):
+        """Test the degree conversion of x is computed once for sin and cos"""
+        compiled = compile_function("sin(x)^2 + cos(x)^2", params=["x"])
+        assert compiled.source.count("0.017453292519943295") == 1
+        assert compiled(37) == pytest.approx(1)
+
+    @pytest.mark.parametrize("expression", [
+        "sin(x)*sqrt(x)+ln(x)",
+        "asin(x/2) + acos(x/2) + atan(x)",
+        "(x+1)^2 - (x+1)^2 + |x - 3| + |x - 3|",
+        "fact(3) x + log(x, 2) + log(x, 2)^2",
+    ])
+    @pytest.mark.parametrize("degrees", [True, False])
+    def test_matches_unoptimized(self, expression, degrees):
+        """Test optimized results equal the unoptimized tree walker"""
+        compiled = compile_expression(expression, degrees)
+        for x in (0.25, 1.0, 1.5):
+            expected = evaluate_node(parse(expression), degrees, {"x": x})
+            assert compiled.evaluate(x=x) == pytest.approx(expected, rel=1e-15)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for saving and loading compiled expressions
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import EvaluationProfile, ExpressionCache, FractionBackend
+from calc_engine import default_cache, persist
+from calc_engine.cache import CacheFile
+from calc_engine.sandbox import SandboxPool
+from calculator import main
+
+EXPRESSIONS = ['sin(x) + cos(y)', 'sqrt(16) * x', '2^10', 'ln(x)/ln(2)']
+
+
+@pytest.fixture
+def saved(tmp_path):
+    """Path of a cache file holding EXPRESSIONS in degrees and radians"""
+    cache = ExpressionCache()
+    for text in EXPRESSIONS:
+        cache.get(text, True)
+        cache.get(text, False)
+    path = tmp_path / 'compiled.bin'
+    assert cache.save(str(path)) == 2 * len(EXPRESSIONS)
+    return path
+
+
+class TestPersistentCache:
+    """Test the on-disk compile cache"""
+
+    def test_round_trip(self, saved):
+        """Loaded entries are cache hits and evaluate like fresh ones"""
+        cache = ExpressionCache()
+        assert cache.load(str(saved)) == 2 * len(EXPRESSIONS)
+        for text in EXPRESSIONS:
+            for degrees in (True, False):
+                loaded = cache.get(text, degrees)
+                fresh = ExpressionCache().get(text, degrees)
+                assert loaded.source == fresh.source
+                assert loaded.evaluate(x=3, y=4) == fresh.evaluate(x=3, y=4)
+        assert cache.info().misses == 0
+
+    def test_tree_is_rebuilt_on_demand(self, saved):
+        """Loaded entries re-derive their tree only when asked"""
+        cache = ExpressionCache()
+        cache.load(str(saved))
+        assert cache.get('sqrt(16) * x').tree == ExpressionCache().get('sqrt(16) * x').tree
+
+    def test_missing_file(self, tmp_path):
+        """A missing file loads nothing"""
+        assert ExpressionCache().load(str(tmp_path / 'missing.bin')) == 0
+
+    def test_corrupt_file_is_ignored(self, saved):
+        """A file failing its checksum loads nothing"""
+        data = bytearray(saved.read_bytes())
+        data[-5] ^= 0xFF
+        saved.write_bytes(bytes(data))
+        cache = ExpressionCache()
+        assert cache.load(str(saved)) == 0
+        assert cache.get('2^10').evaluate() == 1024
+
+    def test_truncated_file_is_ignored(self, saved):
+        """A truncated file loads nothing"""
+        saved.write_bytes(saved.read_bytes()[:10])
+        assert ExpressionCache().load(str(saved)) == 0
+
+    def test_other_engine_version_is_ignored(self, saved, monkeypatch):
+        """Code saved by another engine version is not reused"""
+        monkeypatch.setattr(persist, 'ENGINE_VERSION', 'other')
+        assert ExpressionCache().load(str(saved)) == 0
+
+    def test_other_python_is_ignored(self, saved, monkeypatch):
+        """Code saved by another Python version is not reused"""
+        monkeypatch.setattr(persist.importlib.util, 'MAGIC_NUMBER', b'\0\0\r\n')
+        assert ExpressionCache().load(str(saved)) == 0
+
+    def test_only_float_entries_are_saved(self, tmp_path):
+        """Entries of other backends are compiled afresh instead"""
+        cache = ExpressionCache()
+        cache.get('1/3', backend=FractionBackend())
+        cache.get('1/3')
+        assert cache.save(str(tmp_path / 'compiled.bin')) == 1
+
+    def test_capacity_is_respected(self, saved):
+        """Loading into a small cache keeps the most recently used entries"""
+        cache = ExpressionCache(capacity=3)
+        cache.load(str(saved))
+        assert len(cache) == 3
+        assert ('ln(x)/ln(2)', False) in cache
+
+    def test_save_replaces_atomically(self, saved):
+        """Saving again leaves no temporary files behind"""
+        ExpressionCache().save(str(saved))
+        assert os.listdir(saved.parent) == [saved.name]
+        assert ExpressionCache().load(str(saved)) == 0
+
+
+class TestCacheFile:
+    """Test loading and saving the cache file a front end is started with"""
+
+    def test_environment_variable(self, saved, monkeypatch):
+        """The file defaults to CALC_CACHE_FILE and is saved back on close"""
+        monkeypatch.setenv('CALC_CACHE_FILE', str(saved))
+        cache = ExpressionCache()
+        cache_file = CacheFile(cache=cache)
+        assert cache_file.loaded == 2 * len(EXPRESSIONS)
+        cache.get('x + 1')
+        assert cache_file.close() == 2 * len(EXPRESSIONS) + 1
+        assert ExpressionCache().load(str(saved)) == 2 * len(EXPRESSIONS) + 1
+
+    def test_no_file(self, monkeypatch):
+        """Without a path or CALC_CACHE_FILE nothing is loaded or saved"""
+        monkeypatch.delenv('CALC_CACHE_FILE', raising=False)
+        cache_file = CacheFile(cache=ExpressionCache())
+        assert cache_file.path is None
+        assert cache_file.close() == 0
+
+    def test_unwritable_file(self, tmp_path):
+        """A file that cannot be written is skipped"""
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        cache = ExpressionCache()
+        cache.get('x + 1')
+        assert CacheFile(str(blocker / 'compiled.bin'), cache).close() == 0
+
+    def test_console_batch(self, tmp_path):
+        """A second --batch run compiles nothing it compiled the first time"""
+        source = tmp_path / 'input.txt'
+        source.write_text('sin(30) + 1\n2^10\n' * 2)
+        options = [
+            '--batch', str(source), '--workers', '1',
+            '-o', str(tmp_path / 'output.txt'),
+            '--cache-file', str(tmp_path / 'compiled.bin'),
+        ]
+        default_cache.clear()
+        assert main(options) == 0
+        assert default_cache.info().misses == 2
+        default_cache.clear()
+        assert main(options) == 0
+        assert default_cache.info().misses == 0
+        assert default_cache.info().hits == 4
+
+    def test_sandbox_workers_load_the_file(self, saved):
+        """Sandbox workers start with the saved entries"""
+        with SandboxPool(cache_file=str(saved)) as pool:
+            profile = EvaluationProfile('sqrt(16) * x')
+            assert pool.evaluate('sqrt(16) * x', variables={'x': 2}, profile=profile) == 8
+        assert 'compile' not in profile.stages
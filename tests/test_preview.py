@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the background live-preview worker
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ExpressionError
+from calc_engine.incremental import IncrementalEvaluator
+from calc_engine.preview import PreviewWorker
+
+
+def wait_for_result(worker, timeout=5.0):
+    """Poll the worker like the GUI does until a result arrives"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = worker.poll()
+        if result is not None:
+            return result
+        time.sleep(0.005)
+    pytest.fail("No preview result")
+
+
+@pytest.fixture
+def worker():
+    """A worker with a short debounce delay"""
+    worker = PreviewWorker(delay=0.01)
+    yield worker
+    worker.close()
+
+
+class TestPreviewWorker:
+    """Test debouncing, latest-wins and error reporting"""
+
+    def test_evaluates_in_background(self, worker):
+        """Test a submitted expression is evaluated"""
+        generation = worker.submit("sin(30) + 1")
+        result = wait_for_result(worker)
+        assert result.generation == generation
+        assert result.value == pytest.approx(1.5)
+        assert result.error is None
+
+    def test_latest_request_wins(self, worker):
+        """Test rapid submits only produce the result of the last one"""
+        worker.delay = 0.05
+        for text in ["1", "12", "123", "1234"]:
+            generation = worker.submit(text, cursor=len(text))
+        result = wait_for_result(worker)
+        assert (result.generation, result.value) == (generation, 1234)
+        time.sleep(0.1)
+        assert worker.poll() is None
+
+    def test_cancel(self, worker):
+        """Test cancel drops the pending request"""
+        worker.delay = 0.05
+        worker.submit("2 + 2")
+        worker.cancel()
+        time.sleep(0.15)
+        assert worker.poll() is None
+        assert not worker.busy
+
+    def test_errors_are_reported(self, worker):
+        """Test incomplete expressions come back as errors, not exceptions"""
+        worker.submit("sqrt(")
+        result = wait_for_result(worker)
+        assert isinstance(result.error, ExpressionError)
+
+    def test_huge_results_fail_fast(self, worker):
+        """Test 9^9^9 and fact(10^7) are refused instead of computed"""
+        for text in ["9^9^9", "fact(10^7)"]:
+            start = time.monotonic()
+            worker.submit(text)
+            result = wait_for_result(worker)
+            assert isinstance(result.error, OverflowError)
+            assert time.monotonic() - start < 1
+
+
+class TestBoundedEvaluation:
+    """Test the size limits used for previews"""
+
+    def test_limits_only_large_results(self):
+        """Test results under the limit are still exact"""
+        evaluator = IncrementalEvaluator(max_bits=64)
+        assert evaluator.update("2^63") == 2 ** 63
+        assert evaluator.update("fact(20)") == 2432902008176640000
+        with pytest.raises(OverflowError):
+            evaluator.update("2^200")
+        with pytest.raises(OverflowError):
+            evaluator.update("fact(30)")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
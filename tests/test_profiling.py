@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for per-stage timing of evaluations
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ExpressionCache, evaluate, get_backend
+from calc_engine.profiling import EvaluationProfile, STAGES, format_duration
+from calc_engine.session import EvaluationSession
+from calculator import AdvancedCalculator, evaluate_expression
+
+COMPILE_STAGES = {'lookup', 'tokenize', 'parse', 'optimize', 'compile', 'execute'}
+
+
+class TestEvaluationProfile:
+    """Test recording stage timings"""
+
+    def test_miss_records_every_stage(self):
+        """Test that a cache miss times the whole pipeline"""
+        profile = EvaluationProfile('sin(30) + x')
+        result = evaluate('sin(30) + x', cache=ExpressionCache(), variables={'x': 1},
+                          profile=profile)
+        assert result == pytest.approx(1.5)
+        assert set(profile.stages) == COMPILE_STAGES
+        assert all(seconds >= 0 for seconds in profile.stages.values())
+        assert not profile.cached
+
+    def test_hit_skips_compilation(self):
+        """Test that a cache hit only looks up and executes"""
+        cache = ExpressionCache()
+        evaluate('2^10', cache=cache)
+        profile = EvaluationProfile()
+        assert evaluate('2^10', cache=cache, profile=profile) == 1024
+        assert set(profile.stages) == {'lookup', 'execute'}
+        assert profile.cached
+
+    def test_without_profile(self):
+        """Test that evaluation is unchanged without a profile"""
+        assert evaluate('1 + 2') == 3
+
+    def test_error_still_times_execution(self):
+        """Test that a failing evaluation records the stages it ran"""
+        profile = EvaluationProfile()
+        with pytest.raises(ZeroDivisionError):
+            evaluate('1/0', cache=ExpressionCache(), profile=profile)
+        assert 'execute' in profile.stages
+
+    def test_parse_error(self):
+        """Test that a syntax error leaves a partial profile"""
+        profile = EvaluationProfile()
+        with pytest.raises(ValueError):
+            evaluate('2 +', cache=ExpressionCache(), profile=profile)
+        assert 'compile' not in profile.stages
+
+    def test_other_backend(self):
+        """Test profiling with a non-float backend"""
+        profile = EvaluationProfile()
+        evaluate('1/3', cache=ExpressionCache(), backend=get_backend('fraction'),
+                 profile=profile)
+        assert set(profile.stages) == COMPILE_STAGES
+
+    def test_summary(self):
+        """Test the one-line summary lists stages in pipeline order"""
+        profile = EvaluationProfile()
+        profile.add('execute', 2e-6)
+        profile.add('lookup', 1e-6)
+        profile.add('execute', 1e-6)
+        assert profile.get('execute') == pytest.approx(3e-6)
+        assert profile.get('parse') is None
+        assert profile.summary() == 'lookup 1.0 µs, execute 3.0 µs, total 4.0 µs (cached)'
+
+    def test_stage_order(self):
+        """Test the canonical stage order"""
+        assert STAGES[:6] == ('lookup', 'tokenize', 'parse', 'optimize', 'compile', 'execute')
+
+    def test_format_duration(self):
+        """Test duration units"""
+        assert format_duration(2.5) == '2.50 s'
+        assert format_duration(0.0125) == '12.50 ms'
+        assert format_duration(3e-6) == '3.0 µs'
+
+
+class TestFrontEnds:
+    """Test that the console and GUI evaluation paths expose timings"""
+
+    def test_console(self):
+        """Test the console calculator's profiling switch"""
+        calc = AdvancedCalculator()
+        evaluate_expression('1 + 1', calc)
+        assert calc.last_profile is None
+        calc.profiling = True
+        assert evaluate_expression('y = 2 + 2', calc) == 4
+        assert calc.last_profile.text == '2 + 2'
+        assert 'format' in calc.last_profile.stages
+
+    def test_session_in_process(self):
+        """Test a session evaluating in this process"""
+        session = EvaluationSession(sandboxed=False)
+        profile = EvaluationProfile()
+        assert session.evaluate('3 * 3', profile=profile) == 9
+        assert 'execute' in profile.stages
+
+    def test_session_sandboxed(self):
+        """Test that worker timings come back with the result"""
+        session = EvaluationSession(sandboxed=True)
+        try:
+            profile = EvaluationProfile()
+            assert session.evaluate('x^2', True, {'x': 4}, profile) == 16
+            assert {'execute', 'transfer'} <= set(profile.stages)
+            assert profile.get('transfer') >= 0
+            assert session.evaluate('x^2', True, {'x': 5}) == 25
+        finally:
+            session.close()
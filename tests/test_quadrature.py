@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Tests for adaptive numerical integration
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import (
+    ConvergenceError,
+    ExpressionError,
+    compile_expression,
+    evaluate,
+    evaluate_many,
+    evaluate_node,
+    get_backend,
+    parse,
+)
+from calc_engine.autodiff import derivative
+from calc_engine.incremental import IncrementalEvaluator
+from calc_engine.quadrature import integrate, quadrature
+from calculator import AdvancedCalculator
+
+SQRT_PI = math.sqrt(math.pi)
+
+
+class TestQuadrature:
+    """Test the adaptive Gauss-Kronrod rule"""
+
+    def test_polynomials_are_exact(self):
+        """One panel integrates polynomials up to degree 22 exactly"""
+        result = quadrature(lambda x: x**10 - 3 * x, 0, 2)
+        assert result.value == pytest.approx(2**11 / 11 - 6, rel=1e-14)
+        assert (result.evaluations, result.panels, result.converged) == (15, 1, True)
+
+    def test_adapts_to_difficult_integrands(self):
+        """Panels are bisected until the error estimate meets the tolerance"""
+        result = quadrature(math.sqrt, 0, 1)
+        assert result.value == pytest.approx(2 / 3, abs=1e-10)
+        assert result.panels > 1
+        assert result.evaluations == 15 * (2 * result.panels - 1)
+        assert result.error <= 1e-10
+
+    def test_reversed_and_empty_ranges(self):
+        """Swapping the limits negates the integral"""
+        assert quadrature(math.exp, 1, 0).value == pytest.approx(1 - math.e)
+        assert quadrature(math.exp, 2, 2) == (0.0, 0.0, 0, 0, True)
+
+    def test_evaluation_limit(self):
+        """Running out of evaluations gives converged=False, not an error"""
+        result = quadrature(lambda x: 1 / math.sqrt(x), 0, 1, max_evaluations=1000)
+        assert not result.converged
+        assert result.evaluations <= 1000
+        assert result.value == pytest.approx(2, rel=1e-3)
+
+    def test_tolerances(self):
+        """Looser tolerances cost fewer evaluations"""
+        tight = quadrature(math.sqrt, 0, 1)
+        loose = quadrature(math.sqrt, 0, 1, tolerance=1e-4, relative_tolerance=0)
+        assert loose.evaluations < tight.evaluations
+        assert loose.value == pytest.approx(2 / 3, abs=1e-4)
+        for options in (
+            {'tolerance': -1},
+            {'tolerance': 0, 'relative_tolerance': 0},
+            {'max_evaluations': 10},
+        ):
+            with pytest.raises(ValueError):
+                quadrature(math.sqrt, 0, 1, **options)
+
+    def test_invalid_limits_and_integrands(self):
+        """Infinite limits and undefined integrands are reported"""
+        with pytest.raises(ValueError):
+            quadrature(math.exp, 0, math.inf)
+        with pytest.raises(ValueError):
+            quadrature(lambda x: math.nan, 0, 1)
+
+
+class TestIntegrate:
+    """Test integrate() of expressions"""
+
+    def test_values(self):
+        """Integrals agree with their closed forms"""
+        result = integrate('exp(-x^2)', 'x', -6, 6, degrees=False)
+        assert result.value == pytest.approx(SQRT_PI, rel=1e-13)
+        assert result.converged
+        assert integrate('sin(x)', 'x', 0, 180).value == pytest.approx(360 / math.pi)
+
+    def test_parameters(self):
+        """Other names take the given values"""
+        result = integrate('exp(-k * t^2)', 't', -6, 6, degrees=False, k=4)
+        assert result.value == pytest.approx(SQRT_PI / 2)
+        assert integrate('k', 'x', 0, 3, k=2).value == pytest.approx(6)
+
+    def test_errors(self):
+        """Unknown names and constants as the variable are reported"""
+        with pytest.raises(ExpressionError):
+            integrate('x * y', 'x', 0, 1)
+        with pytest.raises(ExpressionError):
+            integrate('x', 'pi', 0, 1)
+        with pytest.raises(ValueError):
+            integrate('ln(x)', 'x', -1, 1)
+
+    def test_vectorized_rounds(self, monkeypatch):
+        """Each round evaluates the nodes of every new panel in one call"""
+        pytest.importorskip('numpy')
+        import calc_engine.vectorized as vectorized
+
+        calls = []
+        original = vectorized.evaluate_many
+
+        def counting(*args, **kwargs):
+            calls.append(len(kwargs['x']))
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(vectorized, 'evaluate_many', counting)
+        result = integrate('sin(1/x)', 'x', 0.001, 1, degrees=False)
+        assert result.value == pytest.approx(0.5040664978775, abs=1e-10)
+        assert sum(calls) == result.evaluations
+        assert len(calls) < result.panels / 10
+        assert all(n % 15 == 0 for n in calls)
+
+    def test_without_numpy(self, monkeypatch):
+        """Nodes are evaluated one at a time when NumPy is missing"""
+        import calc_engine.quadrature as quadrature_module
+
+        monkeypatch.setattr(quadrature_module, 'np', None)
+        result = quadrature_module.integrate('x^2 * a', 'x', 0, 3, a=2)
+        assert result.value == pytest.approx(18)
+
+
+class TestIntegrateInExpressions:
+    """Test integrate(body, variable, low, high) in the expression language"""
+
+    def test_parse(self):
+        """The second argument must be a variable name"""
+        for text in ('integrate(x, 2, 0, 1)', 'integrate(x, pi, 0, 1)', 'integrate(x, x, 0)'):
+            with pytest.raises(ExpressionError):
+                parse(text)
+
+    def test_evaluate(self):
+        """Integrals see the other variables, and nest"""
+        assert evaluate('integrate(x^2, x, 0, 3)') == pytest.approx(9)
+        assert evaluate('integrate(sin(x), x, 0, pi)', False) == pytest.approx(2)
+        assert evaluate('y + integrate(x*y, x, 0, 2)', variables={'y': 3}) == pytest.approx(9)
+        assert evaluate('integrate(integrate(x*t, t, 0, x), x, 0, 1)') == pytest.approx(1 / 8)
+
+    def test_bound_variable(self):
+        """The variable is local to the integral, even if also used outside"""
+        compiled = compile_expression('integrate(t^2, t, 0, 1)')
+        assert compiled.variables == ()
+        assert evaluate('x + integrate(x, x, 0, 2)', variables={'x': 10}) == pytest.approx(12)
+
+    def test_repeated_subexpressions(self):
+        """Subexpressions inside and outside a body are computed correctly"""
+        text = 'sin(y)*2 + integrate(sin(y)*2*x, x, 0, 1) + sin(y)*2'
+        value = 2 * math.sin(math.radians(30))
+        assert evaluate(text, variables={'y': 30}) == pytest.approx(2.5 * value)
+
+    def test_tree_walk_and_backends(self):
+        """The tree walker and other number types agree with compiled code"""
+        assert evaluate('integrate(x^2, x, 0, 1) * 3', backend=get_backend('decimal')) == pytest.approx(1)
+        assert evaluate('integrate(x^2, x, 0, 1) * 3', backend=get_backend('fraction')) == pytest.approx(1)
+        tree = parse('integrate(x*y, x, 0, 1)')
+        assert evaluate_node(tree, variables={'y': 4}) == pytest.approx(2)
+
+    def test_derivative(self):
+        """Derivatives follow the Leibniz rule, limits included"""
+        result = derivative('integrate(t*y, t, 0, x)', 'x', x=2, y=3)
+        assert (result.value, result.slope) == (pytest.approx(6), pytest.approx(6))
+        result = derivative('integrate(t*y, t, x, 2x)', 'y', x=2, y=3)
+        assert result.slope == pytest.approx(6)
+
+    def test_arrays(self):
+        """evaluate_many() evaluates integrals point by point"""
+        values = evaluate_many('integrate(t*y, t, 0, 1)', y=[1, 2, 3])
+        assert list(values) == pytest.approx([0.5, 1, 1.5])
+
+    def test_preview(self):
+        """Live previews do not reuse values from inside an integral"""
+        preview = IncrementalEvaluator()
+        assert preview.update('(x+1)', variables={'x': 5}) == 6
+        assert preview.update('integrate((x+1), x, 0, 2)', variables={'x': 5}) == pytest.approx(4)
+
+    def test_not_converging(self):
+        """Integrals that cannot meet the tolerance raise ConvergenceError"""
+        with pytest.raises(ConvergenceError):
+            evaluate('integrate(1/sqrt(x), x, 0, 1)')
+
+
+class TestCalculatorIntegrate:
+    """Test AdvancedCalculator.integrate()"""
+
+    def test_uses_calculator_variables(self):
+        """Calculator variables are parameters of the integrand"""
+        calc = AdvancedCalculator()
+        calc.set_variable('a', 2)
+        calc.set_variable('x', 100)
+        result = calc.integrate('a * x', 'x', 0, 3)
+        assert result.value == pytest.approx(9)
+        assert calc.variables['x'] == 100
+
+    def test_rejects_reserved_names(self):
+        """Constants and functions cannot be integrated over"""
+        for name in ('pi', 'integrate', 'ans'):
+            with pytest.raises(ValueError):
+                AdvancedCalculator().integrate('x', name, 0, 1)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for sandboxed evaluation with time and memory limits
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import (
+    EvaluationTimeout,
+    ExpressionError,
+    MemoryLimitExceeded,
+    ResourceLimitError,
+)
+from calc_engine.sandbox import SandboxPool, resource
+
+
+@pytest.fixture(scope='module')
+def pool():
+    """One warm pool shared by the tests"""
+    with SandboxPool(workers=2, timeout=1.0, memory_limit=256 * 1024 * 1024) as pool:
+        yield pool
+
+
+class TestSandboxPool:
+    """Test evaluation in worker processes"""
+
+    def test_evaluates_like_in_process(self, pool):
+        """Results match the in-process engine"""
+        assert pool.evaluate('2 + 3 * 4') == 14
+        assert pool.evaluate('sin(30)') == pytest.approx(0.5)
+        assert pool.evaluate('sin(pi/2)', degrees=False) == pytest.approx(1.0)
+        assert pool.evaluate('x^2 + y', variables={'x': 3, 'y': 1}) == 10
+        assert pool.evaluate('fact(25)') == 15511210043330985984000000
+
+    def test_math_errors_keep_their_type(self, pool):
+        """Ordinary errors are re-raised with their original type"""
+        with pytest.raises(ZeroDivisionError):
+            pool.evaluate('1/0')
+        with pytest.raises(ExpressionError):
+            pool.evaluate('2 +')
+        with pytest.raises(ValueError):
+            pool.evaluate('sqrt(-1)')
+
+    def test_timeout_replaces_worker(self, pool):
+        """A runaway evaluation is killed and the pool keeps working"""
+        replaced = pool.replaced
+        with pytest.raises(EvaluationTimeout):
+            pool.evaluate('9^9^9', timeout=0.3)
+        assert pool.replaced == replaced + 1
+        assert pool.evaluate('1 + 1') == 2
+
+    @pytest.mark.skipif(resource is None, reason='memory limits need the resource module')
+    def test_memory_limit(self, pool):
+        """An evaluation needing more memory than the budget is stopped"""
+        with pytest.raises(MemoryLimitExceeded):
+            pool.evaluate('2^(2^33)', timeout=10)
+        assert pool.evaluate('2^10') == 1024
+
+    def test_limit_errors_are_value_errors(self):
+        """Callers catching ValueError also handle exceeded limits"""
+        assert issubclass(EvaluationTimeout, ResourceLimitError)
+        assert issubclass(MemoryLimitExceeded, ResourceLimitError)
+        assert issubclass(ResourceLimitError, ValueError)
+
+    def test_closed_pool_rejects_work(self):
+        """A closed pool raises instead of hanging"""
+        pool = SandboxPool(workers=1)
+        pool.close()
+        with pytest.raises(RuntimeError):
+            pool.evaluate('1 + 1')
+
+    def test_needs_a_worker(self):
+        """A pool without workers is rejected"""
+        with pytest.raises(ValueError):
+            SandboxPool(workers=0)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Tests for the JSON evaluation server and request micro-batching
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import evaluate
+from calc_engine.microbatch import MicroBatcher
+from calc_server import CalculatorClient, CalculatorServer, RemoteError, encode_result
+
+
+def run_with_server(scenario, **options):
+    """Run scenario(server, port) against a server on a free localhost port"""
+
+    async def main():
+        server = CalculatorServer(**options)
+        listener = await server.start_tcp('127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            return await scenario(server, port)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+class TestMicroBatcher:
+    """Test coalescing of concurrent evaluations"""
+
+    def test_concurrent_calls_share_one_batch(self):
+        """Calls for the same expression become one vectorized evaluation"""
+        batcher = MicroBatcher()
+
+        async def main():
+            calls = [batcher.evaluate('x^2 + sin(x)', {'x': x}) for x in range(50)]
+            return await asyncio.gather(*calls)
+
+        results = asyncio.run(main())
+        assert batcher.batches == 1
+        assert batcher.batched == 50
+        for x, result in enumerate(results):
+            assert result == pytest.approx(evaluate('x^2 + sin(x)', variables={'x': x}))
+
+    def test_errors_match_scalar_evaluation(self):
+        """Points outside a domain raise as they would alone"""
+        batcher = MicroBatcher()
+
+        async def main():
+            calls = [batcher.evaluate('1/x', {'x': x}) for x in (2, 0, 4)]
+            return await asyncio.gather(*calls, return_exceptions=True)
+
+        half, error, quarter = asyncio.run(main())
+        assert half == 0.5
+        assert isinstance(error, ZeroDivisionError)
+        assert quarter == 0.25
+
+    def test_constant_and_invalid_expressions(self):
+        """Constant expressions are computed once and bad ones fail per call"""
+        batcher = MicroBatcher()
+
+        async def main():
+            constant = [batcher.evaluate('2 + 3') for _ in range(3)]
+            invalid = [batcher.evaluate('2 +') for _ in range(2)]
+            return await asyncio.gather(*constant, *invalid, return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert results[:3] == [5, 5, 5]
+        assert all(isinstance(error, Exception) for error in results[3:])
+        assert batcher.batches == 0
+
+    def test_max_batch_flushes_early(self):
+        """A full batch is evaluated without waiting for the window"""
+        batcher = MicroBatcher(window=60.0, max_batch=4)
+
+        async def main():
+            calls = [batcher.evaluate('x + 1', {'x': x}) for x in range(4)]
+            return await asyncio.wait_for(asyncio.gather(*calls), 5)
+
+        assert asyncio.run(main()) == [1, 2, 3, 4]
+
+    def test_rejects_empty_batches(self):
+        """max_batch must allow at least one call"""
+        with pytest.raises(ValueError):
+            MicroBatcher(max_batch=0)
+
+
+class TestEncoding:
+    """Test the JSON form of results"""
+
+    def test_encode_result(self):
+        """Non-finite floats and exact numbers become strings"""
+        from fractions import Fraction
+
+        assert encode_result(2.5) == 2.5
+        assert encode_result(120) == 120
+        assert encode_result(float('inf')) == 'inf'
+        assert encode_result(float('nan')) == 'nan'
+        assert encode_result(Fraction(1, 3)) == '1/3'
+        assert encode_result({'x': float('-inf')}) == {'x': '-inf'}
+
+
+class TestCalculatorServer:
+    """Test the server over localhost sockets"""
+
+    def test_evaluate_and_operations(self):
+        """Expressions and calculator methods are callable remotely"""
+
+        async def scenario(server, port):
+            client = await CalculatorClient.connect_tcp('127.0.0.1', port)
+            try:
+                assert await client.call('ping') == 'pong'
+                assert await client.evaluate('2 + 3 * 4') == 14
+                assert await client.evaluate('sin(30)') == pytest.approx(0.5)
+                assert await client.call('power', 2, 10) == 1024
+                assert await client.call('factorial', 5) == 120
+                assert await client.call('sin', 0.5, kwargs={'degrees': False}) == (
+                    pytest.approx(0.479425538604203)
+                )
+            finally:
+                await client.close()
+
+        run_with_server(scenario)
+
+    def test_sessions_are_per_connection(self):
+        """Memory, variables and ans belong to one connection"""
+
+        async def scenario(server, port):
+            first = await CalculatorClient.connect_tcp('127.0.0.1', port)
+            second = await CalculatorClient.connect_tcp('127.0.0.1', port)
+            try:
+                await first.evaluate('x = 6 * 7')
+                await first.call('store_memory', 9)
+                assert await first.evaluate('ans + x') == 84
+                assert await first.call('recall_memory') == 9
+                session = await first.call('session')
+                assert session['variables'] == {'x': 42}
+                assert session['last_result'] == 84
+                assert session['mode'] == 'float'
+
+                assert await second.call('recall_memory') == 0
+                assert await second.evaluate('ans') == 0
+                with pytest.raises(RemoteError) as error:
+                    await second.evaluate('x + 1')
+                assert error.value.type_name == 'ValueError'
+            finally:
+                await first.close()
+                await second.close()
+
+        run_with_server(scenario)
+
+    def test_pipelined_requests_answer_in_order(self):
+        """Requests sent before any reply are answered in order"""
+
+        async def scenario(server, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            requests = [
+                {'id': 1, 'op': 'evaluate', 'expression': '10'},
+                {'id': 2, 'op': 'evaluate', 'expression': 'ans * 2'},
+                {'id': 3, 'op': 'evaluate', 'expression': 'ans + 1'},
+                {'id': 4, 'op': 'nonsense'},
+                {'id': 5, 'op': 'evaluate', 'expression': 'ans'},
+            ]
+            writer.write(b''.join(json.dumps(r).encode() + b'\n' for r in requests))
+            await writer.drain()
+            replies = [json.loads(await reader.readline()) for _ in requests]
+            writer.close()
+            return replies
+
+        replies = run_with_server(scenario)
+        assert [reply['id'] for reply in replies] == [1, 2, 3, 4, 5]
+        assert [reply.get('result') for reply in replies] == [10, 20, 21, None, 21]
+        assert replies[3]['error']['type'] == 'ProtocolError'
+
+    def test_concurrent_connections_are_batched(self):
+        """Expressions from different connections share a vectorized call"""
+
+        async def scenario(server, port):
+            clients = [
+                await CalculatorClient.connect_tcp('127.0.0.1', port) for _ in range(8)
+            ]
+            try:
+                for x, client in enumerate(clients):
+                    await client.call('set_variable', 'x', x)
+                results = await asyncio.gather(
+                    *(client.evaluate('x^2 + 1') for client in clients)
+                )
+            finally:
+                for client in clients:
+                    await client.close()
+            return results, server.batcher.batched
+
+        results, batched = run_with_server(scenario, batch_window=0.05)
+        assert results == [x * x + 1 for x in range(8)]
+        assert batched == 8
+
+    def test_slow_request_does_not_block_others(self):
+        """Expensive requests are cut off without stalling other clients"""
+
+        async def scenario(server, port):
+            slow = await CalculatorClient.connect_tcp('127.0.0.1', port)
+            fast = await CalculatorClient.connect_tcp('127.0.0.1', port)
+            try:
+                # Idle workers are taken in turn, so this warms every one
+                for _ in range(len(server.sandbox._workers)):
+                    assert await fast.evaluate('0') == 0
+                    assert await fast.call('power', 2, 0) == 1
+                submitted = time.perf_counter()
+                tower = asyncio.ensure_future(slow.evaluate('9^9^9'))
+                huge = asyncio.ensure_future(slow.call('factorial', 10**8))
+                await asyncio.sleep(0.05)
+                started = time.perf_counter()
+                assert await fast.evaluate('1 + 1') == 2
+                assert await fast.call('power', 2, 10) == 1024
+                fast_time = time.perf_counter() - started
+                pending = not tower.done()
+                errors = await asyncio.gather(tower, huge, return_exceptions=True)
+                slow_time = time.perf_counter() - submitted
+                assert await slow.evaluate('2 + 2') == 4
+            finally:
+                await slow.close()
+                await fast.close()
+            return fast_time, slow_time, pending, errors
+
+        fast_time, slow_time, pending, errors = run_with_server(scenario, timeout=1.0)
+        assert pending
+        assert fast_time < slow_time / 4
+        for error in errors:
+            assert isinstance(error, RemoteError)
+            assert 'exceeded' in error.message
+
+    def test_errors_are_reported(self):
+        """Bad requests get error replies and the connection stays usable"""
+
+        async def scenario(server, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'not json\n[1, 2]\n{"id": 7, "op": "divide", "args": [1, 0]}\n')
+            replies = [json.loads(await reader.readline()) for _ in range(3)]
+            client = CalculatorClient(reader, writer)
+            try:
+                with pytest.raises(RemoteError) as error:
+                    await client.evaluate('1/0')
+                assert error.value.type_name == 'ValueError'
+                assert await client.evaluate('1 + 1') == 2
+            finally:
+                await client.close()
+            return replies
+
+        bad_json, not_object, divide = run_with_server(scenario)
+        assert bad_json['error']['type'] == 'ProtocolError'
+        assert not_object['error']['type'] == 'ProtocolError'
+        assert divide['id'] == 7
+        assert divide['error']['type'] == 'ValueError'
+
+    def test_overlong_request_closes_connection(self):
+        """A request over the line limit is refused"""
+        from calc_server import MAX_LINE
+
+        async def scenario(server, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'1' * (MAX_LINE + 10) + b'\n')
+            reply = json.loads(await reader.readline())
+            closed = await reader.read() == b''
+            writer.close()
+            return reply, closed
+
+        reply, closed = run_with_server(scenario)
+        assert reply['error']['type'] == 'ProtocolError'
+        assert closed
+
+    def test_non_finite_results_are_strings(self):
+        """Results JSON cannot represent are sent as strings"""
+
+        async def scenario(server, port):
+            client = await CalculatorClient.connect_tcp('127.0.0.1', port)
+            try:
+                return await client.evaluate('1e308 * 10')
+            finally:
+                await client.close()
+
+        assert run_with_server(scenario) == 'inf'
+
+    @pytest.mark.skipif(not hasattr(asyncio, 'start_unix_server'), reason='no Unix sockets')
+    def test_unix_socket(self, tmp_path):
+        """The same protocol works over a Unix socket"""
+        path = str(tmp_path / 'calc.sock')
+
+        async def main():
+            server = CalculatorServer()
+            await server.start_unix(path)
+            client = await CalculatorClient.connect_unix(path)
+            try:
+                await client.evaluate('y = 2^8')
+                return await client.evaluate('y + ans')
+            finally:
+                await client.close()
+                await server.close()
+
+        assert asyncio.run(main()) == 512
+
+    @pytest.mark.skipif(not hasattr(asyncio, 'start_unix_server'), reason='no Unix sockets')
+    def test_unix_socket_path_must_be_a_socket(self, tmp_path):
+        """A stale socket is replaced, but another file is never deleted"""
+        import socket
+
+        stale = tmp_path / 'stale.sock'
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.bind(str(stale))
+        regular = tmp_path / 'notes.txt'
+        regular.write_text('keep me')
+
+        async def main():
+            server = CalculatorServer(sandboxed=False)
+            try:
+                await server.start_unix(str(stale))
+                with pytest.raises(FileExistsError):
+                    await server.start_unix(str(regular))
+            finally:
+                await server.close()
+
+        asyncio.run(main())
+        assert regular.read_text() == 'keep me'
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests for the equation solver
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ConvergenceError, ExpressionError
+from calc_engine.solver import Equation, equation_text, find_bracket, solve, solve_many
+from calculator import AdvancedCalculator
+
+CUBIC_ROOT = 2.0945514815423265
+
+
+class TestSolve:
+    """Test solving one equation"""
+
+    @pytest.mark.parametrize('method', ['newton', 'brent'])
+    def test_cubic(self, method):
+        """Both methods find the root without a bracket or guess"""
+        root = solve('x^3 - 2x - 5', method=method)
+        assert root.x == pytest.approx(CUBIC_ROOT, abs=1e-12)
+        assert abs(root.residual) < 1e-10
+        assert root.method == method
+
+    @pytest.mark.parametrize('method', ['newton', 'brent'])
+    def test_bracket_and_equations(self, method):
+        """lhs = rhs is solved as lhs - rhs = 0 inside the bracket"""
+        root = solve('cos(x) = x', bracket=(0, 1), degrees=False, method=method)
+        assert root.x == pytest.approx(0.7390851332151607, abs=1e-12)
+        root = solve('sin(x) = 0.5', bracket=(100, 170), method=method)
+        assert root.x == pytest.approx(150)
+
+    def test_newton_uses_fewer_iterations(self):
+        """Exact slopes make the Newton hybrid converge quickly"""
+        newton = solve('exp(x) = 10', bracket=(0, 5))
+        brent = solve('exp(x) = 10', bracket=(0, 5), method='brent')
+        assert newton.x == pytest.approx(math.log(10))
+        assert newton.iterations <= brent.iterations
+
+    def test_parameters(self):
+        """Other names take the given values"""
+        assert solve('x^2 = a', a=2).x == pytest.approx(math.sqrt(2))
+        assert solve('t * k - 1', 't', k=4).x == pytest.approx(0.25)
+
+    def test_guess_selects_root(self):
+        """The bracket search starts at the guess"""
+        assert solve('x^2 - 4', guess=5).x == pytest.approx(2)
+        assert solve('x^2 - 4', guess=-5).x == pytest.approx(-2)
+        assert solve('ln(x) = 1').x == pytest.approx(math.e)
+
+    def test_root_without_sign_change(self):
+        """A double root is found by plain Newton's method"""
+        root = solve('(x - 3)^2', guess=1)
+        assert root.x == pytest.approx(3, abs=1e-6)
+        with pytest.raises(ConvergenceError):
+            solve('(x - 3)^2', guess=1, method='brent')
+
+    def test_newton_steps_back_into_the_domain(self):
+        """A step to where f is undefined is damped, not an error"""
+        assert solve('ln(x)', guess=5).x == pytest.approx(1)
+        assert solve('sqrt(x) - 0.5', guess=4, degrees=False).x == pytest.approx(0.25)
+
+    def test_undefined_start(self):
+        """Starting where f is undefined raises ConvergenceError"""
+        with pytest.raises(ConvergenceError):
+            solve('1/x')
+
+    def test_no_solution(self):
+        """Equations without real solutions raise ConvergenceError"""
+        with pytest.raises(ConvergenceError):
+            solve('x^2 + 1')
+
+    def test_limits(self):
+        """Tolerance and iteration limits are honoured and checked"""
+        coarse = solve('x^3 - 2x - 5', bracket=(0, 10), tolerance=1e-3)
+        assert coarse.x == pytest.approx(CUBIC_ROOT, abs=1e-3)
+        with pytest.raises(ConvergenceError):
+            solve('x^3 - 2x - 5', bracket=(0, 10), method='brent', max_iterations=2)
+        for options in ({'tolerance': 0}, {'max_iterations': 0}, {'method': 'secant'}):
+            with pytest.raises(ValueError):
+                solve('x - 1', **options)
+
+    def test_invalid_input(self):
+        """Bad brackets, names and equations are reported"""
+        with pytest.raises(ValueError):
+            solve('x^2 - 4', bracket=(-1, 1))
+        with pytest.raises(ExpressionError):
+            solve('x + y')
+        with pytest.raises(ExpressionError):
+            solve('y - 1')
+        with pytest.raises(ExpressionError):
+            equation_text('x = 1 = 2')
+
+    def test_find_bracket_skips_undefined_points(self):
+        """The search steps over points outside the domain"""
+        a, b, fa, fb = find_bracket(Equation('sqrt(x) - 3', degrees=False), guess=-1)
+        assert min(a, b) <= 9 <= max(a, b)
+        assert fa * fb <= 0
+
+
+class TestSolveMany:
+    """Test solving for many parameter values at once"""
+
+    def test_numpy(self):
+        """Every parameter value gets its own root"""
+        np = pytest.importorskip('numpy')
+        a = np.arange(1, 50)
+        roots = solve_many('x^2 - a', (0, 10), a=a)
+        assert roots == pytest.approx(np.sqrt(a), abs=1e-12)
+
+    def test_matches_scalar_solver(self):
+        """Vectorized and scalar roots agree"""
+        np = pytest.importorskip('numpy')
+        constants = np.linspace(-5, 5, 11)
+        roots = solve_many('x^3 - 2x - c', (-10, 10), c=constants)
+        for c, root in zip(constants, roots):
+            expected = solve('x^3 - 2x - c', bracket=(-10, 10), c=c).x
+            assert root == pytest.approx(expected)
+
+    def test_array_brackets_and_failures(self):
+        """Brackets may vary per point; points without a sign change give nan"""
+        np = pytest.importorskip('numpy')
+        roots = solve_many('sin(x) - 0.5', ([0, 100, 0], [90, 170, 10]))
+        assert roots[:2] == pytest.approx([30, 150])
+        assert np.isnan(roots[2])
+        assert np.isnan(solve_many('x^2 - a', (0, 10), a=[-1])[0])
+
+    def test_without_numpy(self, monkeypatch):
+        """Each point is solved in turn when NumPy is missing"""
+        import calc_engine.solver as solver
+
+        monkeypatch.setattr(solver, 'np', None)
+        roots = solver.solve_many('x^2 - a', (0, 10), a=[4, -1, 2])
+        assert roots[0] == pytest.approx(2)
+        assert math.isnan(roots[1])
+        assert roots[2] == pytest.approx(math.sqrt(2))
+        with pytest.raises(ExpressionError):
+            solver.solve_many('x^2 - b', (0, 10), a=[1])
+
+
+class TestCalculatorSolve:
+    """Test AdvancedCalculator.solve()"""
+
+    def test_uses_calculator_variables(self):
+        """Calculator variables are parameters of the equation"""
+        calc = AdvancedCalculator()
+        calc.set_variable('a', 9)
+        assert calc.solve('x^2 = a', guess=1).x == pytest.approx(3)
+        assert calc.solve('a * t = 3', 't').x == pytest.approx(1 / 3)
+
+    def test_rejects_reserved_names(self):
+        """Constants cannot be solved for"""
+        with pytest.raises(ValueError):
+            AdvancedCalculator().solve('pi - 1', 'pi')
+
+    @pytest.mark.parametrize('mode', ['decimal', 'fraction'])
+    def test_exact_modes(self, mode):
+        """Decimal and Fraction variables are parameters too"""
+        calc = AdvancedCalculator()
+        calc.set_backend(mode)
+        calc.set_variable('y', calc.backend.number(2.5))
+        assert calc.solve('x - y').x == pytest.approx(2.5)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests that heavy modules are only imported when first needed
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+import startup_time
+
+
+def loaded_after(statement):
+    """Modules loaded in a fresh interpreter after running statement"""
+    result = subprocess.run(
+        [sys.executable, '-c', f'import sys\n{statement}\nprint(*sys.modules)'],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    )
+    return set(result.stdout.split())
+
+
+class TestDeferredImports:
+    """Test that importing an entry point leaves heavy modules unloaded"""
+
+    @pytest.mark.parametrize('module', sorted(startup_time.DEFERRED))
+    def test_entry_point(self, module):
+        """Test each entry point against its list of deferred modules"""
+        loaded = loaded_after(f'import {module}')
+        assert module in loaded
+        assert not loaded & set(startup_time.DEFERRED[module])
+
+    def test_lazy_attributes(self):
+        """Test that lazy engine names load their module on first access"""
+        loaded = loaded_after(
+            'import calc_engine\n'
+            'assert calc_engine.DecimalBackend().name == "decimal"\n'
+            'assert "calc_engine.vectorized" not in sys.modules'
+        )
+        assert {'decimal', 'fractions', 'calc_engine.arbitrary'} <= loaded
+        assert 'numpy' not in loaded
+
+    def test_get_backend_imports_arbitrary(self):
+        """Test that asking for a non-float backend loads it"""
+        loaded = loaded_after(
+            'from calc_engine import get_backend\n'
+            'assert get_backend("fraction").name == "fraction"'
+        )
+        assert 'fractions' in loaded
+
+    def test_unknown_attribute(self):
+        """Test that unknown names still raise AttributeError"""
+        import calc_engine
+
+        with pytest.raises(AttributeError):
+            calc_engine.no_such_name
+
+
+class TestStartupReport:
+    """Test the startup-time report script"""
+
+    def test_parse_importtime(self):
+        """Test parsing -X importtime output"""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   _io\n'
+            'import time:      1500 |       1620 | calc_engine\n'
+        )
+        assert startup_time.parse_importtime(output) == {
+            '_io': (120, 120), 'calc_engine': (1500, 1620),
+        }
+
+    def test_report(self, capsys):
+        """Test the budget check on measured times"""
+        times = {'calc_engine': (1500, 20000), 're': (800, 800)}
+        assert startup_time.report('calc_engine', times, 25.0)
+        assert not startup_time.report('calc_engine', times, 10.0)
+        assert 'OVER BUDGET' in capsys.readouterr().out
+
+    def test_measure(self):
+        """Test measuring a real import"""
+        times = startup_time.measure('calc_engine', runs=1)
+        assert times['calc_engine'][1] > 0
+        assert 'calc_engine.parser' in times
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for batch evaluation of one expression over many values
+"""
+
+import contextlib
+import math
+import os
+import sys
+
+import pytest
+
+# Add src directory to path to import calculator modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from calc_engine import ExpressionError, evaluate, evaluate_many
+from calc_engine import vectorized
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Run each test with NumPy and with the pure-Python fallback"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(vectorized, "np", None)
+    return request.param
+
+
+class TestEvaluateMany:
+    """Test evaluate_many against scalar evaluation"""
+
+    def test_matches_scalar_evaluation(self, backend):
+        """Test each point matches evaluate() on the same value"""
+        values = [0.5, 1.0, 2.0, 10.0]
+        results = evaluate_many("sin(x)*sqrt(x)+ln(x)", x=values)
+        for value, result in zip(values, results):
+            expected = evaluate(f"sin({value})*sqrt({value})+ln({value})")
+            assert result == pytest.approx(expected)
+
+    def test_radians_mode(self, backend):
+        """Test the degrees flag is honoured"""
+        results = evaluate_many("sin(x)", degrees=False, x=[0.0, math.pi / 2])
+        assert list(results) == pytest.approx([0.0, 1.0])
+
+    def test_scalar_broadcast(self, backend):
+        """Test scalars combine with arrays"""
+        results = evaluate_many("x^2 + y + |x| + log10(100)", x=[1, -2, 3], y=1)
+        assert list(results) == pytest.approx([5.0, 9.0, 15.0])
+
+    def test_domain_errors_give_nan(self, backend):
+        """Test out-of-domain points produce nan instead of raising"""
+        with pytest.warns(RuntimeWarning) if backend == "numpy" else contextlib.nullcontext():
+            results = evaluate_many("sqrt(x)", x=[4, -1])
+        assert results[0] == 2.0
+        assert math.isnan(results[1])
+
+    def test_overflow_gives_inf(self, backend):
+        """Test points whose result overflows produce inf instead of raising"""
+        with pytest.warns(RuntimeWarning) if backend == "numpy" else contextlib.nullcontext():
+            results = evaluate_many("exp(x) + 10^(x/2)", x=[0, 1000])
+        assert list(results) == [2.0, math.inf]
+
+    def test_folded_non_finite_constants(self, backend):
+        """Test constants folded to inf or nan evaluate on every path"""
+        results = evaluate_many("x + 1e309*0", x=[1, 2])
+        assert all(math.isnan(result) for result in results)
+        assert list(evaluate_many("x - 1e309", x=[1, 2])) == [-math.inf, -math.inf]
+
+    def test_missing_variable(self, backend):
+        """Test an unbound name raises ExpressionError"""
+        with pytest.raises(ExpressionError):
+            evaluate_many("x + y", x=[1, 2])
+
+
+class TestPythonFallback:
+    """Test behaviour specific to the pure-Python path"""
+
+    def test_length_mismatch(self, monkeypatch):
+        """Test arrays of different lengths are rejected"""
+        monkeypatch.setattr(vectorized, "np", None)
+        with pytest.raises(ValueError):
+            evaluate_many("x + y", x=[1, 2], y=[1, 2, 3])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])